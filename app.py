@@ -1,11 +1,10 @@
 import streamlit as st
 import time
-from datetime import datetime, timedelta, time as dt_time
-from groww_client import GrowwClient
-from strategy import StrategyEngine
+from datetime import datetime
+from strategy import get_strategy_engine
 from database import Database
 import config
-from ui import dashboard, option_chain, trades, strategy_explanation
+from ui import dashboard, option_chain, price_chart, trades, strategy_explanation
 from logger import setup_logger
 
 import os
@@ -32,38 +31,18 @@ if os.environ.get("IS_FROZEN"):
 
 # --- Helper Functions ---
 def check_market_status():
-    """Checks if the Indian market is open (09:15 - 15:30 IST)."""
-    now = datetime.now()
-    current_time = now.time()
-    market_open = dt_time(9, 15)
-    market_close = dt_time(15, 30)
-    
-    # Check if it's a weekday (0=Monday, 4=Friday)
-    is_weekday = now.weekday() < 5
-    is_open_time = market_open <= current_time <= market_close
-    
-    if is_weekday and is_open_time:
-        time_left = datetime.combine(now.date(), market_close) - now
-        return True, f"Market is OPEN. Closes in {str(time_left).split('.')[0]}"
-    else:
-        if is_weekday and current_time < market_open:
-            opens_in = datetime.combine(now.date(), market_open) - now
-            return False, f"Market is CLOSED. Opens in {str(opens_in).split('.')[0]}"
-        else:
-            return False, "Market is CLOSED."
+    """Checks if the Indian market is open (NSE session hours, weekends and exchange holidays)."""
+    return st.session_state.strategy.scheduler.calendar.status()
 
 # Initialize components
-if 'client' not in st.session_state:
-    st.session_state.client = GrowwClient()
 if 'db' not in st.session_state:
     st.session_state.db = Database()
-
-# Auto-login on startup if credentials exist
-if st.session_state.client.api is None:
-    st.session_state.client.login(st.session_state.db)
-
 if 'strategy' not in st.session_state:
-    st.session_state.strategy = StrategyEngine(st.session_state.client, st.session_state.db)
+    # One engine and account per process, shared by every browser session (so one book is checkpointed)
+    st.session_state.strategy = get_strategy_engine(st.session_state.db)
+    st.session_state.client = st.session_state.strategy.client
+# Reruns never block on authentication; expired tokens refresh in the background
+st.session_state.client.connect(st.session_state.db)
 
 # Sidebar
 st.sidebar.title("Control Panel")
@@ -80,6 +59,10 @@ if not is_logged_in:
             st.rerun()
         else:
             api_status.error("Connection Failed. Check Credentials.")
+    else:
+        token_status = st.session_state.client.tokens.status() if st.session_state.client.tokens else None
+        if token_status and token_status['failures']:
+            api_status.warning(f"Login failed ({token_status['failures']}x). Retrying in {token_status['retry_in']:.0f}s")
 else:
     api_status.success("Connected")
 
@@ -95,6 +78,17 @@ with st.sidebar.expander("API Credentials"):
             st.session_state.db.save_credential("TOTP_SECRET", new_totp_secret)
         st.success("Credentials Saved! Please click Login.")
 
+with st.sidebar.expander("Profiler"):
+    profiler = st.session_state.strategy.profiler
+    profile_ticks = st.number_input("Ticks to profile", min_value=1, max_value=100, value=config.PROFILE_TICKS)
+    profile_mode = st.selectbox("Collector", ["sampling", "cprofile"], help="sampling: low overhead, flame graph stacks. cprofile: exact call counts.")
+    if st.button("Profile next ticks"):
+        profiler.arm(int(profile_ticks), profile_mode)
+    if profiler.remaining:
+        st.caption(f"Armed: {profiler.remaining} tick(s) left")
+    for report in reversed(profiler.reports[-3:]):
+        st.caption(report)
+
 st.sidebar.header("Settings")
 # Display Live Capital from Client instead of static config
 current_capital = st.session_state.client.get_available_balance() if is_logged_in else config.CAPITAL
@@ -108,7 +102,7 @@ if todays_pnl >= config.DAILY_PROFIT_TARGET:
     st.sidebar.warning(f"Target Reached! (Target: ₹{config.DAILY_PROFIT_TARGET})")
 
 target = st.sidebar.number_input("Target Profit", value=config.TARGET_PROFIT)
-auto_refresh = st.sidebar.checkbox("Auto Refresh (1s)")
+auto_refresh = st.sidebar.checkbox("Auto Refresh (adaptive)", help="Polls faster in trending markets, slower in flat ones, and pauses outside market hours")
 
 # Main Dashboard
 st.title("Nifty 50 Option Chain Trader")
@@ -125,10 +119,8 @@ if not is_logged_in:
     st.info("Please enter your credentials in the sidebar and click 'Login' to start trading.")
     st.stop()
 
-# Calculate Next Expiry (Tuesday)
-today = datetime.now().date()
-days_until_tuesday = (1 - today.weekday() + 7) % 7
-next_expiry = today + timedelta(days=days_until_tuesday)
+# Next Expiry (per the underlying's expiry calendar)
+next_expiry = datetime.strptime(st.session_state.client.get_next_expiry(config.SYMBOL), "%Y-%m-%d")
 expiry_str = next_expiry.strftime("%d %b %Y")
 
 # Create a placeholder for the entire dashboard content
@@ -146,14 +138,16 @@ def render_dashboard():
         with col4:
             st.metric("Next Expiry", expiry_str)
 
-        # Run Analysis ONCE for all tabs
-        analysis = st.session_state.strategy.execute_strategy()
+        # Run Analysis ONCE for all tabs. With Auto Refresh the script reruns about every second so
+        # widgets stay responsive, but the shared engine only ticks when the scheduler says so
+        analysis = st.session_state.strategy.latest_analysis(force=not auto_refresh)
 
         # Tabs
         tab1, tab2, tab3, tab4 = st.tabs(["Live Dashboard", "Option Chain", "Trades", "Strategy Explained"])
 
         with tab1:
             dashboard.render(analysis)
+            price_chart.render(analysis)
 
         with tab2:
             option_chain.render(analysis)
@@ -168,7 +162,9 @@ def render_dashboard():
 # Initial Render
 render_dashboard()
 
-# Auto-refresh Loop
+# Auto-refresh Loop (cadence set by the scheduler: regime, candle closes, market hours)
+# With the quote stream enabled, the rerun is triggered by new quotes instead
 if auto_refresh:
-    time.sleep(1)
+    until_tick = st.session_state.strategy.next_tick_at - time.monotonic()
+    st.session_state.strategy.wait_for_data(min(max(until_tick, 0.0), config.AUTO_REFRESH_MAX_WAIT))
     st.rerun()
@@ -0,0 +1,288 @@
+import threading
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+import config
+
+OHLCV = ["open", "high", "low", "close", "volume"]
+
+# One candle: bar start as naive local epoch seconds + float64 OHLCV
+CANDLE_DTYPE = np.dtype([
+    ("ts", "i8"),
+    ("open", "f8"),
+    ("high", "f8"),
+    ("low", "f8"),
+    ("close", "f8"),
+    ("volume", "f8"),
+])
+
+# Bar length of every interval we can derive from the 1-minute base series (None = daily)
+INTERVAL_MINUTES = {
+    "1m": 1,
+    "5m": 5,
+    "15m": 15,
+    "30m": 30,
+    "1h": 60,
+    "1d": None,
+}
+
+SESSION_MINUTES = 375 # 09:15 - 15:30
+
+
+def _session_open_seconds():
+    hours, minutes, seconds = map(int, config.SESSION_OPEN.split(":"))
+    return hours * 3600 + minutes * 60 + seconds
+
+
+def bucket_start(ts, interval):
+    """
+    Start (epoch seconds) of the bar each timestamp belongs to.
+    Intraday bars are anchored at the session open (09:15), matching Groww's 30m/1h bars.
+    """
+    days = ts - ts % 86400
+    minutes = INTERVAL_MINUTES[interval]
+    if minutes is None:
+        return days
+    session_open = _session_open_seconds()
+    step = minutes * 60
+    return days + session_open + ((ts - days - session_open) // step) * step
+
+
+def aggregate(bars, interval):
+    """Aggregates sorted 1-minute bars into `interval` bars without leaving NumPy."""
+    if interval == "1m" or len(bars) == 0:
+        return bars.copy()
+    buckets = bucket_start(bars["ts"], interval)
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(buckets)) + 1))
+    ends = np.append(starts[1:], len(bars)) - 1
+
+    out = np.empty(len(starts), dtype=CANDLE_DTYPE)
+    out["ts"] = buckets[starts]
+    out["open"] = bars["open"][starts]
+    out["high"] = np.maximum.reduceat(bars["high"], starts)
+    out["low"] = np.minimum.reduceat(bars["low"], starts)
+    out["close"] = bars["close"][ends]
+    out["volume"] = np.add.reduceat(bars["volume"], starts)
+    return out
+
+
+def _local_epoch(values):
+    # Unix timestamps -> naive local epoch seconds (what datetime.fromtimestamp would show)
+    values = values.astype(np.int64)
+    if len(values) == 0:
+        return values
+    t0 = int(values[0])
+    offset = (datetime.fromtimestamp(t0) - datetime.fromtimestamp(t0, timezone.utc).replace(tzinfo=None)).total_seconds()
+    return values + int(offset)
+
+
+def _datetime_epoch(values):
+    # Datetime strings -> naive local epoch seconds
+    parsed = pd.to_datetime(pd.Series(values))
+    if parsed.dt.tz is not None:
+        parsed = parsed.dt.tz_convert(datetime.now().astimezone().tzinfo).dt.tz_localize(None)
+    return parsed.to_numpy(dtype="datetime64[s]").astype(np.int64)
+
+
+def parse_candles(candles):
+    """
+    Converts a Groww candle payload into a sorted CANDLE_DTYPE array in bulk.
+    Handles both [ts, o, h, l, c, v, ...] lists and {time/date, open, ...} dicts.
+    """
+    if not candles:
+        return np.empty(0, dtype=CANDLE_DTYPE)
+
+    out = None
+    if isinstance(candles[0], dict):
+        frame = pd.DataFrame.from_records(candles)
+        ts_col = 'time' if 'time' in frame.columns else 'date'
+        out = np.empty(len(frame), dtype=CANDLE_DTYPE)
+        for name in OHLCV:
+            col = frame[name] if name in frame.columns else 0.0
+            out[name] = pd.to_numeric(col, errors='coerce')
+        ts = frame[ts_col]
+    else:
+        frame = pd.DataFrame(candles)
+        out = np.empty(len(frame), dtype=CANDLE_DTYPE)
+        for i, name in enumerate(OHLCV, start=1):
+            out[name] = pd.to_numeric(frame[i], errors='coerce') if i in frame.columns else 0.0
+        ts = frame[0]
+
+    if pd.api.types.is_numeric_dtype(ts):
+        out["ts"] = _local_epoch(ts.to_numpy())
+    else:
+        out["ts"] = _datetime_epoch(ts)
+
+    # Missing values become 0.0, as before
+    for name in OHLCV:
+        np.nan_to_num(out[name], copy=False, nan=0.0)
+
+    return out[np.argsort(out["ts"], kind="stable")]
+
+
+def dedupe(bars):
+    """Keeps the last occurrence of each timestamp in a sorted bar array."""
+    if len(bars) < 2:
+        return bars
+    keep = np.append(bars["ts"][1:] != bars["ts"][:-1], True)
+    return bars[keep]
+
+
+def to_frame(bars):
+    """DataFrame copy of a bar array, for consumers that genuinely need pandas."""
+    df = pd.DataFrame({name: bars[name] for name in OHLCV})
+    df.index = pd.DatetimeIndex(bars["ts"].astype("datetime64[s]"), name="datetime")
+    return df
+
+
+class CandleBuffer:
+    """
+    Fixed-capacity candle ring buffer backed by one structured NumPy array.
+
+    The backing array is twice the capacity and is compacted only when the write position
+    reaches its end, so the live window is always contiguous and view() never copies.
+    Views stay valid until the next upsert().
+    """
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._data = np.zeros(2 * capacity, dtype=CANDLE_DTYPE)
+        self._start = 0
+        self._end = 0
+
+    def __len__(self):
+        return self._end - self._start
+
+    def view(self):
+        return self._data[self._start:self._end]
+
+    def column(self, name):
+        return self._data[name][self._start:self._end]
+
+    @property
+    def last_ts(self):
+        return int(self._data["ts"][self._end - 1]) if len(self) else None
+
+    def upsert(self, bars):
+        """Replaces every stored bar at or after the first new timestamp, then appends."""
+        if len(bars) == 0:
+            return
+        cut = np.searchsorted(self.column("ts"), bars["ts"][0], side="left")
+        self._end = self._start + int(cut)
+        self._append(bars)
+
+    def _append(self, bars):
+        n = len(bars)
+        if n >= self.capacity:
+            self._data[:self.capacity] = bars[-self.capacity:]
+            self._start, self._end = 0, self.capacity
+            return
+
+        keep = min(len(self), self.capacity - n)
+        if self._end + n > len(self._data):
+            # Compact: move the bars we keep to the front
+            self._data[:keep] = self._data[self._end - keep:self._end]
+            self._end = keep
+        self._data[self._end:self._end + n] = bars
+        self._end += n
+        self._start = self._end - keep - n
+
+
+class CandleSeries:
+    """
+    A single 1-minute base series with every higher interval derived from it.
+
+    New base bars (including a re-sent forming bar) are merged in place, and only the derived
+    bars whose buckets they touch are recomputed. The forming higher-interval bar is therefore
+    updated in place rather than rebuilt from the whole history. Memory is bounded by the
+    buffer capacities.
+    """
+    def __init__(self, capacity=None):
+        self.capacity = capacity or config.CANDLE_BASE_MAX_BARS
+        self.base = CandleBuffer(self.capacity)
+        self.derived = {}
+        self.lock = threading.Lock()
+
+    @property
+    def last_timestamp(self):
+        ts = self.base.last_ts
+        return pd.Timestamp(ts, unit="s") if ts is not None else None
+
+    def update(self, bars):
+        """Merges freshly fetched 1-minute bars (a sorted CANDLE_DTYPE array) into the series."""
+        if bars is None or len(bars) == 0:
+            return
+        with self.lock:
+            self._merge(bars)
+
+    def apply_tick(self, ts, price, volume=0.0):
+        """
+        Folds one streamed trade price into the forming 1-minute bar (and so into every forming
+        derived bar). `ts` is naive local epoch seconds; ticks older than the last bar are ignored.
+        """
+        bar_ts = int(ts) - int(ts) % 60
+        with self.lock:
+            bar = np.empty(1, dtype=CANDLE_DTYPE)
+            last_ts = self.base.last_ts
+            if last_ts is not None and bar_ts < last_ts:
+                return
+            if last_ts == bar_ts:
+                bar[0] = self.base.view()[-1]
+                bar["high"] = max(bar["high"][0], price)
+                bar["low"] = min(bar["low"][0], price)
+                bar["close"] = price
+                bar["volume"] += volume
+            else:
+                bar[0] = (bar_ts, price, price, price, price, volume)
+            self._merge(bar)
+
+    def _merge(self, bars):
+        self.base.upsert(bars)
+        base_ts = self.base.column("ts")
+        for interval, buffer in self.derived.items():
+            # Re-aggregate from the start of the bucket containing the first changed bar
+            start = bucket_start(bars["ts"][:1], interval)[0]
+            first = np.searchsorted(base_ts, start, side="left")
+            buffer.upsert(aggregate(self.base.view()[first:], interval))
+
+    def view(self, interval):
+        """Zero-copy bar array for `interval` (valid until the next update)."""
+        with self.lock:
+            if interval == "1m":
+                return self.base.view()
+            return self._derived(interval).view()
+
+    def get(self, interval):
+        """DataFrame copy of `interval` bars."""
+        with self.lock:
+            bars = self.base.view() if interval == "1m" else self._derived(interval).view()
+            return to_frame(bars)
+
+    def _derived(self, interval):
+        if interval not in self.derived:
+            minutes = INTERVAL_MINUTES[interval] or SESSION_MINUTES
+            buffer = CandleBuffer(self.capacity // minutes + 2)
+            buffer.upsert(aggregate(self.base.view(), interval))
+            self.derived[interval] = buffer
+        return self.derived[interval]
+
+
+class CandleStore:
+    """Process-wide CandleSeries per symbol, shared by every session."""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.series = {}
+
+    def get_series(self, symbol):
+        with self.lock:
+            if symbol not in self.series:
+                self.series[symbol] = CandleSeries()
+            return self.series[symbol]
+
+
+_store = CandleStore()
+
+
+def get_candle_store():
+    return _store
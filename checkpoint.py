@@ -0,0 +1,169 @@
+import json
+import os
+import pickle
+import threading
+import time
+
+import numpy as np
+
+import config
+from logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+def _write_atomic(path, write):
+    # Write to a temp file, fsync, then rename over the target: readers see the old or the new file, never half
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        write(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class Checkpoint:
+    """
+    Crash-safe state of one strategy (account, signal, model reference, scheduler, candles).
+
+    State is a dict of sections. Every record() appends one JSON line replacing a single section
+    to an append-only log (flushed, and fsynced if CHECKPOINT_FSYNC), so a crash loses at most
+    the record being written. Every CHECKPOINT_SNAPSHOT_EVERY records the whole state is written
+    atomically as a snapshot and the log is truncated. load() reads the snapshot and replays the
+    log records newer than it, skipping a torn last line. Candle history is kept in a separate
+    .npy file, written at most every CHECKPOINT_CANDLES_SECONDS.
+    """
+    def __init__(self, name, directory=None):
+        self.directory = directory or config.CHECKPOINT_DIR
+        os.makedirs(self.directory, exist_ok=True)
+        base = os.path.join(self.directory, name)
+        self.snapshot_path = base + ".json"
+        self.log_path = base + ".log"
+        self.candles_path = base + ".candles.npy"
+        self.lock = threading.Lock()
+        self.state = {}
+        self.seq = 0
+        self.pending = 0 # Records appended since the last snapshot
+        self.last_candles = 0.0
+        self._log = None
+        self.load()
+
+    def load(self):
+        """Rebuilds the state from the snapshot plus the log. Returns it."""
+        state, seq = {}, 0
+        if os.path.exists(self.snapshot_path):
+            try:
+                with open(self.snapshot_path) as f:
+                    snapshot = json.load(f)
+                state, seq = snapshot["state"], snapshot["seq"]
+            except (OSError, ValueError, KeyError) as e:
+                logger.error(f"Unreadable checkpoint snapshot {self.snapshot_path}: {e}")
+        pending, torn = 0, False
+        if os.path.exists(self.log_path):
+            with open(self.log_path) as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        torn = True # Write cut short by a crash
+                        continue
+                    if record["seq"] > seq:
+                        state[record["section"]] = record["data"]
+                        seq = record["seq"]
+                        pending += 1
+        with self.lock:
+            self.state, self.seq, self.pending = state, seq, pending
+            if torn:
+                self._snapshot() # Start a clean log rather than append after the torn line
+        return state
+
+    def get(self, section, default=None):
+        with self.lock:
+            return self.state.get(section, default)
+
+    def record(self, section, data):
+        """Durably replaces one section of the state."""
+        with self.lock:
+            self.seq += 1
+            self.state[section] = data
+            if self._log is None:
+                self._log = open(self.log_path, "a")
+            self._log.write(json.dumps({"seq": self.seq, "section": section, "data": data}, default=float) + "\n")
+            self._log.flush()
+            if config.CHECKPOINT_FSYNC:
+                os.fsync(self._log.fileno())
+            self.pending += 1
+            if self.pending >= config.CHECKPOINT_SNAPSHOT_EVERY:
+                self._snapshot()
+
+    def snapshot(self):
+        with self.lock:
+            self._snapshot()
+
+    def _snapshot(self):
+        payload = json.dumps({"seq": self.seq, "state": self.state}, default=float).encode()
+        _write_atomic(self.snapshot_path, lambda f: f.write(payload))
+        # Records up to self.seq are in the snapshot; a crash before this truncation only leaves stale ones
+        if self._log is not None:
+            self._log.close()
+        self._log = open(self.log_path, "w")
+        self.pending = 0
+
+    def save_candles(self, bars, force=False):
+        """Stores the 1-minute candle history (rate limited unless forced)."""
+        now = time.monotonic()
+        if not force and now - self.last_candles < config.CHECKPOINT_CANDLES_SECONDS:
+            return
+        self.last_candles = now
+        bars = np.array(bars, copy=True) # The caller's view may change under us
+        _write_atomic(self.candles_path, lambda f: np.save(f, bars, allow_pickle=False))
+
+    def load_candles(self):
+        if not os.path.exists(self.candles_path):
+            return None
+        try:
+            return np.load(self.candles_path, allow_pickle=False)
+        except (OSError, ValueError) as e:
+            logger.error(f"Unreadable candle checkpoint {self.candles_path}: {e}")
+            return None
+
+    def save_model(self, model, tag):
+        """Pickles an in-process trained model next to the walk-forward models and returns its path."""
+        os.makedirs(config.MODEL_DIR, exist_ok=True)
+        path = os.path.join(config.MODEL_DIR, f"checkpoint_{tag}.pkl")
+        _write_atomic(path, lambda f: pickle.dump(model, f))
+        return path
+
+    def close(self):
+        with self.lock:
+            if self._log is not None:
+                self._log.close()
+                self._log = None
+
+
+_checkpoints = {}
+_checkpoints_lock = threading.Lock()
+
+
+def get_checkpoint(name):
+    """
+    Process-wide checkpoint per strategy name, or None if checkpointing is disabled.
+    Only one engine per name may record into it (the app shares one, see strategy.get_strategy_engine).
+    """
+    if not config.CHECKPOINT_ENABLED:
+        return None
+    with _checkpoints_lock:
+        if name not in _checkpoints:
+            _checkpoints[name] = Checkpoint(name)
+        return _checkpoints[name]
+
+
+def load_model(reference, feature_version):
+    """Model from a checkpointed model reference, or None if it is missing or was built for other features."""
+    if not reference or reference.get("feature_version") != feature_version:
+        return None
+    path = reference.get("path")
+    if not path or not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        return pickle.load(f)
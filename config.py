@@ -5,12 +5,186 @@ TARGET_PROFIT = 1000
 STOP_LOSS = 500 # Example stop loss
 DAILY_PROFIT_TARGET = 3000 # Stop trading if daily profit exceeds this
 
+# Tradable underlyings. Lot sizes follow the NSE revision effective Jan 2026 (update on each revision).
+# expiry_weekday: 0=Mon ... 6=Sun. monthly=True means only the last such weekday of the month expires.
+UNDERLYINGS = {
+    "NIFTY": {"lot_size": 65, "expiry_weekday": 1, "monthly": False, "groww_symbol": "NSE-NIFTY"},
+    "BANKNIFTY": {"lot_size": 30, "expiry_weekday": 1, "monthly": True, "groww_symbol": "NSE-BANKNIFTY"},
+    "FINNIFTY": {"lot_size": 60, "expiry_weekday": 1, "monthly": True, "groww_symbol": "NSE-FINNIFTY"},
+    "MIDCPNIFTY": {"lot_size": 120, "expiry_weekday": 1, "monthly": True, "groww_symbol": "NSE-MIDCPNIFTY"},
+}
+
 # Costs
 BROKERAGE_PER_ORDER = 20
 GST_RATE = 0.18 # 18% on brokerage
 
 # Database
 DB_PATH = "trading_data.db"
+DB_READ_POOL_SIZE = 8 # Read-only connections shared by dashboard sessions (WAL: reads never wait on the writer)
+DB_BUSY_TIMEOUT = 5.0 # Seconds a connection waits on a lock (checkpoints, schema changes) before failing
+DB_STATEMENT_CACHE = 128 # Prepared statements kept per connection
 
 # Logging
 ENABLE_DEBUG_LOGS = False # Set to True to see debug messages
+
+# Order Management
+ORDER_GATEWAY = "paper" # "paper" (simulated account) or "groww" (live order endpoint)
+ORDER_HISTORY_LIMIT = 500 # Finished orders kept in memory for latency stats
+ORDER_CANCEL_RECONCILE_SECONDS = 5 # After cancelling an unfilled live order, wait this long for its final status
+
+# Paper Fill Simulation
+FILL_SIM_ENABLED = True # Model latency, spread and impact on paper fills
+FILL_LATENCY_MS = 250 # Decision-to-fill latency
+FILL_SPREAD_PCT = 0.005 # Modelled bid/ask spread as a fraction of premium
+FILL_MIN_SPREAD = 0.10 # Spread never narrower than 2 ticks
+FILL_IMPACT_PCT_PER_LOT = 0.0005 # Extra slippage per lot traded
+FILL_SNAPSHOT_HISTORY = 3600 # Chain snapshots kept for replay
+FILL_TIMEOUT = 10 # Seconds to wait for the post-latency snapshot before using the latest
+FILL_REPORT_LATENCIES_MS = [0, 100, 250, 500, 1000, 2000, 5000]
+
+# API Rate Limiting (Groww quotas per group: list of (requests, per_seconds))
+API_RATE_LIMITS = {
+    "orders": [(10, 1), (250, 60)],
+    "live_data": [(10, 1), (300, 60)],
+    "non_trading": [(20, 1), (500, 60)],
+}
+# Endpoint -> (quota group or None, cache TTL in seconds; 0 disables caching)
+API_ENDPOINTS = {
+    "login": (None, 0),
+    "option_chain": ("live_data", 1.0),
+    "historical_candles": ("non_trading", 5.0),
+    "place_order": ("orders", 0),
+    "order_status": ("orders", 0),
+    "cancel_order": ("orders", 0),
+}
+API_MAX_RATE_WAIT = 2.0 # Give up on a request rather than wait longer than this for a token
+
+# Access Token Lifecycle
+TOKEN_DAILY_EXPIRY = "06:00" # Groww access tokens expire daily at this local time
+TOKEN_BACKOFF_BASE = 5 # Seconds to wait after the first failed login, doubling each failure
+TOKEN_BACKOFF_MAX = 300 # Cap on the login retry interval
+
+# Candles
+SESSION_OPEN = "09:15:00" # Intraday bars are anchored at the NSE open
+SESSION_CLOSE = "15:30:00"
+CANDLE_BASE_LOOKBACK_DAYS = 30 # History of the 1-minute base series fetched on first use
+CANDLE_1M_MAX_DAYS_PER_REQUEST = 7 # Range limit of a single 1-minute candle request
+CANDLE_BASE_MAX_BARS = 30 * 375 # ~30 sessions of 1-minute bars
+MTF_INTERVALS = ["1m", "5m", "15m"] # Timeframes shown in the multi-timeframe trend view
+
+# UI
+OPTION_CHAIN_WINDOW = 10 # Strikes shown either side of ATM in the Option Chain tab
+TRADES_PAGE_SIZE = 50 # Trades per page in the Trade Log
+EQUITY_CURVE_POINTS = 500 # Most recent closed trades plotted in the equity curve
+AUTO_REFRESH_MAX_WAIT = 1.0 # Longest blocking wait per Auto Refresh rerun, so sidebar widgets stay responsive
+
+# Shared-Memory Snapshots (read by dashboards/recorders in other processes)
+SNAPSHOT_PUBLISH = True
+SNAPSHOT_SHM_PREFIX = "hft_snapshot" # Block name is <prefix>_<SYMBOL>
+SNAPSHOT_MAX_STRIKES = 512
+SNAPSHOT_MAX_FEATURES = 64
+SNAPSHOT_SUMMARY_BYTES = 8192
+SNAPSHOT_READ_TIMEOUT = 0.05 # Seconds a reader waits for an in-progress write before giving up
+
+# Multi-Underlying Runner
+RUNNER_UNDERLYINGS = ["NIFTY", "BANKNIFTY", "FINNIFTY"] # One worker process each
+RUNNER_TICK_INTERVAL = 1.0 # Seconds between ticks in each worker
+
+# Feature Store
+FEATURE_STORE_ENABLED = True
+FEATURE_STORE_PATH = "feature_store.db"
+FEATURE_INTERVAL = "5m" # Interval the model features are computed on
+FEATURE_WARMUP_BARS = 100 # Leading rows of a computed frame not stored (indicators still converging)
+
+# Model
+MODEL_ENGINE = "random_forest" # random_forest, extra_trees, hist_gradient_boosting, logistic_regression
+MODEL_COMPARE_SPLITS = 5 # Walk-forward folds used by `python models.py`
+
+# Walk-Forward Training
+WALK_FORWARD_TRAIN_BARS = 60 * 75 # ~60 sessions of 5m bars per training window
+WALK_FORWARD_TEST_BARS = 5 * 75 # ~1 week out-of-sample per fold (also the step)
+WALK_FORWARD_CHUNK_ROWS = 5000 # Feature rows read from the store at a time
+WALK_FORWARD_WORKERS = None # Parallel folds (None = all cores)
+MODEL_DIR = "models" # Models saved by walk-forward runs
+
+# Polling Scheduler
+SCHEDULER_ENABLED = True
+# NSE equity/F&O trading holidays (weekdays only; refresh from the exchange circular each year,
+# a year without entries is logged as an error and flagged on the dashboard banner)
+NSE_HOLIDAYS = [
+    "2026-01-26", "2026-03-03", "2026-03-26", "2026-03-31", "2026-04-03",
+    "2026-04-14", "2026-05-01", "2026-05-28", "2026-06-26", "2026-09-14",
+    "2026-10-02", "2026-10-20", "2026-11-10", "2026-11-24", "2026-12-25",
+]
+# Seconds between option chain polls per market regime
+POLL_INTERVALS = {
+    "TRENDING": 1.0, # Also used on high-momentum candles in any regime
+    "CHOPPY/VOLATILE": 2.0,
+    "DEAD/FLAT": 5.0,
+    "UNKNOWN": 2.0,
+}
+CANDLE_SETTLE_SECONDS = 2 # Wait after a bar closes before fetching it
+MARKET_CLOSED_RECHECK = 60 # Seconds between status checks outside market hours
+
+# Tick Profiler (armed from the sidebar or with `kill -USR1 <pid>`)
+PROFILE_DIR = "profiles"
+PROFILE_MODE = "sampling" # sampling (folded stacks for flame graphs) or cprofile (.prof)
+PROFILE_TICKS = 5 # Ticks profiled per trigger
+PROFILE_SAMPLE_INTERVAL = 0.001 # Seconds between stack samples
+PROFILE_TOP_FUNCTIONS = 25 # Rows in each summary
+PROFILE_KEEP_REPORTS = 20 # Recent reports listed in the sidebar
+
+# Market Data Backend
+DATA_BACKEND = "groww" # "groww" (live API) or "replay" (recorded/synthetic data, see replay.py)
+REPLAY_PATH = None # Recording served by the replay backend (None = synthetic session)
+# Replay refuses the live stores (LIVE_STORE_PATHS): point them at a scratch directory first, as loadtest.py does
+
+# Load Test (loadtest.py)
+LOADTEST_SESSIONS = [1, 2, 4, 8, 16] # Concurrent dashboard sessions per step
+LOADTEST_TICKS = 20 # Reruns per session per step
+LOADTEST_INTERVAL = 1.0 # Target seconds between a session's reruns (the Auto Refresh cadence)
+
+# Price Chart (Live Dashboard)
+CHART_DOWNSAMPLE = "lttb" # "lttb" (shape-preserving) or "minmax" (keeps every bucket's extremes), see downsample.py
+CHART_POINTS = 800 # Points per indicator line, about the chart's pixel width
+CHART_CANDLES = 200 # Candles drawn; older bars are merged into wider candles
+
+# Strategy Variants (evaluated on the same data feed as the primary strategy, on paper)
+# Name -> overrides of strategy.STRATEGY_PARAMS; trades are logged with the name in trades.variant
+STRATEGY_VARIANTS = {}
+# e.g. {"strict_pcr": {"pcr_bullish": 1.4, "pcr_bearish": 0.6},
+#       "fast_hgb": {"adx_trending": 20, "model_engine": "hist_gradient_boosting"}}
+
+# Streaming Quotes (stream.py)
+STREAM_ENABLED = False # Push-based chain/candle updates; ticks run on new quotes instead of a timer
+STREAM_HOST = "127.0.0.1"
+STREAM_PORT = 8765 # Quote feed socket (`python stream.py` serves recorded data here)
+STREAM_ATM_STRIKES = 10 # Strikes subscribed either side of the ATM strike
+STREAM_MIN_EVAL_INTERVAL = 0.25 # Seconds between event-driven evaluations (bursts are coalesced)
+STREAM_STALE_SECONDS = 5.0 # Without quotes for this long the feed counts as down (REST polling resumes)
+STREAM_RESEED_SECONDS = 60 # Full chain refresh over REST (far strikes, greeks)
+STREAM_RECONNECT_SECONDS = 1.0
+STREAM_RECONNECT_MAX_SECONDS = 30.0
+STREAM_REPLAY_INTERVAL = 0.5 # Seconds between snapshots replayed by the local publisher
+
+# Checkpointing (checkpoint.py): paper account, signal, model reference and candles survive restarts
+CHECKPOINT_ENABLED = True
+CHECKPOINT_DIR = "checkpoints"
+CHECKPOINT_SNAPSHOT_EVERY = 50 # Log records between full snapshots
+CHECKPOINT_CANDLES_SECONDS = 300 # Minimum seconds between candle history saves
+CHECKPOINT_FSYNC = True # fsync every log record (durable across power loss, ~ms per state change)
+
+# Multi-Expiry Chains & IV Surface (vol_surface.py)
+CHAIN_EXPIRIES = 3 # Expiries fetched for the strike x expiry IV/OI surface (1 = front expiry only)
+CHAIN_FETCH_WORKERS = 4 # Concurrent chain requests (still bounded by API_RATE_LIMITS)
+SURFACE_REFRESH_SECONDS = 30 # Back-expiry chains are refetched this often; the front one every tick
+SURFACE_SKEW_MONEYNESS = 0.02 # Skew = put IV at spot*(1-m) minus call IV at spot*(1+m)
+EXPIRY_ROLLOVER = True # On expiry day, new positions are opened in the next expiry
+
+# Live Stores (the replay backend refuses to write synthetic trades, features, models or checkpoints here)
+LIVE_STORE_PATHS = {
+    "DB_PATH": DB_PATH,
+    "FEATURE_STORE_PATH": FEATURE_STORE_PATH,
+    "MODEL_DIR": MODEL_DIR,
+    "CHECKPOINT_DIR": CHECKPOINT_DIR,
+}
@@ -0,0 +1,141 @@
+import threading
+from datetime import date, timedelta
+
+import numpy as np
+
+from logger import setup_logger
+
+logger = setup_logger(__name__)
+
+MONTH_CODES = "123456789OND" # NSE weekly contract month codes (Jan..Sep, Oct, Nov, Dec)
+
+
+def format_trading_symbol(underlying, expiry, strike, option_type):
+    """
+    NSE trading symbol of an option, e.g. NIFTY25O1425000CE (weekly) or NIFTY25OCT25000CE (monthly).
+    Only used when the chain response does not carry the broker's own trading_symbol.
+    """
+    day = date.fromisoformat(expiry)
+    strike_text = str(int(strike)) if float(strike).is_integer() else str(strike)
+    if (day + timedelta(days=7)).month != day.month: # Last expiry of the month
+        series = f"{day:%y}{day:%b}".upper()
+    else:
+        series = f"{day:%y}{MONTH_CODES[day.month - 1]}{day:%d}"
+    return f"{underlying}{series}{strike_text}{option_type}"
+
+
+class Contract:
+    """One option contract. Immutable once registered."""
+    __slots__ = ("id", "underlying", "expiry", "strike", "option_type", "trading_symbol")
+
+    def __init__(self, contract_id, underlying, expiry, strike, option_type, trading_symbol):
+        self.id = contract_id
+        self.underlying = underlying
+        self.expiry = expiry
+        self.strike = strike
+        self.option_type = option_type
+        self.trading_symbol = trading_symbol
+
+    def __repr__(self):
+        return f"Contract({self.id}, {self.trading_symbol})"
+
+
+class ContractRegistry:
+    """
+    Compact integer ids for option contracts.
+
+    Each (underlying, expiry, strike, option type) gets one id, stored with its Groww trading
+    symbol in the database's contracts table, so ids are shared by every process on the same
+    database and stay valid across restarts (checkpointed positions, trade log). The chain, the
+    position book, the order layer and the trade log refer to contracts by id; lookups on the tick
+    path are a dict or array access. New contracts are only written when a chain brings strikes
+    or an expiry not seen before.
+    """
+    def __init__(self, db):
+        self.db = db
+        self.lock = threading.Lock()
+        self.contracts = {} # id -> Contract
+        self.ids = {} # (underlying, expiry, strike, option_type) -> id
+        self.by_symbol = {} # trading symbol -> id
+        self.chains = {} # (underlying, expiry) -> (strikes, ce ids, pe ids) of the last chain registered
+        for row in db.get_contracts():
+            self._add(*row)
+
+    def _add(self, contract_id, underlying, expiry, strike, option_type, trading_symbol):
+        contract = Contract(contract_id, underlying, expiry, float(strike), option_type, trading_symbol)
+        self.contracts[contract_id] = contract
+        self.ids[(underlying, expiry, contract.strike, option_type)] = contract_id
+        self.by_symbol[trading_symbol] = contract_id
+        return contract
+
+    def get(self, contract_id):
+        return self.contracts[contract_id]
+
+    def lookup(self, underlying, expiry, strike, option_type):
+        """Id of a registered contract, or None."""
+        return self.ids.get((underlying, expiry, float(strike), option_type))
+
+    def id_for_symbol(self, trading_symbol):
+        return self.by_symbol.get(trading_symbol)
+
+    def trading_symbol(self, contract_id):
+        return self.contracts[contract_id].trading_symbol
+
+    def register(self, underlying, expiry, strike, option_type, trading_symbol=None):
+        """Id of a contract, registering it if needed."""
+        contract_id = self.lookup(underlying, expiry, strike, option_type)
+        if contract_id is None:
+            symbol = trading_symbol or format_trading_symbol(underlying, expiry, strike, option_type)
+            self._register_many([(underlying, expiry, float(strike), option_type, symbol)])
+            contract_id = self.lookup(underlying, expiry, strike, option_type)
+        return contract_id
+
+    def register_chain(self, underlying, expiry, strikes, trading_symbols=None):
+        """
+        (CE ids, PE ids) int64 arrays aligned with `strikes`, registering unseen contracts.
+        `trading_symbols` maps (strike, option_type) to the broker's symbol where the chain has one.
+        The ids of the previous chain are reused as long as its strike ladder is unchanged.
+        """
+        strikes = np.asarray(strikes, dtype=np.float64)
+        cached = self.chains.get((underlying, expiry))
+        if cached is not None and np.array_equal(cached[0], strikes):
+            return cached[1], cached[2]
+
+        trading_symbols = trading_symbols or {}
+        missing = [
+            (underlying, expiry, float(strike), option_type,
+             trading_symbols.get((float(strike), option_type))
+             or format_trading_symbol(underlying, expiry, strike, option_type))
+            for strike in strikes for option_type in ("CE", "PE")
+            if (underlying, expiry, float(strike), option_type) not in self.ids
+        ]
+        if missing:
+            self._register_many(missing)
+
+        ids = self.ids
+        ce_ids = np.array([ids[(underlying, expiry, float(s), "CE")] for s in strikes], dtype=np.int64)
+        pe_ids = np.array([ids[(underlying, expiry, float(s), "PE")] for s in strikes], dtype=np.int64)
+        self.chains[(underlying, expiry)] = (strikes.copy(), ce_ids, pe_ids)
+        return ce_ids, pe_ids
+
+    def _register_many(self, rows):
+        # The database assigns the ids (INSERT OR IGNORE), so processes sharing it agree on them
+        with self.lock:
+            for row in self.db.register_contracts(rows):
+                if row[0] not in self.contracts:
+                    self._add(*row)
+        logger.debug(f"Registered {len(rows)} contracts")
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_contract_registry():
+    """Process-wide contract registry, backed by the trading database."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            from database import Database
+            _registry = ContractRegistry(Database())
+        return _registry
@@ -1,15 +1,130 @@
+import os
 import sqlite3
+import threading
+from contextlib import contextmanager
+from urllib.parse import quote
+
 import pandas as pd
 import config
 
+# Columns added to daily_summary for the incremental rollups
+DAILY_ROLLUP_COLUMNS = [
+    "orders_count INTEGER DEFAULT 0",
+    "wins INTEGER DEFAULT 0",
+    "losses INTEGER DEFAULT 0",
+    "charges REAL DEFAULT 0",
+    "opening_equity REAL", # Cumulative realized PnL before the day's first closed trade
+    "peak_equity REAL",
+    "closing_equity REAL",
+    "max_drawdown REAL DEFAULT 0", # Largest fall from the day's running equity peak
+]
+
+
+class ConnectionManager:
+    """
+    SQLite connections to one database file: a single writer plus a pool of read-only connections.
+
+    The file is put in WAL mode, so readers see the last committed state without waiting on the
+    writer and the writer never waits on readers. Writes are serialized on the writer connection
+    behind a lock and commit (or roll back) as one transaction. A reader is checked out by one
+    thread at a time; at most DB_READ_POOL_SIZE are open and further readers wait for one to be
+    returned. Every connection caches DB_STATEMENT_CACHE prepared statements, so the fixed query
+    strings below are compiled once per connection.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.in_memory = path == ":memory:" # Private to the writer connection, so reads go through it too
+        self.writer = self._connect(path)
+        self.writer.execute("PRAGMA journal_mode=WAL")
+        self.writer.execute("PRAGMA synchronous=NORMAL") # Durable at each WAL checkpoint; never corrupts
+        self.write_lock = threading.RLock()
+        self.idle = [] # Read-only connections not checked out
+        self.pool_lock = threading.Lock()
+        self.slots = threading.BoundedSemaphore(config.DB_READ_POOL_SIZE)
+        self.users = 0 # Database instances sharing this manager
+
+    def _connect(self, path, read_only=False):
+        if read_only:
+            path = f"file:{quote(os.path.abspath(path))}?mode=ro"
+        return sqlite3.connect(path, uri=read_only, check_same_thread=False, timeout=config.DB_BUSY_TIMEOUT,
+                               cached_statements=config.DB_STATEMENT_CACHE)
+
+    @contextmanager
+    def write(self):
+        """The writer connection; committed when the block exits, rolled back if it raises."""
+        with self.write_lock:
+            try:
+                yield self.writer
+            except BaseException:
+                self.writer.rollback()
+                raise
+            self.writer.commit()
+
+    @contextmanager
+    def read(self):
+        """A read-only connection, exclusive to the calling thread until the block exits."""
+        if self.in_memory:
+            with self.write_lock:
+                yield self.writer
+            return
+        with self.slots:
+            with self.pool_lock:
+                conn = self.idle.pop() if self.idle else None
+            if conn is None:
+                conn = self._connect(self.path, read_only=True)
+            try:
+                yield conn
+            finally:
+                with self.pool_lock:
+                    self.idle.append(conn)
+
+    def close(self):
+        with self.pool_lock:
+            for conn in self.idle:
+                conn.close()
+            self.idle = []
+        with self.write_lock:
+            self.writer.execute("PRAGMA optimize") # Refresh planner statistics for the indexes in use
+            self.writer.close()
+
+
+_managers = {}
+_managers_lock = threading.Lock()
+
+
+def _acquire_manager(path):
+    # One writer and one reader pool per database file, shared by every Database in the process
+    with _managers_lock:
+        manager = _managers.get(path)
+        if manager is None:
+            manager = _managers[path] = ConnectionManager(path)
+        manager.users += 1
+        return manager
+
+
+def _release_manager(manager):
+    with _managers_lock:
+        manager.users -= 1
+        if manager.users > 0:
+            return
+        _managers.pop(manager.path, None)
+    manager.close()
+
+
 class Database:
     def __init__(self):
-        self.conn = sqlite3.connect(config.DB_PATH, check_same_thread=False)
+        self.connections = _acquire_manager(config.DB_PATH)
         self.create_tables()
 
     def create_tables(self):
-        cursor = self.conn.cursor()
-        
+        with self.connections.write() as conn:
+            migrated = self._create_tables(conn.cursor())
+
+        if migrated or self._rollups_stale():
+            self.rebuild_rollups()
+
+    def _create_tables(self, cursor):
+        """Creates and migrates the schema. Returns True if the rollups were dropped and need a rebuild."""
         # Table for storing trades
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS trades (
@@ -32,14 +147,90 @@ class Database:
         except sqlite3.OperationalError:
             pass # Column likely already exists
 
-        # Table for storing daily summary
+        # Migration: Add charges column (per-order charges, used by the rollups)
+        try:
+            cursor.execute("ALTER TABLE trades ADD COLUMN charges REAL")
+        except sqlite3.OperationalError:
+            pass
+
+        # Migration: Add variant column (strategy variant that placed the trade, NULL for the primary strategy)
+        try:
+            cursor.execute("ALTER TABLE trades ADD COLUMN variant TEXT")
+        except sqlite3.OperationalError:
+            pass
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_trades_variant ON trades (variant, timestamp)")
+        # Trade log ordering (get_trades)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_trades_timestamp ON trades (timestamp)")
+
+        # Migration: Add contract_id column (contracts.id of the option traded; symbol keeps the trading symbol)
+        try:
+            cursor.execute("ALTER TABLE trades ADD COLUMN contract_id INTEGER")
+        except sqlite3.OperationalError:
+            pass
+
+        # Migration: Add underlying column (every underlying's worker logs into the same table)
+        try:
+            cursor.execute("ALTER TABLE trades ADD COLUMN underlying TEXT")
+        except sqlite3.OperationalError:
+            pass
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_trades_underlying ON trades (underlying, variant, timestamp)")
+
+        # Option contracts by integer id (see contracts.ContractRegistry)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS contracts (
+                id INTEGER PRIMARY KEY,
+                underlying TEXT NOT NULL,
+                expiry DATE NOT NULL,
+                strike REAL NOT NULL,
+                option_type TEXT NOT NULL,
+                trading_symbol TEXT NOT NULL,
+                UNIQUE (underlying, expiry, strike, option_type)
+            )
+        ''')
+
+        # Rollups from before they were kept per underlying are dropped here and rebuilt from the
+        # trades (see create_tables); trades of that time get their underlying filled in first
+        summary_columns = [row[1] for row in cursor.execute("PRAGMA table_info(daily_summary)")]
+        migrated = bool(summary_columns) and "underlying" not in summary_columns
+        if migrated:
+            self._backfill_trade_underlyings(cursor)
+            cursor.execute("DROP TABLE daily_summary")
+            cursor.execute("DROP TABLE IF EXISTS equity_curve")
+
+        # Table for storing daily summary (one row per underlying and day)
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS daily_summary (
-                date DATE PRIMARY KEY,
+                underlying TEXT,
+                date DATE,
+                pnl REAL,
+                trades_count INTEGER,
+                PRIMARY KEY (underlying, date)
+            )
+        ''')
+
+        # Migration: rollup columns maintained by log_trade
+        for column in DAILY_ROLLUP_COLUMNS:
+            try:
+                cursor.execute(f"ALTER TABLE daily_summary ADD COLUMN {column}")
+            except sqlite3.OperationalError:
+                pass
+
+        # Per-trade equity curve of each underlying (one row per closed trade, keyed by the closing trade's id)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS equity_curve (
+                trade_id INTEGER PRIMARY KEY,
+                underlying TEXT,
+                timestamp DATETIME,
+                date DATE,
                 pnl REAL,
-                trades_count INTEGER
+                equity REAL,
+                peak REAL,
+                drawdown REAL,
+                max_drawdown REAL
             )
         ''')
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_equity_curve_date ON equity_curve (underlying, date)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_equity_curve_underlying ON equity_curve (underlying, trade_id)")
 
         # Table for settings (API Keys)
         cursor.execute('''
@@ -48,25 +239,69 @@ class Database:
                 value TEXT
             )
         ''')
-        
-        self.conn.commit()
+        return migrated
+
+    def _backfill_trade_underlyings(self, cursor):
+        # Underlying of trades logged before the column existed: from the contract, else from the
+        # trading symbol's prefix (longest underlying name first), else the single-underlying default
+        cursor.execute('''
+            UPDATE trades SET underlying = (SELECT underlying FROM contracts WHERE contracts.id = trades.contract_id)
+            WHERE underlying IS NULL AND contract_id IS NOT NULL
+        ''')
+        for name in sorted(config.UNDERLYINGS, key=len, reverse=True):
+            cursor.execute(
+                "UPDATE trades SET underlying = ? WHERE underlying IS NULL AND symbol LIKE ? || '%'", (name, name)
+            )
+        cursor.execute("UPDATE trades SET underlying = ? WHERE underlying IS NULL", (config.SYMBOL,))
 
     def save_credential(self, key, value):
-        cursor = self.conn.cursor()
-        cursor.execute('INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)', (key, value))
-        self.conn.commit()
+        with self.connections.write() as conn:
+            conn.execute('INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)', (key, value))
 
     def get_credential(self, key):
-        cursor = self.conn.cursor()
-        cursor.execute('SELECT value FROM settings WHERE key = ?', (key,))
-        result = cursor.fetchone()
+        with self.connections.read() as conn:
+            result = conn.execute('SELECT value FROM settings WHERE key = ?', (key,)).fetchone()
         return result[0] if result else None
 
+    # --- Contracts ---
+
+    def get_contracts(self):
+        """All registered contracts as (id, underlying, expiry, strike, option_type, trading_symbol) rows."""
+        with self.connections.read() as conn:
+            return conn.execute(
+                "SELECT id, underlying, expiry, strike, option_type, trading_symbol FROM contracts"
+            ).fetchall()
+
+    def register_contracts(self, rows):
+        """
+        Inserts (underlying, expiry, strike, option_type, trading_symbol) rows not registered yet and
+        returns the stored rows, with their ids, for every underlying/expiry pair involved.
+        """
+        with self.connections.write() as conn:
+            conn.executemany('''
+                INSERT OR IGNORE INTO contracts (underlying, expiry, strike, option_type, trading_symbol)
+                VALUES (?, ?, ?, ?, ?)
+            ''', rows)
+            stored = []
+            for underlying, expiry in {(row[0], row[1]) for row in rows}:
+                stored += conn.execute('''
+                    SELECT id, underlying, expiry, strike, option_type, trading_symbol
+                    FROM contracts WHERE underlying = ? AND expiry = ?
+                ''', (underlying, expiry)).fetchall()
+        return stored
+
     def log_trade(self, trade_data):
-        cursor = self.conn.cursor()
+        charges = trade_data.get('charges')
+        if charges is None:
+            charges = config.BROKERAGE_PER_ORDER * (1 + config.GST_RATE) # One order's charges
+        with self.connections.write() as conn: # Trade and rollups land in one transaction
+            self._log_trade(conn.cursor(), trade_data, charges)
+
+    def _log_trade(self, cursor, trade_data, charges):
+        underlying = trade_data.get('underlying') or config.SYMBOL
         cursor.execute('''
-            INSERT INTO trades (symbol, order_type, transaction_type, quantity, price, status, order_id, pnl)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            INSERT INTO trades (symbol, order_type, transaction_type, quantity, price, status, order_id, pnl, charges, variant, contract_id, underlying)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         ''', (
             trade_data.get('symbol'),
             trade_data.get('order_type'),
@@ -75,23 +310,183 @@ class Database:
             trade_data.get('price'),
             trade_data.get('status'),
             trade_data.get('order_id'),
-            trade_data.get('pnl')
+            trade_data.get('pnl'),
+            charges,
+            trade_data.get('variant'),
+            trade_data.get('contract_id'),
+            underlying
         ))
-        self.conn.commit()
+        if trade_data.get('variant') is not None:
+            return # Variants' paper books are kept out of the rollups
+        trade_id = cursor.lastrowid
+        timestamp, date = cursor.execute(
+            "SELECT timestamp, date(timestamp) FROM trades WHERE id = ?", (trade_id,)
+        ).fetchone()
+        self._update_rollups(cursor, underlying, trade_id, timestamp, date, trade_data.get('pnl'), charges)
+
+    # --- Rollups ---
+    # daily_summary and equity_curve are maintained incrementally by log_trade, so performance
+    # views read O(days) or O(1) rows instead of re-aggregating the trades table.
+    # They cover the primary strategy's trades (variant IS NULL), kept separately per underlying,
+    # since each underlying's worker has its own capital and daily target.
+
+    def _update_rollups(self, cursor, underlying, trade_id, timestamp, date, pnl, charges):
+        cursor.execute('''
+            INSERT INTO daily_summary (underlying, date, pnl, trades_count, orders_count, charges)
+            VALUES (?, ?, 0, 0, 1, ?)
+            ON CONFLICT(underlying, date) DO UPDATE SET
+                orders_count = COALESCE(orders_count, 0) + 1,
+                charges = COALESCE(charges, 0) + excluded.charges
+        ''', (underlying, date, charges or 0.0))
+        if pnl is None:
+            return # Opening orders only add to the order count and charges
+
+        last = cursor.execute(
+            "SELECT equity, peak, max_drawdown FROM equity_curve WHERE underlying = ? ORDER BY trade_id DESC LIMIT 1",
+            (underlying,)
+        ).fetchone()
+        prev_equity, prev_peak, prev_max_dd = last if last else (0.0, 0.0, 0.0)
+        equity = prev_equity + pnl
+        peak = max(prev_peak, equity)
+        drawdown = peak - equity
+        max_drawdown = max(prev_max_dd, drawdown)
+        cursor.execute('''
+            INSERT INTO equity_curve (trade_id, underlying, timestamp, date, pnl, equity, peak, drawdown, max_drawdown)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (trade_id, underlying, timestamp, date, pnl, equity, peak, drawdown, max_drawdown))
+
+        day = cursor.execute(
+            "SELECT opening_equity, peak_equity, max_drawdown FROM daily_summary WHERE underlying = ? AND date = ?",
+            (underlying, date)
+        ).fetchone()
+        opening = day[0] if day[0] is not None else prev_equity
+        day_peak = max(day[1] if day[1] is not None else opening, equity)
+        day_drawdown = max(day[2] or 0.0, day_peak - equity)
+        cursor.execute('''
+            UPDATE daily_summary SET
+                pnl = COALESCE(pnl, 0) + ?,
+                trades_count = COALESCE(trades_count, 0) + 1,
+                wins = COALESCE(wins, 0) + ?,
+                losses = COALESCE(losses, 0) + ?,
+                opening_equity = ?,
+                peak_equity = ?,
+                closing_equity = ?,
+                max_drawdown = ?
+            WHERE underlying = ? AND date = ?
+        ''', (pnl, int(pnl > 0), int(pnl < 0), opening, day_peak, equity, day_drawdown, underlying, date))
+
+    def _rollups_stale(self):
+        with self.connections.read() as conn:
+            closed = conn.execute("SELECT COUNT(*) FROM trades WHERE pnl IS NOT NULL AND variant IS NULL").fetchone()[0]
+            curve = conn.execute("SELECT COUNT(*) FROM equity_curve").fetchone()[0]
+        return closed != curve
+
+    def rebuild_rollups(self):
+        """Recomputes daily_summary and equity_curve from the trades table (e.g. for pre-existing history)."""
+        with self.connections.write() as conn:
+            self._rebuild_rollups(conn.cursor())
+
+    def _rebuild_rollups(self, cursor):
+        cursor.execute("DELETE FROM daily_summary")
+        cursor.execute("DELETE FROM equity_curve")
+        default_charges = config.BROKERAGE_PER_ORDER * (1 + config.GST_RATE)
+        rows = cursor.execute(
+            "SELECT underlying, id, timestamp, date(timestamp), pnl, charges FROM trades WHERE variant IS NULL ORDER BY id"
+        ).fetchall()
+        for underlying, trade_id, timestamp, date, pnl, charges in rows:
+            self._update_rollups(cursor, underlying or config.SYMBOL, trade_id, timestamp, date, pnl,
+                                 charges if charges is not None else default_charges)
 
     def get_trades(self):
-        return pd.read_sql_query("SELECT * FROM trades ORDER BY timestamp DESC", self.conn)
-
-    def get_todays_pnl(self):
-        cursor = self.conn.cursor()
-        # SQLite 'date(timestamp)' extracts the date part. 'now' is UTC. 
-        # If you need local time, you might need 'date(timestamp, "localtime")'
-        cursor.execute("SELECT SUM(pnl) FROM trades WHERE date(timestamp) = date('now')")
-        result = cursor.fetchone()
+        with self.connections.read() as conn:
+            return pd.read_sql_query("SELECT * FROM trades ORDER BY timestamp DESC", conn)
+
+    def get_trades_page(self, before_id=None, limit=50):
+        """Newest-first page of trades below `before_id` (keyset pagination on the primary key)."""
+        with self.connections.read() as conn:
+            if before_id is None:
+                return pd.read_sql_query("SELECT * FROM trades ORDER BY id DESC LIMIT ?", conn, params=(limit,))
+            return pd.read_sql_query(
+                "SELECT * FROM trades WHERE id < ? ORDER BY id DESC LIMIT ?", conn, params=(before_id, limit)
+            )
+
+    # Performance reads are per underlying (default: config.SYMBOL, the app's underlying)
+
+    def get_todays_pnl(self, variant=None, underlying=None):
+        underlying = underlying or config.SYMBOL
+        with self.connections.read() as conn:
+            if variant is not None:
+                # Variant books: an index range scan over today's rows of that variant
+                result = conn.execute(
+                    "SELECT SUM(pnl) FROM trades WHERE underlying = ? AND variant = ? AND timestamp >= date('now')",
+                    (underlying, variant)
+                ).fetchone()
+                return result[0] if result and result[0] is not None else 0.0
+            # SQLite 'date(timestamp)' extracts the date part. 'now' is UTC. 
+            # If you need local time, you might need 'date(timestamp, "localtime")'
+            # Read from the daily rollup (one primary-key lookup) rather than summing trades
+            result = conn.execute(
+                "SELECT pnl FROM daily_summary WHERE underlying = ? AND date = date('now')", (underlying,)
+            ).fetchone()
         return result[0] if result and result[0] is not None else 0.0
 
-    def get_daily_summary(self):
-        return pd.read_sql_query("SELECT * FROM daily_summary ORDER BY date DESC", self.conn)
+    def get_daily_summary(self, limit=None, underlying=None):
+        """Daily rollups, newest first, with win rate derived from the stored counts."""
+        query = '''
+            SELECT date, pnl, trades_count, orders_count, wins, losses,
+                   CASE WHEN trades_count > 0 THEN 1.0 * wins / trades_count END AS win_rate,
+                   charges, opening_equity, closing_equity, max_drawdown
+            FROM daily_summary WHERE underlying = ? ORDER BY date DESC
+        '''
+        params = [underlying or config.SYMBOL]
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        with self.connections.read() as conn:
+            return pd.read_sql_query(query, conn, params=params)
+
+    def get_equity_curve(self, since_date=None, limit=None, underlying=None):
+        """
+        Per-trade cumulative realized PnL with running peak and drawdown, oldest first.
+        `limit` keeps only the most recent points (a backwards index scan, O(limit)).
+        """
+        query = "SELECT * FROM equity_curve WHERE underlying = ?"
+        params = [underlying or config.SYMBOL]
+        if since_date is not None:
+            query += " AND date >= ?"
+            params.append(since_date)
+        if limit is not None:
+            query = f"SELECT * FROM ({query} ORDER BY trade_id DESC LIMIT ?)"
+            params.append(limit)
+        with self.connections.read() as conn:
+            return pd.read_sql_query(query + " ORDER BY trade_id", conn, params=params)
+
+    def get_performance_summary(self, underlying=None):
+        """All-time totals from the daily rollups (O(days)) plus the latest equity point (O(1))."""
+        underlying = underlying or config.SYMBOL
+        with self.connections.read() as conn:
+            pnl, trades, wins, charges, days = conn.execute(
+                "SELECT SUM(pnl), SUM(trades_count), SUM(wins), SUM(charges), COUNT(*) FROM daily_summary "
+                "WHERE underlying = ?", (underlying,)
+            ).fetchone()
+            last = conn.execute(
+                "SELECT equity, drawdown, max_drawdown FROM equity_curve WHERE underlying = ? "
+                "ORDER BY trade_id DESC LIMIT 1", (underlying,)
+            ).fetchone()
+        equity, drawdown, max_drawdown = last if last else (0.0, 0.0, 0.0)
+        return {
+            "pnl": pnl or 0.0,
+            "trades": trades or 0,
+            "win_rate": (wins or 0) / trades if trades else None,
+            "charges": charges or 0.0,
+            "days": days,
+            "equity": equity,
+            "drawdown": drawdown,
+            "max_drawdown": max_drawdown,
+        }
 
     def close(self):
-        self.conn.close()
+        # The connections are shared with other Database instances; closed with the last one
+        if self.connections is not None:
+            _release_manager(self.connections)
+            self.connections = None
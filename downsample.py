@@ -0,0 +1,139 @@
+import numpy as np
+
+METHODS = ("lttb", "minmax")
+
+
+def _bucket_edges(n, buckets):
+    return np.linspace(0, n, buckets + 1).astype(np.int64)
+
+
+def lttb(x, y, threshold):
+    """
+    Largest-Triangle-Three-Buckets: indices of `threshold` points that preserve the visual shape of y(x).
+    The first and last points are always kept.
+    """
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    # Interior points are split into threshold - 2 buckets
+    edges = 1 + _bucket_edges(n - 2, threshold - 2)
+    out = np.empty(threshold, dtype=np.int64)
+    out[0] = 0
+    out[-1] = n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            next_x = x[edges[i + 1]:edges[i + 2]].mean()
+            next_y = y[edges[i + 1]:edges[i + 2]].mean()
+        else:
+            next_x, next_y = x[-1], y[-1]
+        # Point of this bucket forming the largest triangle with the previous pick and the next bucket's mean
+        area = np.abs((x[a] - next_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (next_y - y[a]))
+        a = start + int(np.argmax(area))
+        out[i + 1] = a
+    return out
+
+
+def minmax(y, buckets):
+    """Indices of the minimum and maximum of y in each of `buckets` equal buckets, in order."""
+    n = len(y)
+    if 2 * buckets >= n:
+        return np.arange(n)
+    y = np.asarray(y, dtype=np.float64)
+    starts = _bucket_edges(n, buckets)[:-1]
+    lows = np.minimum.reduceat(y, starts)
+    highs = np.maximum.reduceat(y, starts)
+    bucket = np.repeat(np.arange(buckets), np.diff(np.append(starts, n)))
+    # First index in each bucket reaching its min / max
+    is_low = np.flatnonzero(y == lows[bucket])
+    is_high = np.flatnonzero(y == highs[bucket])
+    first_low = is_low[np.unique(bucket[is_low], return_index=True)[1]]
+    first_high = is_high[np.unique(bucket[is_high], return_index=True)[1]]
+    return np.unique(np.concatenate((first_low, first_high)))
+
+
+def select(x, y, points, method="lttb"):
+    """Indices of at most ~`points` samples of y, skipping NaNs (e.g. indicator warm-up)."""
+    if method not in METHODS:
+        raise ValueError(f"Unknown downsampling method '{method}'. Available: {', '.join(METHODS)}")
+    valid = np.flatnonzero(~np.isnan(y))
+    if method == "lttb":
+        return valid[lttb(x[valid], y[valid], points)]
+    return valid[minmax(y[valid], points // 2)]
+
+
+def bucket_ohlc(ts, open_, high, low, close, buckets):
+    """Merges consecutive bars into `buckets` candles (first open, max high, min low, last close)."""
+    n = len(ts)
+    if buckets >= n:
+        return ts, open_, high, low, close
+    starts = _bucket_edges(n, buckets)[:-1]
+    ends = np.append(starts[1:], n) - 1
+    return (ts[starts], open_[starts], np.maximum.reduceat(high, starts),
+            np.minimum.reduceat(low, starts), close[ends])
+
+
+class DownsampledHistory:
+    """
+    Chart-ready downsample of a candle + indicator frame whose last row is the forming bar.
+
+    Closed bars are downsampled once and cached until a new bar closes (or the source window
+    changes); each refresh in between only appends the forming bar, so the per-refresh cost and
+    the number of plotted points do not depend on how much history is loaded.
+    """
+    def __init__(self, lines, points, candles, method="lttb", companions=None):
+        self.lines = list(lines) # Indicator columns to draw as lines
+        self.companions = companions or {} # Line column -> columns sampled at the same rows (e.g. direction)
+        self.points = points
+        self.candles = candles
+        self.method = method
+        self._key = None
+        self._history = None
+
+    def update(self, frame):
+        """
+        Returns {"candles": {"ts", "open", "high", "low", "close"}, "lines": {column: {"ts", column, *companions}}}
+        covering the whole frame.
+        """
+        closed = frame.iloc[:-1]
+        key = (len(closed), closed.index[0], closed.index[-1]) if len(closed) else None
+        if key != self._key:
+            self._history = self._downsample(closed)
+            self._key = key
+        forming = frame.iloc[-1:]
+        candles = {name: np.concatenate((values, self._column(forming, name)))
+                   for name, values in self._history["candles"].items()}
+        lines = {}
+        for column, series in self._history["lines"].items():
+            if np.isnan(self._column(forming, column)[0]):
+                lines[column] = series
+            else:
+                lines[column] = {name: np.concatenate((values, self._column(forming, name)))
+                                 for name, values in series.items()}
+        return {"candles": candles, "lines": lines}
+
+    @staticmethod
+    def _column(frame, name):
+        if name == "ts":
+            return frame.index.to_numpy()
+        return frame[name].to_numpy(dtype=np.float64)
+
+    def _downsample(self, closed):
+        ts = closed.index.to_numpy()
+        x = ts.astype("datetime64[s]").astype(np.float64)
+        ohlc = bucket_ohlc(ts, *(self._column(closed, c) for c in ("open", "high", "low", "close")), self.candles)
+        candles = dict(zip(("ts", "open", "high", "low", "close"), ohlc))
+        lines = {}
+        for column in self.lines:
+            if column not in closed.columns:
+                continue
+            values = self._column(closed, column)
+            idx = select(x, values, self.points, self.method)
+            lines[column] = {"ts": ts[idx], column: values[idx]}
+            for companion in self.companions.get(column, ()):
+                if companion in closed.columns:
+                    lines[column][companion] = self._column(closed, companion)[idx]
+        return {"candles": candles, "lines": lines}
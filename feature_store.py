@@ -0,0 +1,211 @@
+import hashlib
+import inspect
+import json
+import sqlite3
+import threading
+
+import numpy as np
+import pandas as pd
+
+import config
+from features import FEATURE_COLUMNS, FEATURE_SCHEMA_VERSION
+from logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+def feature_version(fn):
+    """
+    Version tag of a feature definition: a hash of the function's source plus the feature schema
+    (features.FEATURE_SCHEMA_VERSION and its columns). Any change to either starts a new feature set.
+    """
+    try:
+        source = inspect.getsource(fn)
+    except (OSError, TypeError):
+        source = getattr(fn, "__qualname__", repr(fn))
+    schema = f"{FEATURE_SCHEMA_VERSION}:{','.join(FEATURE_COLUMNS)}"
+    return hashlib.sha1(f"{source}\n{schema}".encode()).hexdigest()[:12]
+
+
+def frame_epoch(frame):
+    """Naive local epoch seconds of a DatetimeIndex (same clock as candles.CANDLE_DTYPE['ts'])."""
+    return frame.index.to_numpy(dtype="datetime64[s]").astype(np.int64)
+
+
+class FeatureStore:
+    """
+    Append-only store of computed feature rows per (symbol, interval, feature version, candle ts).
+
+    Each row is kept as one float64 blob, with the column list stored once per feature set, so
+    reading months of features is a single indexed range scan plus np.frombuffer. Rows are never
+    rewritten: only candles newer than the last stored one are appended.
+    """
+    def __init__(self, path=None):
+        self.path = path or config.FEATURE_STORE_PATH
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.lock = threading.Lock()
+        self._columns = {}
+        self.create_tables()
+
+    def create_tables(self):
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS feature_sets (
+                symbol TEXT,
+                interval TEXT,
+                version TEXT,
+                columns TEXT,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (symbol, interval, version)
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS feature_rows (
+                symbol TEXT,
+                interval TEXT,
+                version TEXT,
+                ts INTEGER,
+                data BLOB,
+                PRIMARY KEY (symbol, interval, version, ts)
+            ) WITHOUT ROWID
+        ''')
+        self.conn.commit()
+
+    # --- Metadata ---
+
+    def columns(self, symbol, interval, version):
+        """Column names of a feature set, or None if nothing has been stored for it."""
+        key = (symbol, interval, version)
+        if key not in self._columns:
+            with self.lock:
+                row = self.conn.execute(
+                    "SELECT columns FROM feature_sets WHERE symbol = ? AND interval = ? AND version = ?", key
+                ).fetchone()
+            if row is None:
+                return None
+            self._columns[key] = json.loads(row[0])
+        return self._columns[key]
+
+    def last_ts(self, symbol, interval, version):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT MAX(ts) FROM feature_rows WHERE symbol = ? AND interval = ? AND version = ?",
+                (symbol, interval, version),
+            ).fetchone()
+        return row[0] if row and row[0] is not None else None
+
+    def count(self, symbol, interval, version):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT COUNT(*) FROM feature_rows WHERE symbol = ? AND interval = ? AND version = ?",
+                (symbol, interval, version),
+            ).fetchone()
+        return row[0]
+
+    # --- Writes ---
+
+    def append(self, symbol, interval, version, frame, only_new=True):
+        """
+        Appends the rows of a feature frame (DatetimeIndex, numeric columns) that are newer than
+        the last stored candle. Returns the number of rows written. Backfills of older history
+        pass only_new=False; rows that already exist are never overwritten.
+        """
+        if frame is None or frame.empty:
+            return 0
+        key = (symbol, interval, version)
+        columns = self.columns(*key)
+        if columns is None:
+            columns = [c for c in frame.columns if pd.api.types.is_numeric_dtype(frame[c])]
+            with self.lock:
+                self.conn.execute(
+                    "INSERT OR IGNORE INTO feature_sets (symbol, interval, version, columns) VALUES (?, ?, ?, ?)",
+                    (*key, json.dumps(columns)),
+                )
+                self.conn.commit()
+            self._columns[key] = columns
+
+        ts = frame_epoch(frame)
+        last = self.last_ts(*key) if only_new else None
+        if last is not None:
+            new = ts > last
+            frame, ts = frame[new], ts[new]
+        if len(ts) == 0:
+            return 0
+
+        values = frame.reindex(columns=columns).to_numpy(dtype=np.float64, na_value=np.nan)
+        rows = [(*key, int(t), row.tobytes()) for t, row in zip(ts, values)]
+        with self.lock:
+            cursor = self.conn.executemany(
+                "INSERT OR IGNORE INTO feature_rows (symbol, interval, version, ts, data) VALUES (?, ?, ?, ?, ?)", rows
+            )
+            self.conn.commit()
+        return cursor.rowcount
+
+    # --- Reads ---
+
+    def load(self, symbol, interval, version, start=None, end=None, dtype=np.float64, limit=None):
+        """
+        Stored features as (ts, columns, matrix) in candle order. `start`/`end` are inclusive
+        epoch-second bounds. `dtype=np.float32` halves the memory of large reads.
+        """
+        columns = self.columns(symbol, interval, version)
+        if columns is None:
+            return np.empty(0, dtype=np.int64), [], np.empty((0, 0), dtype=dtype)
+
+        query = "SELECT ts, data FROM feature_rows WHERE symbol = ? AND interval = ? AND version = ?"
+        params = [symbol, interval, version]
+        if start is not None:
+            query += " AND ts >= ?"
+            params.append(int(start))
+        if end is not None:
+            query += " AND ts <= ?"
+            params.append(int(end))
+        query += " ORDER BY ts"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(int(limit))
+
+        with self.lock:
+            rows = self.conn.execute(query, params).fetchall()
+        ts = np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows))
+        matrix = np.frombuffer(bytearray().join(r[1] for r in rows), dtype=np.float64).reshape(len(rows), len(columns))
+        return ts, columns, matrix.astype(dtype, copy=False)
+
+    def iter_chunks(self, symbol, interval, version, chunk_rows=None, start=None, end=None, dtype=np.float32):
+        """
+        Yields (ts, matrix) chunks of at most `chunk_rows` rows in candle order, paging on the
+        timestamp key, so months of features can be streamed without loading them all at once.
+        """
+        chunk_rows = chunk_rows or config.WALK_FORWARD_CHUNK_ROWS
+        cursor = None if start is None else int(start) - 1
+        while True:
+            ts, _, matrix = self.load(symbol, interval, version, start=None if cursor is None else cursor + 1,
+                                      end=end, dtype=dtype, limit=chunk_rows)
+            if len(ts) == 0:
+                return
+            yield ts, matrix
+            if len(ts) < chunk_rows:
+                return
+            cursor = int(ts[-1])
+
+    def load_frame(self, symbol, interval, version, start=None, end=None):
+        """DataFrame of stored features indexed like the candle frames (DatetimeIndex "datetime")."""
+        ts, columns, matrix = self.load(symbol, interval, version, start, end)
+        index = pd.DatetimeIndex(ts.astype("datetime64[s]"), name="datetime")
+        return pd.DataFrame(matrix, index=index, columns=columns)
+
+    def close(self):
+        self.conn.close()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_feature_store():
+    """Process-wide feature store, shared by every session."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = FeatureStore()
+        return _store
@@ -0,0 +1,248 @@
+import numpy as np
+import pandas as pd
+
+from candles import OHLCV
+
+# Bump whenever an indicator's definition or the column order changes: it is part of the feature
+# version (feature_store.feature_version), so stored features and models of the old schema are
+# never mixed with the new one.
+FEATURE_SCHEMA_VERSION = 2 # 2: RSI/ATR/ADX/Supertrend smoothing matches pandas_ta (adjusted EWM)
+
+# Indicator columns, in array order. Names follow the pandas_ta convention used by earlier versions.
+FEATURE_COLUMNS = [
+    "RSI",
+    "MACD_12_26_9", "MACDh_12_26_9", "MACDs_12_26_9",
+    "BBL_20_2.0", "BBM_20_2.0", "BBU_20_2.0", "BBB_20_2.0", "BBP_20_2.0",
+    "ADX_14", "DMP_14", "DMN_14",
+    "ATR",
+    "SMA_20", "SMA_50",
+    "SUPERT_7_3.0", "SUPERTd_7_3.0", "SUPERTl_7_3.0", "SUPERTs_7_3.0",
+    "Returns", "RSI_Slope",
+    "Body_Size", "Upper_Wick", "Lower_Wick", "Candle_Color",
+]
+FRAME_COLUMNS = OHLCV + FEATURE_COLUMNS # One feature row: the candle, then its indicators
+COLUMN_INDEX = {name: i for i, name in enumerate(FRAME_COLUMNS)}
+
+# Column names the strategy and charts read
+BOLLINGER = ("BBL_20_2.0", "BBM_20_2.0", "BBU_20_2.0")
+SUPERTREND = "SUPERT_7_3.0"
+SUPERTREND_DIRECTION = "SUPERTd_7_3.0"
+
+SMOOTHING_BLOCK = 64 # Rows per vectorized block of a recursive filter (bounds d**-k in _smooth)
+STD_CHUNK = 16384 # Rows per rolling-window chunk (bounds the window temporaries)
+
+
+def _smooth(x, alpha, seed_index, seed, out):
+    """
+    Exponential smoothing y[t] = y[t-1] + alpha * (x[t] - y[t-1]) from y[seed_index] = seed; NaN before.
+
+    The recursion is solved in closed form within blocks of SMOOTHING_BLOCK rows (a scaled
+    cumulative sum), so only one scalar carry per block is propagated in Python.
+    """
+    n = len(x)
+    out[:seed_index] = np.nan
+    if seed_index >= n:
+        return out
+    out[seed_index] = seed
+    m = n - seed_index - 1
+    if m == 0:
+        return out
+    decay = 1.0 - alpha
+    blocks = -(-m // SMOOTHING_BLOCK)
+    k = np.arange(SMOOTHING_BLOCK)
+    part = np.zeros(blocks * SMOOTHING_BLOCK)
+    part[:m] = x[seed_index + 1:]
+    part = part.reshape(blocks, SMOOTHING_BLOCK)
+    # Zero-start response within each block: alpha * decay**k * cumsum(x_j * decay**-j)
+    part *= decay ** -k
+    np.cumsum(part, axis=1, out=part)
+    part *= alpha * decay ** k
+    # Each block starts from the previous block's last value
+    carry = np.empty(blocks)
+    block_decay = decay ** SMOOTHING_BLOCK
+    previous = seed
+    for b, end in enumerate(part[:, -1].tolist()):
+        carry[b] = previous
+        previous = end + block_decay * previous
+    part += carry[:, None] * decay ** (k + 1)
+    out[seed_index + 1:] = part.ravel()[:m]
+    return out
+
+
+def _ema(x, length, out, start=0):
+    """EMA of x[start:] seeded with the SMA of its first `length` values (pandas_ta's default)."""
+    seed_index = start + length - 1
+    seed = x[start:seed_index + 1].mean() if seed_index < len(x) else np.nan
+    return _smooth(x, 2.0 / (length + 1), seed_index, seed, out)
+
+
+def _rma(x, length, out, start=0):
+    """
+    Wilder's moving average of x[start:] as pandas_ta computes it: an adjusted EWM (alpha = 1/length,
+    ewm(adjust=True)) from x[start], NaN until `length` values are in. Unlike an SMA-seeded RMA the
+    warm-up rows weight every value seen so far, which is what the indicators were tuned on.
+    """
+    n = len(x)
+    alpha = 1.0 / length
+    if start >= n:
+        out[:] = np.nan
+        return out
+    # The adjusted EWM is the plain recursion started at alpha * x[start], divided by the weight
+    # mass seen so far: 1 - (1 - alpha) ** (rows since start)
+    _smooth(x, alpha, start, alpha * x[start], out)
+    out[start:] /= -np.expm1(np.arange(1, n - start + 1) * np.log1p(-alpha))
+    out[:min(start + length - 1, n)] = np.nan
+    return out
+
+
+def _sma(x, length, out):
+    cumulative = np.concatenate(([0.0], np.cumsum(x)))
+    out[:length - 1] = np.nan
+    np.subtract(cumulative[length:], cumulative[:-length], out=out[length - 1:])
+    out[length - 1:] /= length
+    return out
+
+
+def _rolling_std(x, length, out):
+    """Population standard deviation over `length` rows, in chunks so temporaries stay small."""
+    out[:length - 1] = np.nan
+    windows = np.lib.stride_tricks.sliding_window_view(x, length)
+    for lo in range(0, len(windows), STD_CHUNK):
+        np.std(windows[lo:lo + STD_CHUNK], axis=1, out=out[length - 1 + lo:length - 1 + lo + STD_CHUNK])
+    return out
+
+
+def _supertrend(high, low, close, atr, multiplier, length, trend, direction):
+    # Band ratchet of pandas_ta.supertrend; sequential by nature, so it runs on plain floats
+    n = len(close)
+    trend[:] = np.nan
+    direction[:] = np.nan
+    if n <= length:
+        return
+    mid = (high + low) / 2
+    band = multiplier * atr
+    out_trend = []
+    out_dir = []
+    d = 1
+    prev_upper = mid[length - 1] + band[length - 1]
+    prev_lower = mid[length - 1] - band[length - 1]
+    for c, up, lo in zip(close[length:].tolist(), (mid + band)[length:].tolist(), (mid - band)[length:].tolist()):
+        if c > prev_upper:
+            d = 1
+        elif c < prev_lower:
+            d = -1
+        elif d == 1: # Bands only ratchet towards price while the trend holds
+            if lo < prev_lower:
+                lo = prev_lower
+        elif up > prev_upper:
+            up = prev_upper
+        out_trend.append(lo if d == 1 else up)
+        out_dir.append(d)
+        prev_upper, prev_lower = up, lo
+    trend[length:] = out_trend
+    direction[length:] = out_dir
+
+
+def build_features(data, out=None):
+    """
+    Writes the candles and every indicator of FEATURE_COLUMNS into one (rows, FRAME_COLUMNS) float64 array.
+
+    `data` is a candle array (candles.CANDLE_DTYPE) or a DataFrame with OHLCV columns. `out` may be
+    a preallocated array to fill (e.g. a memmap for years of history); otherwise one is allocated
+    column-major, so every column is contiguous and feature_frame() wraps it without a copy.
+    Indicators are computed column by column with NumPy and written in place, so the cost is a
+    few passes over memory per indicator rather than a frame rebuild per indicator. Rows before an
+    indicator's warm-up is complete are NaN. Definitions follow pandas_ta's defaults: SMA-seeded
+    EMA for MACD, adjusted-EWM RMA for RSI/ATR/ADX/Supertrend, population std for the bands.
+    """
+    n = len(data)
+    if out is None:
+        out = np.empty((n, len(FRAME_COLUMNS)), dtype=np.float64, order="F")
+    for i, name in enumerate(OHLCV):
+        out[:, i] = data[name]
+    col = {name: out[:, i] for i, name in enumerate(FRAME_COLUMNS)} # Column views into `out`
+    o, h, l, c = col["open"], col["high"], col["low"], col["close"]
+    if n < 2:
+        out[:, len(OHLCV):] = np.nan
+        return out
+
+    # True range and directional movement (row 0 has no previous bar)
+    tr = np.empty(n)
+    tr[0] = h[0] - l[0]
+    np.maximum(h[1:], c[:-1], out=tr[1:])
+    tr[1:] -= np.minimum(l[1:], c[:-1])
+    up = np.zeros(n)
+    down = np.zeros(n)
+    np.subtract(h[1:], h[:-1], out=up[1:])
+    np.subtract(l[:-1], l[1:], out=down[1:])
+    plus_dm = np.where((up > down) & (up > 0), up, 0.0)
+    minus_dm = np.where((down > up) & (down > 0), down, 0.0)
+
+    # RSI (14, Wilder)
+    delta = np.zeros(n)
+    np.subtract(c[1:], c[:-1], out=delta[1:])
+    gain = _rma(np.maximum(delta, 0.0), 14, np.empty(n), start=1)
+    loss = _rma(np.maximum(-delta, 0.0), 14, np.empty(n), start=1)
+    total = gain + loss
+    with np.errstate(invalid="ignore", divide="ignore"):
+        np.divide(100.0 * gain, total, out=col["RSI"])
+    col["RSI"][total == 0] = 50.0
+
+    # MACD (12, 26, 9)
+    fast = _ema(c, 12, np.empty(n))
+    _ema(c, 26, col["MACD_12_26_9"])
+    np.subtract(fast, col["MACD_12_26_9"], out=col["MACD_12_26_9"])
+    _ema(np.nan_to_num(col["MACD_12_26_9"]), 9, col["MACDs_12_26_9"], start=25)
+    np.subtract(col["MACD_12_26_9"], col["MACDs_12_26_9"], out=col["MACDh_12_26_9"])
+
+    # Bollinger Bands (20, 2.0)
+    mid, lower, upper = col["BBM_20_2.0"], col["BBL_20_2.0"], col["BBU_20_2.0"]
+    _sma(c, 20, mid)
+    std = _rolling_std(c, 20, np.empty(n)) if n >= 20 else np.full(n, np.nan)
+    np.subtract(mid, 2.0 * std, out=lower)
+    np.add(mid, 2.0 * std, out=upper)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        np.divide(100.0 * (upper - lower), mid, out=col["BBB_20_2.0"])
+        np.divide(c - lower, upper - lower, out=col["BBP_20_2.0"])
+
+    # ATR (14) and ADX (14)
+    _rma(tr, 14, col["ATR"], start=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        np.divide(100.0 * _rma(plus_dm, 14, np.empty(n), start=1), col["ATR"], out=col["DMP_14"])
+        np.divide(100.0 * _rma(minus_dm, 14, np.empty(n), start=1), col["ATR"], out=col["DMN_14"])
+        dx = 100.0 * np.abs(col["DMP_14"] - col["DMN_14"]) / (col["DMP_14"] + col["DMN_14"])
+    _rma(np.nan_to_num(dx), 14, col["ADX_14"], start=14)
+
+    # Moving averages
+    _sma(c, 20, col["SMA_20"])
+    _sma(c, 50, col["SMA_50"])
+
+    # Supertrend (7, 3.0): value, direction (1 bullish, -1 bearish), and the value split by direction
+    atr7 = _rma(tr, 7, np.empty(n), start=1)
+    _supertrend(h, l, c, atr7, 3.0, 7, col[SUPERTREND], col[SUPERTREND_DIRECTION])
+    np.copyto(col["SUPERTl_7_3.0"], np.where(col[SUPERTREND_DIRECTION] == 1, col[SUPERTREND], np.nan))
+    np.copyto(col["SUPERTs_7_3.0"], np.where(col[SUPERTREND_DIRECTION] == -1, col[SUPERTREND], np.nan))
+
+    # Momentum / Returns
+    col["Returns"][0] = np.nan
+    np.divide(c[1:], c[:-1], out=col["Returns"][1:])
+    col["Returns"][1:] -= 1.0
+    col["RSI_Slope"][0] = np.nan
+    np.subtract(col["RSI"][1:], col["RSI"][:-1], out=col["RSI_Slope"][1:])
+
+    # Candle Patterns (Price Action)
+    np.abs(c - o, out=col["Body_Size"])
+    np.subtract(h, np.maximum(c, o), out=col["Upper_Wick"])
+    np.subtract(np.minimum(c, o), l, out=col["Lower_Wick"])
+    np.copyto(col["Candle_Color"], np.where(c > o, 1.0, -1.0)) # 1 Green, -1 Red
+    return out
+
+
+def feature_frame(data, out=None):
+    """build_features() as a DataFrame over the same array (no copy), indexed like the candles."""
+    values = build_features(data, out)
+    if isinstance(data, pd.DataFrame):
+        index = data.index
+    else:
+        index = pd.DatetimeIndex(data["ts"].astype("datetime64[s]"), name="datetime")
+    return pd.DataFrame(values, index=index, columns=FRAME_COLUMNS, copy=False)
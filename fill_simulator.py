@@ -0,0 +1,195 @@
+import bisect
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+import config
+from contracts import get_contract_registry
+from logger import setup_logger
+
+logger = setup_logger(__name__)
+
+TICK_SIZE = 0.05 # NSE option tick size
+
+
+class ChainSnapshot:
+    """Compact copy of the option chain premiums at one point in time, keyed by contract id."""
+    __slots__ = ("ts", "ids", "ltps")
+
+    def __init__(self, ts, ids, ltps):
+        self.ts = ts
+        self.ids = ids # Sorted contract ids (CE and PE legs of every expiry recorded)
+        self.ltps = ltps
+
+    def ltp(self, contract_id):
+        idx = np.searchsorted(self.ids, contract_id)
+        if idx >= len(self.ids) or self.ids[idx] != contract_id:
+            return None
+        return float(self.ltps[idx])
+
+
+class _Decision:
+    """One simulated order decision; `costs` is set once every report latency has a snapshot."""
+    __slots__ = ("contract_id", "side", "qty", "ts", "costs", "dropped")
+
+    def __init__(self, contract_id, side, qty, ts):
+        self.contract_id = contract_id
+        self.side = side
+        self.qty = qty
+        self.ts = ts
+        self.costs = None
+        self.dropped = False # Fell out of the decision history before being settled
+
+
+class FillSimulator:
+    """
+    Paper fill model that accounts for engine latency, spread and market impact.
+
+    A decision taken at time t is filled against the first chain snapshot recorded at or after
+    t + latency, crossing half of the modelled bid/ask spread plus a size-dependent impact.
+    Every simulated decision is kept so the PnL cost of latency can be measured afterwards. The
+    report at the default latencies is maintained incrementally: a decision is replayed once, when
+    the snapshots for all of them have arrived, and its costs are added to a running total.
+    """
+    def __init__(self, latency_ms=None, spread_pct=None, min_spread=None, impact_pct_per_lot=None,
+                 lot_size=None, history=None):
+        self.latency_ms = config.FILL_LATENCY_MS if latency_ms is None else latency_ms
+        self.spread_pct = config.FILL_SPREAD_PCT if spread_pct is None else spread_pct
+        self.min_spread = config.FILL_MIN_SPREAD if min_spread is None else min_spread
+        self.impact_pct_per_lot = config.FILL_IMPACT_PCT_PER_LOT if impact_pct_per_lot is None else impact_pct_per_lot
+        self.lot_size = lot_size or config.UNDERLYINGS[config.SYMBOL]["lot_size"]
+
+        history = history or config.FILL_SNAPSHOT_HISTORY
+        self._snapshots = deque(maxlen=history)
+        self._snapshot_ts = deque(maxlen=history) # Parallel list of timestamps for bisect
+        self._decisions = deque(maxlen=history)
+        self._unsettled = deque() # Decisions whose report costs are not final yet, oldest first
+        self._report_latencies = list(config.FILL_REPORT_LATENCIES_MS)
+        self._settled_costs = np.zeros(len(self._report_latencies)) # Sum over settled decisions in history
+        self._cond = threading.Condition()
+
+    def record_chain(self, chain, ts=None):
+        """
+        Stores the premiums of a freshly fetched chain (or of several expiries' chains concatenated).
+        ts is a time.perf_counter_ns() reading.
+        """
+        if chain is None or chain.empty:
+            return
+        ids = np.concatenate([chain['ce_id'].to_numpy(dtype=np.int64), chain['pe_id'].to_numpy(dtype=np.int64)])
+        ltps = np.concatenate([chain['ce_ltp'].to_numpy(dtype=np.float64), chain['pe_ltp'].to_numpy(dtype=np.float64)])
+        order = np.argsort(ids)
+        snap = ChainSnapshot(ts if ts is not None else time.perf_counter_ns(), ids[order], ltps[order])
+        with self._cond:
+            self._snapshots.append(snap)
+            self._snapshot_ts.append(snap.ts)
+            self._cond.notify_all()
+
+    def fill_price(self, side, mid, qty):
+        """Price paid (BUY) or received (SELL) for qty contracts quoted at mid."""
+        half_spread = max(mid * self.spread_pct, self.min_spread) / 2
+        impact = mid * self.impact_pct_per_lot * (qty / self.lot_size)
+        price = mid + half_spread + impact if side == "BUY" else mid - half_spread - impact
+        return max(round(round(price / TICK_SIZE) * TICK_SIZE, 2), TICK_SIZE)
+
+    def _snapshot_at(self, decision_ts, latency_ms, ts_list=None):
+        """Snapshot seen by an order sent latency_ms after decision_ts, or None if it has not arrived yet."""
+        if ts_list is None:
+            ts_list = self._snapshot_ts # Caller holds _cond; bisect works on the deque without a copy
+        if latency_ms <= 0:
+            # Zero latency fills against the chain the decision was made on
+            idx = bisect.bisect_right(ts_list, decision_ts) - 1
+            return self._snapshots[idx] if idx >= 0 else None
+        idx = bisect.bisect_left(ts_list, decision_ts + int(latency_ms * 1e6))
+        return self._snapshots[idx] if idx < len(ts_list) else None
+
+    def simulate(self, contract_id, side, qty, decision_ts, timeout=None):
+        """
+        Blocks until the snapshot after the modelled latency is available and returns the fill price.
+        Falls back to the latest snapshot after timeout seconds. Returns None if no quote exists.
+        """
+        contract = get_contract_registry().get(contract_id)
+        timeout = config.FILL_TIMEOUT if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+
+        with self._cond:
+            snap = self._snapshot_at(decision_ts, self.latency_ms)
+            while snap is None and time.monotonic() < deadline:
+                self._cond.wait(timeout=max(deadline - time.monotonic(), 0))
+                snap = self._snapshot_at(decision_ts, self.latency_ms)
+            if snap is None and self._snapshots:
+                logger.warning(f"No chain snapshot {self.latency_ms}ms after decision for {contract.trading_symbol}, using latest")
+                snap = self._snapshots[-1]
+            self._add_decision(_Decision(contract_id, side, qty, decision_ts))
+
+        mid = snap.ltp(contract_id) if snap is not None else None
+        if not mid:
+            return None
+        return self.fill_price(side, mid, qty)
+
+    def _add_decision(self, decision):
+        if len(self._decisions) == self._decisions.maxlen:
+            oldest = self._decisions[0]
+            if oldest.costs is not None:
+                self._settled_costs -= oldest.costs
+            oldest.dropped = True
+        self._decisions.append(decision)
+        self._unsettled.append(decision)
+
+    def _settle(self):
+        # Decisions whose longest-latency snapshot has arrived can no longer change: replay them once
+        if not self._snapshot_ts:
+            return
+        horizon = self._snapshot_ts[-1] - int(max(self._report_latencies) * 1e6)
+        while self._unsettled and self._unsettled[0].ts <= horizon:
+            decision = self._unsettled.popleft()
+            if not decision.dropped:
+                decision.costs = self._decision_costs(decision, self._report_latencies)
+                self._settled_costs += decision.costs
+
+    def latency_cost_report(self, latencies_ms=None):
+        """
+        Replays every recorded decision at several latencies.
+        Returns the total adverse PnL per latency and the fitted cost per millisecond.
+        At the default latencies only decisions not settled yet are replayed.
+        """
+        if latencies_ms is not None and list(latencies_ms) != self._report_latencies:
+            with self._cond:
+                count = len(self._decisions)
+                costs = sum((self._decision_costs(d, latencies_ms) for d in self._decisions), np.zeros(len(latencies_ms)))
+        else:
+            latencies_ms = self._report_latencies
+            with self._cond:
+                count = len(self._decisions)
+                self._settle()
+                costs = self._settled_costs.copy()
+                for decision in self._unsettled:
+                    if not decision.dropped:
+                        costs += self._decision_costs(decision, latencies_ms)
+        if not count:
+            return {}
+
+        cost_per_ms = float(np.polyfit(latencies_ms, costs, 1)[0]) if len(latencies_ms) > 1 else 0.0
+        return {
+            "decisions": count,
+            "latency_ms": list(latencies_ms),
+            "pnl_cost": costs.round(2).tolist(),
+            "cost_per_ms": cost_per_ms,
+        }
+
+    def _decision_costs(self, decision, latencies_ms):
+        """Adverse PnL of one decision at each latency (0 where a snapshot or quote is missing)."""
+        costs = np.zeros(len(latencies_ms))
+        base = self._snapshot_at(decision.ts, 0)
+        p0 = base.ltp(decision.contract_id) if base is not None else None
+        if p0 is None:
+            return costs
+        for i, latency in enumerate(latencies_ms):
+            later = self._snapshot_at(decision.ts, latency)
+            p1 = later.ltp(decision.contract_id) if later is not None else None
+            if p1 is None:
+                continue
+            # Paying more on a buy or receiving less on a sell is a cost
+            costs[i] = (p1 - p0) * decision.qty if decision.side == "BUY" else (p0 - p1) * decision.qty
+        return costs
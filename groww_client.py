@@ -1,79 +1,168 @@
-from growwapi import GrowwAPI
-import pyotp
 import pandas as pd
-from datetime import datetime, timedelta
-import random
+import numpy as np
+from datetime import date, datetime, timedelta
+import itertools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 import config
+from request_layer import get_request_layer
+from token_manager import get_token_manager
+from candles import INTERVAL_MINUTES, dedupe, get_candle_store, parse_candles
+from contracts import get_contract_registry
+from scheduler import MarketCalendar
 from logger import setup_logger
 
 logger = setup_logger(__name__)
 
+
+def check_replay_stores():
+    """Raises if the replay backend would write into the live stores (config.LIVE_STORE_PATHS)."""
+    live = [
+        name for name, path in config.LIVE_STORE_PATHS.items()
+        if os.path.abspath(getattr(config, name)) == os.path.abspath(path)
+    ]
+    if live:
+        raise RuntimeError(f"Replay backend refuses the live stores ({', '.join(live)}); point them at a scratch directory")
+
+
+def last_weekday_of_month(year, month, weekday):
+    """Date of the last `weekday` (0=Mon) in the given month."""
+    first_of_next = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+    last_day = first_of_next - timedelta(days=1)
+    return last_day - timedelta(days=(last_day.weekday() - weekday) % 7)
+
+
+def expiry_dates(symbol, count, now=None, calendar=None):
+    """
+    The next `count` option expiry dates of `symbol`.
+    Expiries falling on an exchange holiday move to the previous trading day (NSE rule), and
+    today's expiry is dropped once the session has closed, so on expiry day the list already
+    reaches into the following series.
+    """
+    # Expiry weekday per underlying (NIFTY: weekly on Tuesday, others: last Tuesday of the month)
+    spec = config.UNDERLYINGS.get(symbol, config.UNDERLYINGS["NIFTY"])
+    calendar = calendar or MarketCalendar()
+    now = now or datetime.now()
+    today = now.date()
+    weekday = spec["expiry_weekday"]
+
+    def scheduled():
+        # Contract expiry days before the holiday adjustment
+        if spec.get("monthly"):
+            year, month = today.year, today.month
+            while True:
+                yield last_weekday_of_month(year, month, weekday)
+                year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+        day = today - timedelta(days=today.weekday() - weekday) if today.weekday() >= weekday else \
+            today + timedelta(days=weekday - today.weekday())
+        while True:
+            yield day
+            day += timedelta(days=7)
+
+    expiries = []
+    for day in scheduled():
+        while not calendar.is_trading_day(day):
+            day -= timedelta(days=1)
+        if day < today or (day == today and now >= calendar.session(day)[1]):
+            continue
+        expiries.append(day)
+        if len(expiries) == count:
+            return expiries
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _chain_pool():
+    # Shared by every client: concurrency is bounded here and by the request layer's rate limits
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=config.CHAIN_FETCH_WORKERS, thread_name_prefix="chain-fetch")
+        return _pool
+
+
 class GrowwClient:
     def __init__(self):
         self.api = None
         self.access_token = None
         self.db = None
+        self.tokens = None # Shared TokenManager, set on first login/connect
+        self.requests = get_request_layer() # Shared rate limiting, coalescing and caching
         # Mock Account State
-        self.positions = [] # List of dicts: {symbol, qty, buy_price, current_price, type}
+        self.positions = [] # List of dicts: {contract_id, symbol, qty, buy_price, current_price, type}
         self.realized_pnl = 0.0
         self.charges_incurred = 0.0
         self.capital = config.CAPITAL # Default mock capital
+        self._order_seq = itertools.count(1) # Monotonic mock order ids
 
     def login(self, db=None):
-        try:
-            if db:
-                self.db = db
-            
-            # Get Credentials (DB only)
-            api_key = None
-            totp_secret = None
-            
-            if self.db:
-                api_key = self.db.get_credential("API_KEY")
-                totp_secret = self.db.get_credential("TOTP_SECRET")
-                
-            if not api_key or not totp_secret:
-                logger.error("Credentials not found in Database.")
-                return False
-
-            # Always use TOTP Exchange Flow
-            totp_gen = pyotp.TOTP(totp_secret)
-            totp = totp_gen.now()
-            
-            # Exchange TOTP Token + Generated TOTP for real Access Token
-            self.access_token = GrowwAPI.get_access_token(api_key=api_key, totp=totp)
-            self.api = GrowwAPI(self.access_token)
-            
-            return True
+        """Blocking login, used at startup and by the Login button."""
+        if db:
+            self.db = db
+        if config.DATA_BACKEND == "replay":
+            return self._ensure_api()
+        if not self.db:
+            logger.error("Credentials not found in Database.")
+            return False
 
-        except Exception as e:
-            logger.error(f"Login failed: {e}")
+        self.tokens = get_token_manager(self.db)
+        if not self.tokens.login():
             self.api = None
             return False
+        return self._ensure_api()
+
+    def connect(self, db=None):
+        """Non-blocking: adopts the shared access token if one is ready, otherwise schedules a background login."""
+        if db:
+            self.db = db
+        return self._ensure_api()
+
+    def _ensure_api(self):
+        # Pick up the current shared API handle. Never blocks; refreshes happen in the background.
+        if config.DATA_BACKEND == "replay":
+            from replay import get_replay_api
+            check_replay_stores()
+            self.api = get_replay_api() # Recorded/synthetic market data, no login
+            self.access_token = "REPLAY"
+            return True
+        if self.tokens is None:
+            if self.db is None:
+                return False
+            self.tokens = get_token_manager(self.db)
+        self.api = self.tokens.get_api()
+        self.access_token = self.tokens.token if self.api is not None else None
+        return self.api is not None
+
+    def get_expiries(self, symbol="NIFTY", count=1):
+        """The next `count` expiry dates of `symbol` (YYYY-MM-DD), nearest first."""
+        return [day.strftime("%Y-%m-%d") for day in expiry_dates(symbol, count)]
 
     def get_next_expiry(self, symbol="NIFTY"):
-        # User specified Nifty expiry is Tuesday
-        today = datetime.now().date()
-        target_weekday = 1 # Tuesday
-        
-        current_weekday = today.weekday()
-        days_ahead = target_weekday - current_weekday
-        
-        if days_ahead < 0: 
-            days_ahead += 7
-        elif days_ahead == 0:
-            pass
-            
-        next_expiry = today + timedelta(days=days_ahead)
-        return next_expiry.strftime("%Y-%m-%d")
+        return self.get_expiries(symbol, 1)[0]
+
+    def get_option_chains(self, symbol="NIFTY", expiries=None):
+        """
+        {expiry: (chain, underlying LTP)} for several expiries (default: the next CHAIN_EXPIRIES),
+        fetched concurrently. Every request still goes through the shared request layer, so the
+        quota is respected and the round trips overlap instead of adding up.
+        """
+        expiries = expiries or self.get_expiries(symbol, config.CHAIN_EXPIRIES)
+        if len(expiries) == 1:
+            return {expiries[0]: self.get_option_chain(symbol, expiries[0])}
+        futures = {expiry: _chain_pool().submit(self.get_option_chain, symbol, expiry) for expiry in expiries}
+        return {expiry: future.result() for expiry, future in futures.items()}
 
-    def get_option_chain(self, symbol="NIFTY"):
-        expiry_date = self.get_next_expiry(symbol)
+    def get_option_chain(self, symbol="NIFTY", expiry_date=None):
+        expiry_date = expiry_date or self.get_next_expiry(symbol)
         
-        # Auto-login if not connected
-        if self.api is None:
-            self.login(self.db)
+        # Pick up the shared access token (never blocks on login)
+        self._ensure_api()
+
+        from growwapi import GrowwAPI # Deferred: growwapi is slow to import and unused until we fetch
 
         # Determine if we are in Mock mode
         is_mock = False
@@ -84,10 +173,14 @@ class GrowwClient:
             if not is_mock:
                 # REAL API CALL
                 logger.debug(f"Fetching REAL Option Chain for {symbol} Expiry: {expiry_date}")
-                response = self.api.get_option_chain(
-                    exchange=GrowwAPI.EXCHANGE_NSE,
-                    underlying=symbol,
-                    expiry_date=expiry_date
+                api = self.api
+                response = self.requests.call(
+                    "option_chain", (symbol, expiry_date),
+                    lambda: api.get_option_chain(
+                        exchange=GrowwAPI.EXCHANGE_NSE,
+                        underlying=symbol,
+                        expiry_date=expiry_date
+                    )
                 )
             else:
                 # Only use mock if we are strictly in mock mode (login failed)
@@ -100,6 +193,7 @@ class GrowwClient:
         # Parse Response (Common for both Real and Mock)
         try:
             rows = []
+            trading_symbols = {} # (strike, type) -> broker trading symbol, for the contract registry
             underlying_ltp = response.get("underlying_ltp", 0)
             
             # Check if response is valid
@@ -110,6 +204,9 @@ class GrowwClient:
             for strike, data in response.get("strikes", {}).items():
                 ce = data.get("CE", {})
                 pe = data.get("PE", {})
+                for option_type, leg in (("CE", ce), ("PE", pe)):
+                    if leg.get("trading_symbol"):
+                        trading_symbols[(float(strike), option_type)] = leg["trading_symbol"]
                 
                 rows.append({
                     "strike_price": float(strike),
@@ -134,6 +231,10 @@ class GrowwClient:
             df = pd.DataFrame(rows)
             if not df.empty:
                 df = df.sort_values("strike_price")
+                # Contract ids of each row's legs: positions and orders refer to contracts by id
+                df["ce_id"], df["pe_id"] = get_contract_registry().register_chain(
+                    symbol, expiry_date, df["strike_price"].to_numpy(), trading_symbols
+                )
                 
             return df, underlying_ltp
 
@@ -141,9 +242,10 @@ class GrowwClient:
             logger.error(f"Error parsing option chain: {e}")
             return pd.DataFrame(), 0.0
 
-    def place_order(self, symbol, qty, side, price=None):
+    def place_order(self, contract_id, qty, side, price=None):
         # Wrapper for placing order
-        logger.info(f"Placing {side} order for {symbol} qty {qty} at {price}")
+        contract = get_contract_registry().get(contract_id)
+        logger.info(f"Placing {side} order for {contract.trading_symbol} qty {qty} at {price}")
         
         # Calculate Charges
         brokerage = config.BROKERAGE_PER_ORDER
@@ -160,18 +262,19 @@ class GrowwClient:
             self.charges_incurred += total_charges
             
             self.positions.append({
-                "symbol": symbol,
+                "contract_id": contract_id,
+                "symbol": contract.trading_symbol,
                 "qty": qty,
                 "buy_price": price,
                 "current_price": price,
-                "type": "CE" if "CE" in symbol else "PE"
+                "type": contract.option_type
             })
-            return {"status": "success", "order_id": f"mock_buy_{random.randint(1000,9999)}"}
+            return {"status": "success", "order_id": f"mock_buy_{next(self._order_seq)}"}
             
         elif side == "SELL":
             # Find position to close
             for i, pos in enumerate(self.positions):
-                if pos["symbol"] == symbol:
+                if pos["contract_id"] == contract_id:
                     # Calculate PnL (Gross)
                     gross_pnl = (price - pos["buy_price"]) * qty
                     
@@ -193,12 +296,32 @@ class GrowwClient:
                     
                     # Remove position (assuming full exit for simplicity)
                     self.positions.pop(i)
-                    return {"status": "success", "order_id": f"mock_sell_{random.randint(1000,9999)}"}
+                    return {"status": "success", "order_id": f"mock_sell_{next(self._order_seq)}"}
             
             return {"status": "failed", "message": "Position not found"}
 
         return {"status": "failed", "message": "Invalid Side"}
 
+    def export_account(self):
+        """Paper account state, for checkpoints."""
+        next_id = next(self._order_seq)
+        self._order_seq = itertools.count(next_id)
+        return {
+            "positions": [dict(pos) for pos in self.positions],
+            "capital": self.capital,
+            "realized_pnl": self.realized_pnl,
+            "charges_incurred": self.charges_incurred,
+            "next_order_id": next_id,
+        }
+
+    def restore_account(self, account):
+        """Restores a paper account saved by export_account()."""
+        self.positions = [dict(pos) for pos in account.get("positions", [])]
+        self.capital = account.get("capital", config.CAPITAL)
+        self.realized_pnl = account.get("realized_pnl", 0.0)
+        self.charges_incurred = account.get("charges_incurred", 0.0)
+        self._order_seq = itertools.count(account.get("next_order_id", 1))
+
     def get_positions(self):
         # Fetch current positions
         return self.positions
@@ -206,10 +329,10 @@ class GrowwClient:
     def get_available_balance(self):
         return round(self.capital, 2)
 
-    def update_ltp(self, symbol, ltp):
+    def update_ltp(self, contract_id, ltp):
         """Updates the current price of a held position for PnL calculation"""
         for pos in self.positions:
-            if pos["symbol"] == symbol:
+            if pos["contract_id"] == contract_id:
                 pos["current_price"] = ltp
 
     def get_pnl(self):
@@ -223,130 +346,115 @@ class GrowwClient:
     def get_historical_data(self, symbol="NIFTY", interval="5m"):
         """
         Fetches historical data. 
-        Tries to fetch REAL data from API first. Falls back to mock if API fails.
+        Only the 1-minute base series is requested from the API (incrementally, from the last
+        stored bar); every other interval is derived locally from it.
         """
-        # Auto-login if needed
-        if self.api is None:
-            self.login(self.db)
+        if interval not in INTERVAL_MINUTES:
+            logger.warning(f"Unsupported interval {interval}, using 5m")
+            interval = "5m"
+
+        # Pick up the shared access token (never blocks on login)
+        self._ensure_api()
 
         # 1. Try Real API
         if self.api and self.api != "MOCK_API_OBJECT":
+            series = get_candle_store().get_series(symbol)
             try:
-                logger.debug(f"Fetching real historical data for {symbol}...")
-                
-                # Map interval to GrowwAPI constants
-                interval_map = {
-                    "1m": GrowwAPI.CANDLE_INTERVAL_MIN_1,
-                    "5m": GrowwAPI.CANDLE_INTERVAL_MIN_5,
-                    "15m": GrowwAPI.CANDLE_INTERVAL_MIN_15,
-                    "30m": GrowwAPI.CANDLE_INTERVAL_MIN_30,
-                    "1h": GrowwAPI.CANDLE_INTERVAL_HOUR_1,
-                    "1d": GrowwAPI.CANDLE_INTERVAL_DAY
-                }
-                api_interval = interval_map.get(interval, GrowwAPI.CANDLE_INTERVAL_MIN_5)
-                
-                # Calculate time range (last 30 days) - API limit for 5m is 30 days
-                end_dt = datetime.now()
-                start_dt = end_dt - timedelta(days=30)
-                
-                # Format dates as required by API
-                # Try including time component if date-only fails
-                start_str = start_dt.strftime("%Y-%m-%d %H:%M:%S")
-                end_str = end_dt.strftime("%Y-%m-%d %H:%M:%S")
-                
-                # Determine Symbol and Segment
-                # For NIFTY, we want the Index data
-                if symbol == "NIFTY":
-                    # The API requires 'Exchange-TradingSymbol' format
-                    target_symbol = "NSE-NIFTY"
-                    segment = GrowwAPI.SEGMENT_CASH # Indices are in Cash segment
-                else:
-                    # For other symbols, ensure format
-                    if "-" not in symbol:
-                        target_symbol = f"NSE-{symbol}"
-                    else:
-                        target_symbol = symbol
-                    segment = GrowwAPI.SEGMENT_FNO
-                
-                # print(f"Requesting History for: {target_symbol} (Segment: {segment})")
-
-                # Fetch data
-                response = self.api.get_historical_candles(
-                    exchange=GrowwAPI.EXCHANGE_NSE,
-                    segment=segment,
-                    groww_symbol=target_symbol,
-                    start_time=start_str,
-                    end_time=end_str,
-                    candle_interval=api_interval
-                )
-                
-                # Extract candles list from response
-                candles = []
-                if isinstance(response, list):
-                    candles = response
-                elif isinstance(response, dict):
-                    # Try common keys
-                    if 'candles' in response and response['candles']:
-                        candles = response['candles']
-                    elif 'data' in response and response['data']:
-                        candles = response['data']
-                
-                if candles:
-                    # Standardize columns
-                    # API might return: 'date', 'open', 'high', 'low', 'close', 'volume'
-                    # We need 'datetime' index and lowercase columns
-                    
-                    data_list = []
-                    for c in candles:
-                        # Handle list format (common in financial APIs)
-                        if isinstance(c, list):
-                            # Assuming [ts, o, h, l, c, v]
-                            # Timestamp might be unix or string
-                            ts = c[0]
-                            if isinstance(ts, (int, float)):
-                                dt = datetime.fromtimestamp(ts)
-                            else:
-                                dt = pd.to_datetime(ts)
-                                
-                            data_list.append({
-                                "datetime": dt,
-                                "open": float(c[1]) if c[1] is not None else 0.0,
-                                "high": float(c[2]) if c[2] is not None else 0.0,
-                                "low": float(c[3]) if c[3] is not None else 0.0,
-                                "close": float(c[4]) if c[4] is not None else 0.0,
-                                "volume": float(c[5]) if len(c) > 5 and c[5] is not None else 0.0
-                            })
-                        elif isinstance(c, dict):
-                            # Handle dict format
-                            data_list.append({
-                                "datetime": pd.to_datetime(c.get('time') or c.get('date')),
-                                "open": float(c.get('open') or 0),
-                                "high": float(c.get('high') or 0),
-                                "low": float(c.get('low') or 0),
-                                "close": float(c.get('close') or 0),
-                                "volume": float(c.get('volume') or 0)
-                            })
-
-                    if data_list:
-                        df = pd.DataFrame(data_list)
-                        df.set_index('datetime', inplace=True)
-                        # print(f"Successfully fetched {len(df)} real candles.")
-                        return df
-                    
+                self._refresh_base_candles(symbol, series)
             except Exception as e:
                 logger.error(f"Error fetching real historical data: {e}")
                 logger.error("Real data fetch failed.")
                 return pd.DataFrame() # Return empty to indicate failure
 
+            df = series.get(interval)
+            if not df.empty:
+                return df
+
         # 2. Mock Data Generation (Fallback) - REMOVED as per user request
         # If we reach here, it means API is not connected or failed, and we should NOT use mock data.
         logger.warning("Real Data Fetch Failed. Returning Empty DataFrame. Please Login.")
+        return pd.DataFrame()
+
+    def get_candles(self, symbol="NIFTY", interval="5m"):
+        """Candles derived from the already fetched 1-minute series (no API call), as a DataFrame."""
+        return get_candle_store().get_series(symbol).get(interval)
+
+    def get_candle_view(self, symbol="NIFTY", interval="5m"):
+        """Zero-copy structured array of candles (no API call). Valid until the next fetch."""
+        return get_candle_store().get_series(symbol).view(interval)
+
+    def _refresh_base_candles(self, symbol, series):
+        # Backfill the lookback window on first use, afterwards only fetch from the last
+        # stored bar onwards (re-fetching it, since it may still have been forming)
+        end_dt = datetime.now()
+        last = series.last_timestamp
+        if last is None:
+            start_dt = end_dt - timedelta(days=config.CANDLE_BASE_LOOKBACK_DAYS)
+        else:
+            start_dt = last.to_pydatetime()
+
+        # 1-minute requests are limited in range, so long backfills are split into windows
+        window = timedelta(days=config.CANDLE_1M_MAX_DAYS_PER_REQUEST)
+        chunks = []
+        while start_dt < end_dt:
+            chunk_end = min(start_dt + window, end_dt)
+            chunks.append(self.fetch_candles(symbol, start_dt, chunk_end))
+            start_dt = chunk_end
+
+        bars = np.concatenate(chunks) if chunks else None
+        if bars is not None and len(bars):
+            series.update(dedupe(bars[np.argsort(bars["ts"], kind="stable")]))
 
+    def fetch_candles(self, symbol, start_dt, end_dt):
         """
-        # OLD MOCK DATA CODE (Disabled)
-        # Generate Mock Data for last 60 days
-        data = []
-        price = 25800.0 # Starting price
-        ...
+        1-minute candles of [start_dt, end_dt] as a sorted CANDLE_DTYPE array, in one request (the range
+        is limited to CANDLE_1M_MAX_DAYS_PER_REQUEST). Not merged into the candle store.
         """
-        return pd.DataFrame()
+        from growwapi import GrowwAPI
+
+        logger.debug(f"Fetching real 1m candles for {symbol} from {start_dt}...")
+
+        # Format dates as required by API
+        start_str = start_dt.strftime("%Y-%m-%d %H:%M:%S")
+        end_str = end_dt.strftime("%Y-%m-%d %H:%M:%S")
+        
+        # Determine Symbol and Segment
+        # For index underlyings, we want the Index data
+        if symbol in config.UNDERLYINGS:
+            # The API requires 'Exchange-TradingSymbol' format
+            target_symbol = config.UNDERLYINGS[symbol]["groww_symbol"]
+            segment = GrowwAPI.SEGMENT_CASH # Indices are in Cash segment
+        else:
+            # For other symbols, ensure format
+            if "-" not in symbol:
+                target_symbol = f"NSE-{symbol}"
+            else:
+                target_symbol = symbol
+            segment = GrowwAPI.SEGMENT_FNO
+
+        # Fetch data (keyed without the end time so refreshes within the TTL share it)
+        api = self.api
+        response = self.requests.call(
+            "historical_candles", (target_symbol, segment, start_str),
+            lambda: api.get_historical_candles(
+                exchange=GrowwAPI.EXCHANGE_NSE,
+                segment=segment,
+                groww_symbol=target_symbol,
+                start_time=start_str,
+                end_time=end_str,
+                candle_interval=GrowwAPI.CANDLE_INTERVAL_MIN_1
+            )
+        )
+        
+        # Extract candles list from response
+        candles = []
+        if isinstance(response, list):
+            candles = response
+        elif isinstance(response, dict):
+            # Try common keys
+            if 'candles' in response and response['candles']:
+                candles = response['candles']
+            elif 'data' in response and response['data']:
+                candles = response['data']
+
+        return parse_candles(candles)
@@ -0,0 +1,179 @@
+import argparse
+import os
+import resource
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+import config
+from logger import setup_logger
+
+logger = setup_logger(__name__)
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+
+
+def current_rss_mb():
+    """Resident set size of this process (MB). Falls back to the peak where /proc is unavailable."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2**20 if sys.platform == "darwin" else peak / 1024
+
+
+def _percentile(values, q):
+    return float(np.percentile(values, q)) if len(values) else 0.0
+
+
+class _Session:
+    """One simulated dashboard viewer: reruns app.py like Auto Refresh would."""
+    def __init__(self, timeout):
+        from streamlit.testing.v1 import AppTest
+        self.app = AppTest.from_file(APP_PATH, default_timeout=timeout)
+        self.run_ms = []
+        self.starts = []
+        self.errors = 0
+
+    def run(self, ticks, interval, start_barrier):
+        start_barrier.wait()
+        for _ in range(ticks):
+            started = time.perf_counter()
+            self.starts.append(started)
+            try:
+                self.app.run()
+                if self.app.exception:
+                    self.errors += 1
+            except Exception as e:
+                logger.error(f"Session run failed: {e}")
+                self.errors += 1
+            elapsed = time.perf_counter() - started
+            self.run_ms.append(elapsed * 1000)
+            time.sleep(max(interval - elapsed, 0.0))
+
+
+def run_step(n_sessions, ticks, interval, timeout):
+    """Runs `n_sessions` concurrent sessions for `ticks` reruns each and returns the step's measurements."""
+    from replay import get_replay_api
+    from request_layer import get_request_layer
+
+    replay = get_replay_api()
+    requests = get_request_layer()
+    sessions = [_Session(timeout) for _ in range(n_sessions)]
+
+    # First run of each session (login, engine construction) is setup, not steady state
+    for session in sessions:
+        session.app.run()
+
+    replay.reset_counts()
+    layer_before = requests.get_stats()
+    barrier = threading.Barrier(n_sessions + 1)
+    threads = [
+        threading.Thread(target=s.run, args=(ticks, interval, barrier), name=f"loadtest-session-{i}", daemon=True)
+        for i, s in enumerate(sessions)
+    ]
+    for thread in threads:
+        thread.start()
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    barrier.wait()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+
+    layer_after = requests.get_stats()
+    layer_calls = sum(v["calls"] for v in layer_after.values()) - sum(v["calls"] for v in layer_before.values())
+    upstream = sum(replay.calls.values())
+
+    run_ms = np.concatenate([s.run_ms for s in sessions])
+    cadence = np.concatenate([np.diff(s.starts) for s in sessions if len(s.starts) > 1])
+    session_ticks = n_sessions * ticks
+    return {
+        "sessions": n_sessions,
+        "run_p50_ms": _percentile(run_ms, 50),
+        "run_p95_ms": _percentile(run_ms, 95),
+        "cadence_mean_s": float(cadence.mean()) if len(cadence) else 0.0,
+        "cadence_p95_s": _percentile(cadence, 95),
+        "cpu_pct": 100 * cpu / wall if wall else 0.0,
+        "rss_mb": current_rss_mb(),
+        "api_calls_per_session_tick": upstream / session_ticks,
+        "layer_calls_per_session_tick": layer_calls / session_ticks,
+        "errors": sum(s.errors for s in sessions),
+    }
+
+
+def find_breaking_point(results, interval):
+    """First step whose p95 cadence misses the target by more than 50%, or that produced errors."""
+    for row in results:
+        if row["cadence_p95_s"] > interval * 1.5 or row["errors"]:
+            return row
+    return None
+
+
+def format_report(results, interval):
+    header = (f"{'sessions':>8}{'run p50':>10}{'run p95':>10}{'cadence':>10}{'cad p95':>10}"
+              f"{'cpu %':>8}{'rss MB':>9}{'api/tick':>10}{'calls/tick':>11}{'errors':>8}")
+    lines = [f"Target cadence {interval:.2f}s per session", "", header]
+    for r in results:
+        lines.append(
+            f"{r['sessions']:>8}{r['run_p50_ms']:>10.1f}{r['run_p95_ms']:>10.1f}{r['cadence_mean_s']:>10.2f}"
+            f"{r['cadence_p95_s']:>10.2f}{r['cpu_pct']:>8.0f}{r['rss_mb']:>9.0f}"
+            f"{r['api_calls_per_session_tick']:>10.3f}{r['layer_calls_per_session_tick']:>11.2f}{r['errors']:>8}"
+        )
+    broken = find_breaking_point(results, interval)
+    lines.append("")
+    if broken is None:
+        lines.append("No breaking point within the tested range.")
+    else:
+        lines.append(
+            f"Scaling breaks at {broken['sessions']} sessions: p95 cadence {broken['cadence_p95_s']:.2f}s "
+            f"(target {interval:.2f}s), CPU {broken['cpu_pct']:.0f}%, {broken['errors']} errors."
+        )
+    lines.append("run = script run time; cadence = time between a session's reruns; api/tick = upstream "
+                 "requests per session tick; calls/tick = request-layer calls before caching/coalescing.")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent-session load test of the dashboard on replayed data")
+    parser.add_argument("--sessions", type=int, nargs="*", default=config.LOADTEST_SESSIONS)
+    parser.add_argument("--ticks", type=int, default=config.LOADTEST_TICKS)
+    parser.add_argument("--interval", type=float, default=config.LOADTEST_INTERVAL)
+    parser.add_argument("--timeout", type=float, default=30.0, help="Per-run script timeout (s)")
+    parser.add_argument("--replay", default=None, help="Recording to replay (default: synthetic session)")
+    parser.add_argument("--report", default=None, help="Also write the report to this file")
+    args = parser.parse_args()
+
+    # Sessions run in this process against the replay backend, with the market treated as open
+    config.DATA_BACKEND = "replay"
+    config.REPLAY_PATH = args.replay
+    config.SCHEDULER_ENABLED = False
+    config.SNAPSHOT_PUBLISH = False
+
+    results = []
+    # Synthetic trades, features, models and checkpoints go to a scratch directory, never the live stores
+    with tempfile.TemporaryDirectory(prefix="loadtest_") as workdir:
+        config.DB_PATH = os.path.join(workdir, "trading_data.db")
+        config.FEATURE_STORE_PATH = os.path.join(workdir, "feature_store.db")
+        config.MODEL_DIR = os.path.join(workdir, "models")
+        config.CHECKPOINT_DIR = os.path.join(workdir, "checkpoints")
+        config.PROFILE_DIR = os.path.join(workdir, "profiles")
+        for n in args.sessions:
+            print(f"Running {n} session(s)...", flush=True)
+            results.append(run_step(n, args.ticks, args.interval, args.timeout))
+
+    report = format_report(results, args.interval)
+    print("\n" + report)
+    if args.report:
+        with open(args.report, "w") as f:
+            f.write(report + "\n")
+
+
+if __name__ == "__main__":
+    main()
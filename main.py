@@ -6,11 +6,78 @@ from logger import setup_logger
 # This prevents the "Welcome to Streamlit" email prompt on first run
 os.environ["STREAMLIT_BROWSER_GATHER_USAGE_STATS"] = "false"
 
-from streamlit.web import cli as stcli
-
 logger = setup_logger("main")
 
+# Imported by app.py before the first paint
+STARTUP_MODULES = [
+    "streamlit", "pandas", "numpy",
+    "config", "database", "groww_client", "strategy",
+    "ui.dashboard", "ui.option_chain", "ui.trades", "ui.strategy_explanation",
+]
+# Loaded lazily at first use (login/fetch, training, indicators, charts)
+DEFERRED_MODULES = ["growwapi", "pyotp", "sklearn.ensemble", "matplotlib", "plotly"]
+
+
+def profile_startup(top=20):
+    """Prints a per-module import-time breakdown of the app's startup path and of its deferred imports."""
+    import builtins
+    import time
+
+    # Inclusive and self time of every first-time absolute import, like `python -X importtime`
+    timings = {}
+    stack = []
+    real_import = builtins.__import__
+
+    def timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+        if level or name in sys.modules:
+            return real_import(name, globals, locals, fromlist, level)
+        stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            return real_import(name, globals, locals, fromlist, level)
+        finally:
+            elapsed = time.perf_counter() - start
+            children = stack.pop()
+            if stack:
+                stack[-1] += elapsed
+            timings.setdefault(name, (elapsed, elapsed - children))
+
+    if getattr(sys, 'frozen', False):
+        sys.path.append(sys._MEIPASS)
+
+    builtins.__import__ = timed_import
+    try:
+        for phase, modules in (("startup", STARTUP_MODULES), ("deferred", DEFERRED_MODULES)):
+            print(f"\n{phase.upper()} IMPORTS")
+            print(f"{'module':<28}{'ms':>10}")
+            total = 0.0
+            for module in modules:
+                start = time.perf_counter()
+                try:
+                    __import__(module)
+                    status = ""
+                except Exception as e:
+                    status = f"  (failed: {e})"
+                elapsed = (time.perf_counter() - start) * 1000
+                total += elapsed
+                print(f"{module:<28}{elapsed:>10.1f}{status}")
+            print(f"{'total':<28}{total:>10.1f}")
+    finally:
+        builtins.__import__ = real_import
+
+    print(f"\nTOP {top} MODULES BY SELF TIME")
+    print(f"{'module':<40}{'self ms':>10}{'cumulative ms':>16}")
+    ranked = sorted(timings.items(), key=lambda item: item[1][1], reverse=True)[:top]
+    for name, (inclusive, self_time) in ranked:
+        print(f"{name:<40}{self_time * 1000:>10.1f}{inclusive * 1000:>16.1f}")
+
+
 def main():
+    # Startup profiling mode: per-module import-time breakdown
+    if "--profile-startup" in sys.argv:
+        profile_startup()
+        sys.exit(0)
+
     # Self-test mode to verify imports (used in CI/CD)
     if "--check-imports" in sys.argv:
         try:
@@ -19,7 +86,6 @@ def main():
             import numpy  # noqa: F401
             import sklearn  # noqa: F401
             import sklearn.ensemble  # noqa: F401
-            import pandas_ta  # noqa: F401
             import growwapi  # noqa: F401
             import matplotlib  # noqa: F401
             import plotly  # noqa: F401
@@ -32,6 +98,25 @@ def main():
             import strategy  # noqa: F401
             import groww_client  # noqa: F401
             import database  # noqa: F401
+            import order_manager  # noqa: F401
+            import fill_simulator  # noqa: F401
+            import request_layer  # noqa: F401
+            import token_manager  # noqa: F401
+            import candles  # noqa: F401
+            import snapshot_bus  # noqa: F401
+            import runner  # noqa: F401
+            import feature_store  # noqa: F401
+            import models  # noqa: F401
+            import walk_forward  # noqa: F401
+            import scheduler  # noqa: F401
+            import profiler  # noqa: F401
+            import replay  # noqa: F401
+            import downsample  # noqa: F401
+            import stream  # noqa: F401
+            import checkpoint  # noqa: F401
+            import contracts  # noqa: F401
+            import vol_surface  # noqa: F401
+            import features  # noqa: F401
             import config  # noqa: F401
             
             logger.info("Success: All modules imported correctly.")
@@ -60,6 +145,14 @@ def main():
         "--client.toolbarMode=viewer",
         "--browser.gatherUsageStats=false"
     ]
+    # `kill -USR1 <pid>` profiles the next ticks of the sessions served by this process
+    if application_path not in sys.path:
+        sys.path.append(application_path)
+    from profiler import install_signal_handler
+    install_signal_handler()
+
+    # Imported here so the self-check and profiling modes don't pay for it twice
+    from streamlit.web import cli as stcli
     sys.exit(stcli.main())
 
 if __name__ == "__main__":
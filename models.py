@@ -0,0 +1,162 @@
+import argparse
+import pickle
+import time
+
+import numpy as np
+
+import config
+from logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+# --- Engines ---
+# Each factory returns an unfitted scikit-learn classifier. sklearn is imported inside the
+# factories so that nothing heavy is loaded until a model is actually trained.
+
+def _random_forest():
+    from sklearn.ensemble import RandomForestClassifier
+    return RandomForestClassifier(
+        n_estimators=200,      # More trees
+        max_depth=10,          # Prevent overfitting
+        min_samples_split=10,  # Require more samples to split
+        min_samples_leaf=5,    # Require more samples in leaves
+        random_state=42
+    )
+
+
+def _extra_trees():
+    from sklearn.ensemble import ExtraTreesClassifier
+    return ExtraTreesClassifier(
+        n_estimators=200, max_depth=10, min_samples_split=10, min_samples_leaf=5, random_state=42
+    )
+
+
+def _hist_gradient_boosting():
+    from sklearn.ensemble import HistGradientBoostingClassifier
+    return HistGradientBoostingClassifier(max_iter=200, learning_rate=0.05, max_depth=6, random_state=42)
+
+
+def _logistic_regression():
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.pipeline import make_pipeline
+    from sklearn.preprocessing import StandardScaler
+    return make_pipeline(StandardScaler(), LogisticRegression(max_iter=1000))
+
+
+MODEL_ENGINES = {
+    "random_forest": _random_forest,
+    "extra_trees": _extra_trees,
+    "hist_gradient_boosting": _hist_gradient_boosting,
+    "logistic_regression": _logistic_regression,
+}
+
+
+def create_model(name=None):
+    name = name or config.MODEL_ENGINE
+    if name not in MODEL_ENGINES:
+        raise ValueError(f"Unknown model engine '{name}'. Available: {', '.join(MODEL_ENGINES)}")
+    return MODEL_ENGINES[name]()
+
+
+# --- Evaluation ---
+
+def chronological_splits(n, n_splits=5, min_train_fraction=0.5):
+    """
+    Walk-forward (expanding window) splits over n time-ordered rows: the first `min_train_fraction`
+    is always training data and the remainder is cut into `n_splits` consecutive test blocks.
+    Every test block lies strictly after its training rows, so no future bar leaks into a fit.
+    """
+    start = int(n * min_train_fraction)
+    bounds = np.linspace(start, n, n_splits + 1).astype(int)
+    return [(np.arange(0, lo), np.arange(lo, hi)) for lo, hi in zip(bounds[:-1], bounds[1:]) if hi > lo]
+
+
+def _take(data, idx):
+    return data.iloc[idx] if hasattr(data, "iloc") else data[idx]
+
+
+def predict_latency(model, X, samples=200):
+    """p50/p95 latency (microseconds) of single-row predictions, as made on every tick."""
+    n = len(X)
+    rows = np.linspace(0, n - 1, min(samples, n)).astype(int)
+    timings = np.empty(len(rows))
+    for i, row in enumerate(rows):
+        x = _take(X, [row])
+        start = time.perf_counter_ns()
+        model.predict(x)
+        timings[i] = (time.perf_counter_ns() - start) / 1e3
+    return float(np.percentile(timings, 50)), float(np.percentile(timings, 95))
+
+
+def evaluate_engine(name, X, y, splits):
+    """Fits one engine on every split and measures speed, size and out-of-sample accuracy."""
+    fit_times = []
+    accuracies = []
+    model = None
+    for train_idx, test_idx in splits:
+        model = create_model(name)
+        start = time.perf_counter()
+        model.fit(_take(X, train_idx), _take(y, train_idx))
+        fit_times.append(time.perf_counter() - start)
+        accuracies.append(float(model.score(_take(X, test_idx), _take(y, test_idx))))
+
+    p50, p95 = predict_latency(model, X)
+    return {
+        "engine": name,
+        "fit_s": float(np.mean(fit_times)),
+        "predict_p50_us": p50,
+        "predict_p95_us": p95,
+        "model_kb": len(pickle.dumps(model)) / 1024,
+        "accuracy": float(np.mean(accuracies)),
+        "accuracy_std": float(np.std(accuracies)),
+        "fold_accuracy": accuracies,
+    }
+
+
+def compare_engines(X, y, engines=None, n_splits=None):
+    """Runs every engine on the same chronological splits. Returns one result dict per engine."""
+    n_splits = n_splits or config.MODEL_COMPARE_SPLITS
+    splits = chronological_splits(len(X), n_splits)
+    results = []
+    for name in engines or MODEL_ENGINES:
+        try:
+            results.append(evaluate_engine(name, X, y, splits))
+        except Exception as e:
+            logger.error(f"Engine {name} failed: {e}")
+    return results
+
+
+def format_results(results):
+    lines = [f"{'engine':<24}{'fit s':>8}{'p50 us':>10}{'p95 us':>10}{'size KB':>10}{'acc':>8}{'± std':>8}"]
+    for r in sorted(results, key=lambda r: -r["accuracy"]):
+        lines.append(
+            f"{r['engine']:<24}{r['fit_s']:>8.2f}{r['predict_p50_us']:>10.0f}{r['predict_p95_us']:>10.0f}"
+            f"{r['model_kb']:>10.0f}{r['accuracy']:>8.3f}{r['accuracy_std']:>8.3f}"
+        )
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare model engines on stored features with walk-forward splits")
+    parser.add_argument("--symbol", default=config.SYMBOL)
+    parser.add_argument("--engines", nargs="*", default=None, help=f"Default: all ({', '.join(MODEL_ENGINES)})")
+    parser.add_argument("--splits", type=int, default=config.MODEL_COMPARE_SPLITS)
+    args = parser.parse_args()
+
+    from feature_store import FeatureStore, feature_version
+    from strategy import build_training_set, compute_features
+
+    store = FeatureStore()
+    version = feature_version(compute_features)
+    features = store.load_frame(args.symbol, config.FEATURE_INTERVAL, version)
+    X, y = build_training_set(features)
+    if X is None or len(X) < 200:
+        print(f"Not enough stored features for {args.symbol} {config.FEATURE_INTERVAL} (version {version})")
+        return
+    print(f"{len(X)} rows, {X.shape[1]} features, {args.splits} walk-forward folds\n")
+    print(format_results(compare_engines(X, y, args.engines, args.splits)))
+
+
+if __name__ == "__main__":
+    main()
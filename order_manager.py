@@ -0,0 +1,379 @@
+import itertools
+import queue
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+import numpy as np
+
+import config
+from contracts import get_contract_registry
+from request_layer import RateLimitExceeded
+from logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+class OrderState:
+    NEW = "NEW"
+    ACKED = "ACKED"
+    FILLED = "FILLED"
+    REJECTED = "REJECTED"
+    CANCELLED = "CANCELLED"
+
+    TERMINAL = (FILLED, REJECTED, CANCELLED)
+
+    # Allowed transitions of the order state machine
+    TRANSITIONS = {
+        NEW: (ACKED, REJECTED, CANCELLED),
+        ACKED: (FILLED, REJECTED, CANCELLED),
+        FILLED: (),
+        REJECTED: (),
+        CANCELLED: (),
+    }
+
+
+# Latency stages reported per order and in aggregate: (name, from, to)
+LATENCY_STAGES = [
+    ("signal_to_submit", "ts_signal", "ts_submit"),
+    ("submit_to_ack", "ts_submit", "ts_ack"),
+    ("ack_to_fill", "ts_ack", "ts_fill"),
+    ("signal_to_fill", "ts_signal", "ts_fill"),
+]
+
+
+class Order:
+    """
+    A single order travelling through the order manager, for the contract `contract_id`
+    (contracts.ContractRegistry); `symbol` is its trading symbol.
+    Timestamps are time.perf_counter_ns() readings, so only differences are meaningful.
+    """
+    def __init__(self, order_id, contract_id, qty, side, price, signal_ts=None, meta=None):
+        self.order_id = order_id
+        self.contract_id = contract_id
+        self.symbol = get_contract_registry().trading_symbol(contract_id)
+        self.qty = qty
+        self.side = side
+        self.price = price
+        self.meta = meta or {}
+
+        self.state = OrderState.NEW
+        self.broker_order_id = None
+        self.fill_price = None
+        self.message = ""
+        self.created_at = datetime.now()
+
+        self.ts_signal = signal_ts if signal_ts is not None else time.perf_counter_ns()
+        self.ts_submit = None
+        self.ts_ack = None
+        self.ts_fill = None
+
+    def transition(self, new_state, message=""):
+        if new_state not in OrderState.TRANSITIONS[self.state]:
+            raise ValueError(f"Invalid order transition {self.state} -> {new_state} for {self.order_id}")
+        self.state = new_state
+        if message:
+            self.message = message
+
+    @property
+    def is_open(self):
+        return self.state not in OrderState.TERMINAL
+
+    def latency_breakdown(self):
+        """Returns the latency of each stage in milliseconds (None if the stage was not reached)."""
+        breakdown = {}
+        for name, start, end in LATENCY_STAGES:
+            t0 = getattr(self, start)
+            t1 = getattr(self, end)
+            breakdown[name] = (t1 - t0) / 1e6 if t0 is not None and t1 is not None else None
+        return breakdown
+
+    def to_dict(self):
+        data = {
+            "order_id": self.order_id,
+            "broker_order_id": self.broker_order_id,
+            "contract_id": self.contract_id,
+            "symbol": self.symbol,
+            "qty": self.qty,
+            "side": self.side,
+            "price": self.price,
+            "fill_price": self.fill_price,
+            "state": self.state,
+            "message": self.message,
+            "created_at": self.created_at,
+        }
+        data.update(self.latency_breakdown())
+        return data
+
+
+class PaperOrderGateway:
+    """
+    Routes orders into the simulated account held by GrowwClient.
+    With a FillSimulator attached, the account is booked at the simulated fill price
+    instead of the LTP the decision was made on.
+    """
+    def __init__(self, client, simulator=None):
+        self.client = client
+        self.simulator = simulator
+
+    def submit(self, order):
+        # The paper "exchange" accepts everything; account checks happen at fill time
+        return {"status": OrderState.ACKED}
+
+    def await_fill(self, order):
+        price = order.price
+        if self.simulator is not None:
+            sim_price = self.simulator.simulate(order.contract_id, order.side, order.qty, order.ts_signal)
+            if sim_price is not None:
+                price = sim_price
+
+        resp = self.client.place_order(order.contract_id, order.qty, order.side, price)
+        if resp.get("status") == "success":
+            return {"status": OrderState.FILLED, "fill_price": price, "broker_order_id": resp.get("order_id")}
+        return {"status": OrderState.REJECTED, "message": resp.get("message", "Rejected")}
+
+
+class GrowwOrderGateway:
+    """
+    Routes orders to the real Groww order endpoint.
+    Orders go out as MIS market orders on the F&O segment; fills are polled from the order status API.
+    An order still open after fill_timeout is cancelled at Groww and reconciled to its final status.
+    """
+    # Groww order statuses mapped onto our state machine
+    STATUS_MAP = {
+        "EXECUTED": OrderState.FILLED,
+        "COMPLETED": OrderState.FILLED,
+        "REJECTED": OrderState.REJECTED,
+        "FAILED": OrderState.REJECTED,
+        "CANCELLED": OrderState.CANCELLED,
+    }
+
+    def __init__(self, client, poll_interval=0.2, fill_timeout=30):
+        self.client = client
+        self.poll_interval = poll_interval
+        self.fill_timeout = fill_timeout
+
+    def submit(self, order):
+        from growwapi import GrowwAPI
+
+        api = self.client.api
+        if api is None or api == "MOCK_API_OBJECT":
+            return {"status": OrderState.REJECTED, "message": "API Not Connected"}
+
+        resp = self.client.requests.call(
+            "place_order", order.order_id,
+            lambda: api.place_order(
+                validity=GrowwAPI.VALIDITY_DAY,
+                exchange=GrowwAPI.EXCHANGE_NSE,
+                order_type=GrowwAPI.ORDER_TYPE_MARKET,
+                product=GrowwAPI.PRODUCT_MIS,
+                quantity=order.qty,
+                segment=GrowwAPI.SEGMENT_FNO,
+                trading_symbol=order.symbol,
+                transaction_type=order.side,
+                order_reference_id=order.order_id.replace("-", "")[-20:],
+            )
+        )
+        broker_id = resp.get("groww_order_id")
+        if not broker_id:
+            return {"status": OrderState.REJECTED, "message": str(resp)}
+        return {"status": OrderState.ACKED, "broker_order_id": broker_id}
+
+    def await_fill(self, order):
+        result = self._poll(order, self.fill_timeout)
+        if result is not None:
+            return result
+
+        # Not filled in time: cancel at the broker, then wait for the order's final status, since
+        # it may still have filled in the meantime
+        self._cancel(order)
+        result = self._poll(order, config.ORDER_CANCEL_RECONCILE_SECONDS)
+        if result is not None:
+            if result["status"] == OrderState.CANCELLED:
+                result["message"] = result["message"] or "Fill timeout"
+            return result
+        logger.error(f"Order {order.order_id} ({order.broker_order_id}) not confirmed cancelled at Groww; check it manually")
+        return {"status": OrderState.CANCELLED, "message": "Fill timeout, cancel unconfirmed"}
+
+    def _poll(self, order, timeout):
+        # Final status of the order, or None if it is still open after `timeout` seconds
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                resp = self._status(order)
+            except RateLimitExceeded:
+                resp = {}
+            state = self.STATUS_MAP.get(resp.get("order_status"))
+            if state == OrderState.FILLED:
+                return {"status": state, "fill_price": resp.get("average_fill_price", order.price)}
+            if state is not None:
+                return {"status": state, "message": resp.get("remark", "")}
+            time.sleep(self.poll_interval)
+        return None
+
+    def _status(self, order):
+        from growwapi import GrowwAPI
+
+        api = self.client.api
+        return self.client.requests.call(
+            "order_status", order.broker_order_id,
+            lambda: api.get_order_status(segment=GrowwAPI.SEGMENT_FNO, groww_order_id=order.broker_order_id),
+        )
+
+    def _cancel(self, order):
+        from growwapi import GrowwAPI
+
+        api = self.client.api
+        try:
+            self.client.requests.call(
+                "cancel_order", order.broker_order_id,
+                lambda: api.cancel_order(segment=GrowwAPI.SEGMENT_FNO, groww_order_id=order.broker_order_id),
+            )
+        except Exception as e:
+            # An order that filled (or was rejected) meanwhile can no longer be cancelled; its status says so
+            logger.warning(f"Cancel of order {order.order_id} ({order.broker_order_id}) failed: {e}")
+
+
+class OrderManager:
+    """
+    Non-blocking order submission.
+    submit() only enqueues the order; a background worker sends it through the gateway,
+    walks it through the state machine and invokes the caller's callback on completion.
+    """
+    def __init__(self, gateway, history_limit=None):
+        self.gateway = gateway
+        self.history_limit = history_limit or config.ORDER_HISTORY_LIMIT
+
+        # Monotonic ids, prefixed with the manager start time so they stay unique across restarts
+        self._prefix = datetime.now().strftime("%Y%m%d%H%M%S")
+        self._seq = itertools.count(1)
+
+        self._orders = OrderedDict()
+        self._callbacks = {}
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+
+        self._worker = threading.Thread(target=self._run, name="order-manager", daemon=True)
+        self._worker.start()
+
+    def submit(self, contract_id, qty, side, price=None, signal_ts=None, callback=None, **meta):
+        """Queues an order for a registered contract and returns it immediately in the NEW state."""
+        order = Order(f"{self._prefix}-{next(self._seq):06d}", contract_id, qty, side, price, signal_ts, meta)
+        with self._lock:
+            self._orders[order.order_id] = order
+            if callback:
+                self._callbacks[order.order_id] = callback
+            self._trim_history()
+        self._queue.put(order)
+        logger.info(f"Queued {side} order {order.order_id} for {order.symbol} qty {qty} at {price}")
+        return order
+
+    def cancel(self, order_id):
+        """Cancels an order that has not been sent yet. Returns True if it was cancelled."""
+        with self._lock:
+            order = self._orders.get(order_id)
+            if order is None or order.state != OrderState.NEW or order.ts_submit is not None:
+                return False
+            order.transition(OrderState.CANCELLED, "Cancelled before submission")
+        return True
+
+    def get_order(self, order_id):
+        return self._orders.get(order_id)
+
+    def get_orders(self):
+        with self._lock:
+            return list(self._orders.values())
+
+    def has_open_orders(self, contract_id=None):
+        with self._lock:
+            return any(o.is_open and (contract_id is None or o.contract_id == contract_id) for o in self._orders.values())
+
+    def latency_summary(self):
+        """Aggregate latency (ms) per stage across all orders that reached it."""
+        orders = self.get_orders()
+        summary = {}
+        for name, _, _ in LATENCY_STAGES:
+            values = [o.latency_breakdown()[name] for o in orders]
+            values = np.array([v for v in values if v is not None])
+            if len(values) == 0:
+                continue
+            summary[name] = {
+                "count": int(len(values)),
+                "mean": float(values.mean()),
+                "p50": float(np.percentile(values, 50)),
+                "p95": float(np.percentile(values, 95)),
+                "max": float(values.max()),
+            }
+        return summary
+
+    def stop(self):
+        self._queue.put(None)
+
+    def _trim_history(self):
+        # Drop the oldest finished orders once the history limit is exceeded
+        excess = len(self._orders) - self.history_limit
+        if excess <= 0:
+            return
+        for order_id in list(self._orders.keys()):
+            if excess <= 0:
+                break
+            if not self._orders[order_id].is_open:
+                del self._orders[order_id]
+                self._callbacks.pop(order_id, None)
+                excess -= 1
+
+    def _run(self):
+        while True:
+            order = self._queue.get()
+            if order is None:
+                break
+            try:
+                self._process(order)
+            except Exception as e:
+                logger.error(f"Order {order.order_id} failed: {e}")
+                with self._lock:
+                    if order.is_open:
+                        order.transition(OrderState.REJECTED, str(e))
+            self._notify(order)
+
+    def _process(self, order):
+        with self._lock:
+            if order.state != OrderState.NEW:
+                return # Cancelled while queued
+            order.ts_submit = time.perf_counter_ns()
+
+        ack = self.gateway.submit(order)
+        with self._lock:
+            order.ts_ack = time.perf_counter_ns()
+            if ack["status"] != OrderState.ACKED:
+                order.transition(OrderState.REJECTED, ack.get("message", ""))
+                return
+            order.broker_order_id = ack.get("broker_order_id")
+            order.transition(OrderState.ACKED)
+
+        fill = self.gateway.await_fill(order)
+        with self._lock:
+            if fill["status"] == OrderState.FILLED:
+                order.ts_fill = time.perf_counter_ns()
+                order.fill_price = fill.get("fill_price", order.price)
+                order.broker_order_id = fill.get("broker_order_id", order.broker_order_id)
+            order.transition(fill["status"], fill.get("message", ""))
+
+    def _notify(self, order):
+        with self._lock:
+            callback = self._callbacks.pop(order.order_id, None)
+        if order.state != OrderState.FILLED:
+            logger.error(f"Order {order.order_id} {order.state}: {order.message}")
+        if callback:
+            try:
+                callback(order)
+            except Exception as e:
+                logger.error(f"Order callback failed for {order.order_id}: {e}")
+
+
+def create_gateway(client, simulator=None):
+    """Builds the order gateway selected in config (paper by default)."""
+    if config.ORDER_GATEWAY == "groww":
+        return GrowwOrderGateway(client)
+    return PaperOrderGateway(client, simulator)
@@ -0,0 +1,193 @@
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+import config
+from logger import setup_logger
+
+logger = setup_logger(__name__)
+
+MODES = ("sampling", "cprofile")
+
+
+def _frame_label(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class _StackSampler:
+    """Samples one thread's Python stack at a fixed interval from a background thread."""
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="tick-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+                self.samples += 1
+
+    def folded(self):
+        """Brendan Gregg's folded-stack format (flamegraph.pl, speedscope, inferno)."""
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common())
+
+    def top(self, limit):
+        own = Counter()
+        inclusive = Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")
+            own[frames[-1]] += count
+            for frame in set(frames):
+                inclusive[frame] += count
+        total = max(self.samples, 1)
+        lines = [f"{'self %':>7}{'total %':>9}  function"]
+        for frame, count in own.most_common(limit):
+            lines.append(f"{100 * count / total:>7.1f}{100 * inclusive[frame] / total:>9.1f}  {frame}")
+        return "\n".join(lines)
+
+
+class TickProfiler:
+    """
+    Profiles the next N strategy ticks on demand (dashboard button or SIGUSR1).
+
+    Disarmed, the only cost on the tick path is reading `remaining`. Armed, each tick runs under
+    either a stack sampler (low overhead, writes folded stacks for flame graphs) or cProfile
+    (exact call counts, writes a .prof file), and a top-functions summary tagged with the tick's
+    market regime and data sizes is written next to it.
+    """
+    def __init__(self, output_dir=None):
+        self.output_dir = output_dir or config.PROFILE_DIR
+        self.remaining = 0
+        self.mode = config.PROFILE_MODE
+        self.lock = threading.Lock()
+        self.busy = False # One tick is profiled at a time across sessions
+        self.reports = [] # Paths of the summaries written, newest last
+
+    def arm(self, ticks=None, mode=None):
+        mode = mode or config.PROFILE_MODE
+        if mode not in MODES:
+            raise ValueError(f"Unknown profiler mode '{mode}'. Available: {', '.join(MODES)}")
+        with self.lock:
+            self.mode = mode
+            self.remaining = ticks or config.PROFILE_TICKS
+        logger.info(f"Profiling the next {self.remaining} ticks ({mode})")
+
+    def disarm(self):
+        with self.lock:
+            self.remaining = 0
+
+    def _claim(self):
+        with self.lock:
+            if self.remaining <= 0 or self.busy:
+                return None
+            self.remaining -= 1
+            self.busy = True
+            return self.mode
+
+    def run(self, fn, tags=None):
+        """Runs fn() profiled if a profile slot is free, otherwise plainly. `tags(result)` adds report metadata."""
+        mode = self._claim()
+        if mode is None:
+            return fn()
+        try:
+            if mode == "cprofile":
+                return self._run_cprofile(fn, tags)
+            return self._run_sampling(fn, tags)
+        finally:
+            with self.lock:
+                self.busy = False
+
+    def _run_sampling(self, fn, tags):
+        sampler = _StackSampler(threading.get_ident(), config.PROFILE_SAMPLE_INTERVAL)
+        sampler.start()
+        start = time.perf_counter()
+        try:
+            result = fn()
+        finally:
+            elapsed = time.perf_counter() - start
+            sampler.stop()
+        base = self._base_path()
+        with open(base + ".folded", "w") as f:
+            f.write(sampler.folded())
+        self._write_summary(base, "sampling", elapsed, result, tags,
+                            f"{sampler.samples} samples every {config.PROFILE_SAMPLE_INTERVAL * 1000:.1f}ms\n\n"
+                            + sampler.top(config.PROFILE_TOP_FUNCTIONS), base + ".folded")
+        return result
+
+    def _run_cprofile(self, fn, tags):
+        import cProfile
+        import io
+        import pstats
+
+        profile = cProfile.Profile()
+        start = time.perf_counter()
+        try:
+            result = profile.runcall(fn)
+        finally:
+            elapsed = time.perf_counter() - start
+        base = self._base_path()
+        profile.dump_stats(base + ".prof") # Open with snakeviz, or flameprof for a flame graph
+        out = io.StringIO()
+        pstats.Stats(profile, stream=out).sort_stats("cumulative").print_stats(config.PROFILE_TOP_FUNCTIONS)
+        self._write_summary(base, "cprofile", elapsed, result, tags, out.getvalue(), base + ".prof")
+        return result
+
+    def _base_path(self):
+        os.makedirs(self.output_dir, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        return os.path.join(self.output_dir, f"tick_{stamp}")
+
+    def _write_summary(self, base, mode, elapsed, result, tags, body, profile_path):
+        meta = {"mode": mode, "elapsed_ms": round(elapsed * 1000, 2), "profile": profile_path}
+        if tags is not None:
+            try:
+                meta.update(tags(result))
+            except Exception as e:
+                meta["tag_error"] = str(e)
+        with open(base + ".txt", "w") as f:
+            f.write(json.dumps(meta, default=str) + "\n\n" + body)
+        with self.lock:
+            self.reports.append(base + ".txt")
+            del self.reports[:-config.PROFILE_KEEP_REPORTS]
+        logger.info(f"Tick profile written to {base}.txt ({meta['elapsed_ms']}ms)")
+
+
+_profiler = TickProfiler()
+
+
+def get_profiler():
+    """Process-wide tick profiler, shared by every session."""
+    return _profiler
+
+
+def install_signal_handler():
+    """Arms the profiler on SIGUSR1 (`kill -USR1 <pid>`). Must be called from the main thread; no-op on Windows."""
+    import signal
+
+    if not hasattr(signal, "SIGUSR1") or threading.current_thread() is not threading.main_thread():
+        return False
+    def on_signal(signum, frame):
+        # No locks or logging here: the interrupted main thread may be holding them
+        _profiler.remaining = config.PROFILE_TICKS
+
+    signal.signal(signal.SIGUSR1, on_signal)
+    return True
@@ -0,0 +1,156 @@
+import json
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+import numpy as np
+
+import config
+from logger import setup_logger
+
+logger = setup_logger(__name__)
+
+STRIKE_STEPS = {"NIFTY": 50, "BANKNIFTY": 100, "FINNIFTY": 50, "MIDCPNIFTY": 25}
+START_PRICES = {"NIFTY": 25000.0, "BANKNIFTY": 56000.0, "FINNIFTY": 26500.0, "MIDCPNIFTY": 13000.0}
+
+
+def _unix(text):
+    # "YYYY-mm-dd HH:MM:SS" in local time -> unix seconds (what Groww candles carry)
+    return int(time.mktime(datetime.strptime(text, "%Y-%m-%d %H:%M:%S").timetuple()))
+
+
+def synthetic_candles(symbol, days, seed=0, end=None):
+    """Random-walk 1-minute candles for the last `days` weekdays, as Groww [ts, o, h, l, c, v] rows."""
+    rng = np.random.default_rng(seed)
+    end = end or datetime.now()
+    sessions = []
+    day = end.date()
+    while len(sessions) < days:
+        if day.weekday() < 5:
+            sessions.append(day)
+        day -= timedelta(days=1)
+
+    rows = []
+    price = START_PRICES.get(symbol, 20000.0)
+    for day in reversed(sessions):
+        open_ts = int(time.mktime(datetime.combine(day, datetime.min.time()).replace(hour=9, minute=15).timetuple()))
+        steps = rng.normal(0, price * 0.0004, 375)
+        closes = price + np.cumsum(steps)
+        opens = np.concatenate(([price], closes[:-1]))
+        wick = np.abs(rng.normal(0, price * 0.0002, (2, 375)))
+        highs = np.maximum(opens, closes) + wick[0]
+        lows = np.minimum(opens, closes) - wick[1]
+        volume = rng.integers(1000, 50000, 375)
+        for i in range(375):
+            ts = open_ts + 60 * i
+            if ts > end.timestamp():
+                break
+            rows.append([ts, opens[i], highs[i], lows[i], closes[i], int(volume[i])])
+        price = closes[-1]
+    return rows
+
+
+def synthetic_chain(symbol, spot, rng, width=20):
+    """One option chain response shaped like GrowwAPI.get_option_chain, centred on `spot`."""
+    step = STRIKE_STEPS.get(symbol, 50)
+    atm = round(spot / step) * step
+    strikes = {}
+    for k in range(-width, width + 1):
+        strike = atm + k * step
+        time_value = max(spot * 0.004 * np.exp(-abs(strike - spot) / (spot * 0.01)), 0.05)
+        ce_ltp = round(max(spot - strike, 0) + time_value, 2)
+        pe_ltp = round(max(strike - spot, 0) + time_value, 2)
+        moneyness = (spot - strike) / (spot * 0.01)
+        ce_delta = float(1 / (1 + np.exp(-moneyness)))
+        strikes[str(float(strike))] = {
+            "CE": {
+                "ltp": ce_ltp, "open_interest": int(rng.integers(1e4, 5e6)), "volume": int(rng.integers(1e3, 1e6)),
+                "greeks": {"iv": round(float(12 + rng.normal(0, 1)), 2), "delta": round(ce_delta, 3),
+                           "theta": round(-time_value * 0.1, 2), "gamma": 0.001, "vega": round(time_value * 0.2, 2)},
+            },
+            "PE": {
+                "ltp": pe_ltp, "open_interest": int(rng.integers(1e4, 5e6)), "volume": int(rng.integers(1e3, 1e6)),
+                "greeks": {"iv": round(float(13 + rng.normal(0, 1)), 2), "delta": round(ce_delta - 1, 3),
+                           "theta": round(-time_value * 0.1, 2), "gamma": 0.001, "vega": round(time_value * 0.2, 2)},
+            },
+        }
+    return {"underlying_ltp": round(float(spot), 2), "strikes": strikes}
+
+
+class ReplayAPI:
+    """
+    Stand-in for GrowwAPI that serves recorded market data, for load tests, demos and offline runs.
+
+    A recording is a JSON file {"candles": {symbol: [[ts, o, h, l, c, v], ...]},
+    "option_chains": {symbol: [response, ...]}}; chain responses are served in order and wrap
+    around. Without a recording, a synthetic random-walk session is generated. Every call is
+    counted, so callers can see how many upstream requests actually reached the "broker".
+    """
+    def __init__(self, recording=None, symbols=None, days=None, seed=0):
+        self.lock = threading.Lock()
+        self.calls = Counter()
+        self._chain_pos = Counter()
+        if recording:
+            with open(recording) as f:
+                data = json.load(f)
+        else:
+            data = self.synthesize(symbols or list(config.UNDERLYINGS), days or config.CANDLE_BASE_LOOKBACK_DAYS, seed)
+        self.candles = {s: np.asarray(rows, dtype=np.float64) for s, rows in data["candles"].items()}
+        self.option_chains = data["option_chains"]
+
+    @staticmethod
+    def synthesize(symbols, days, seed=0, chain_snapshots=300):
+        rng = np.random.default_rng(seed)
+        candles = {s: synthetic_candles(s, days, seed) for s in symbols}
+        chains = {}
+        for symbol in symbols:
+            spot = candles[symbol][-1][4] if candles[symbol] else START_PRICES.get(symbol, 20000.0)
+            walk = spot + np.cumsum(rng.normal(0, spot * 0.0001, chain_snapshots))
+            chains[symbol] = [synthetic_chain(symbol, price, rng) for price in walk]
+        return {"candles": candles, "option_chains": chains}
+
+    def save(self, path):
+        with open(path, "w") as f:
+            json.dump({"candles": {s: rows.tolist() for s, rows in self.candles.items()},
+                       "option_chains": self.option_chains}, f)
+
+    def reset_counts(self):
+        with self.lock:
+            self.calls.clear()
+
+    # --- GrowwAPI surface used by GrowwClient ---
+
+    def get_option_chain(self, exchange, underlying, expiry_date, timeout=None):
+        with self.lock:
+            self.calls["option_chain"] += 1
+            chains = self.option_chains.get(underlying)
+            if not chains:
+                return {}
+            response = chains[self._chain_pos[underlying] % len(chains)]
+            self._chain_pos[underlying] += 1
+        return response
+
+    def get_historical_candles(self, exchange, segment, groww_symbol, start_time, end_time, candle_interval, timeout=None):
+        with self.lock:
+            self.calls["historical_candles"] += 1
+        symbol = groww_symbol.split("-", 1)[-1]
+        rows = self.candles.get(symbol)
+        if rows is None or len(rows) == 0:
+            return {"candles": []}
+        ts = rows[:, 0]
+        window = rows[(ts >= _unix(start_time)) & (ts <= _unix(end_time))]
+        return {"candles": window.tolist()}
+
+
+_replay = None
+_replay_lock = threading.Lock()
+
+
+def get_replay_api():
+    """Process-wide replay backend (config.REPLAY_PATH, or synthetic data)."""
+    global _replay
+    with _replay_lock:
+        if _replay is None:
+            _replay = ReplayAPI(config.REPLAY_PATH)
+        return _replay
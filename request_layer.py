@@ -0,0 +1,244 @@
+import threading
+import time
+
+import config
+from logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+class RateLimitExceeded(Exception):
+    pass
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens refill every `per` seconds, up to `rate` in the bucket."""
+    def __init__(self, rate, per=1.0):
+        self.capacity = float(rate)
+        self.fill_rate = rate / per
+        self.tokens = float(rate)
+        self.last = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.last) * self.fill_rate)
+        self.last = now
+
+    def try_acquire(self):
+        """Takes a token if one is available. Otherwise returns the seconds until one will be."""
+        with self.lock:
+            self._refill(time.monotonic())
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.fill_rate
+
+
+class SharedTokenBucket(TokenBucket):
+    """
+    TokenBucket whose state lives in shared memory, so every worker process draws from one quota.
+    `state` is a 2-slot multiprocessing RawArray (tokens, last refill) guarded by a multiprocessing Lock.
+    time.monotonic() is system-wide, so refill times are comparable across processes.
+    """
+    def __init__(self, rate, per, state, lock):
+        self.capacity = float(rate)
+        self.fill_rate = rate / per
+        self.state = state
+        self.lock = lock
+
+    @property
+    def tokens(self):
+        return self.state[0]
+
+    @tokens.setter
+    def tokens(self, value):
+        self.state[0] = value
+
+    @property
+    def last(self):
+        return self.state[1]
+
+    @last.setter
+    def last(self, value):
+        self.state[1] = value
+
+
+class RateLimiter:
+    """All the buckets of one Groww quota group (e.g. per-second and per-minute limits)."""
+    def __init__(self, limits, buckets=None):
+        self.buckets = buckets or [TokenBucket(rate, per) for rate, per in limits]
+        self.lock = threading.Lock()
+
+    def acquire(self, timeout):
+        deadline = time.monotonic() + timeout
+        while True:
+            with self.lock:
+                waits = [b.try_acquire() for b in self.buckets]
+                if all(w == 0 for w in waits):
+                    return
+                # Give back tokens taken from buckets that did have room
+                for bucket, wait in zip(self.buckets, waits):
+                    if wait == 0:
+                        with bucket.lock:
+                            bucket.tokens = min(bucket.capacity, bucket.tokens + 1)
+            wait = max(waits)
+            if time.monotonic() + wait > deadline:
+                raise RateLimitExceeded(f"Rate limit wait of {wait:.2f}s exceeds {timeout}s")
+            time.sleep(wait)
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key so only one of them does the work."""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}
+
+    def do(self, key, fn):
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+        else:
+            try:
+                call.result = fn()
+            except Exception as e:
+                call.error = e
+            finally:
+                with self.lock:
+                    del self.calls[key]
+                call.done.set()
+
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+
+class TTLCache:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = {}
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if time.monotonic() >= expires:
+                del self.entries[key]
+                return None
+            return value
+
+    def set(self, key, value, ttl):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + ttl, value)
+
+
+class RequestLayer:
+    """
+    Front door for every Groww API call.
+    Serves fresh results from a short-TTL cache, coalesces identical in-flight requests,
+    and holds callers back with per-quota token buckets so we are never throttled by Groww.
+    """
+    def __init__(self, endpoints=None, rate_limits=None, shared_limits=None):
+        self.endpoints = endpoints or config.API_ENDPOINTS
+        if shared_limits is not None:
+            # Buckets shared with other processes (see create_shared_limits)
+            self.limiters = {
+                group: RateLimiter(None, [SharedTokenBucket(*args) for args in buckets])
+                for group, buckets in shared_limits.items()
+            }
+        else:
+            self.limiters = {
+                group: RateLimiter(limits)
+                for group, limits in (rate_limits or config.API_RATE_LIMITS).items()
+            }
+        self.flight = SingleFlight()
+        self.cache = TTLCache()
+        self.stats_lock = threading.Lock()
+        self.stats = {}
+
+    def call(self, endpoint, key, fn):
+        """Runs fn() for `endpoint`, shared by all callers asking for the same key."""
+        group, ttl = self.endpoints[endpoint]
+        cache_key = (endpoint, key)
+
+        if ttl > 0:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                self._count(endpoint, "cache_hits")
+                return cached
+
+        def fetch():
+            # A caller that waited on a previous flight may find the result already cached
+            if ttl > 0:
+                cached = self.cache.get(cache_key)
+                if cached is not None:
+                    return cached
+            if group is not None:
+                self.limiters[group].acquire(config.API_MAX_RATE_WAIT)
+            self._count(endpoint, "requests")
+            result = fn()
+            if ttl > 0 and result:
+                self.cache.set(cache_key, result, ttl)
+            return result
+
+        self._count(endpoint, "calls")
+        return self.flight.do(cache_key, fetch)
+
+    def _count(self, endpoint, field):
+        with self.stats_lock:
+            counts = self.stats.setdefault(endpoint, {"calls": 0, "requests": 0, "cache_hits": 0})
+            counts[field] += 1
+
+    def get_stats(self):
+        with self.stats_lock:
+            return {k: dict(v) for k, v in self.stats.items()}
+
+
+_shared_layer = None
+_shared_lock = threading.Lock()
+
+
+def get_request_layer():
+    """Process-wide request layer, shared by every session's GrowwClient."""
+    global _shared_layer
+    with _shared_lock:
+        if _shared_layer is None:
+            _shared_layer = RequestLayer()
+        return _shared_layer
+
+
+def create_shared_limits(ctx, rate_limits=None):
+    """
+    Shared-memory bucket state for every quota group, created in the parent process and
+    handed to each worker (as a Process argument) so all of them stay within one Groww quota.
+    """
+    now = time.monotonic()
+    shared = {}
+    for group, limits in (rate_limits or config.API_RATE_LIMITS).items():
+        buckets = []
+        for rate, per in limits:
+            state = ctx.RawArray("d", [float(rate), now])
+            buckets.append((rate, per, state, ctx.Lock()))
+        shared[group] = buckets
+    return shared
+
+
+def install_shared_limits(shared_limits):
+    """Makes this process's request layer use shared quota buckets. Call before creating any GrowwClient."""
+    global _shared_layer
+    with _shared_lock:
+        _shared_layer = RequestLayer(shared_limits=shared_limits)
+        return _shared_layer
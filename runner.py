@@ -0,0 +1,202 @@
+import argparse
+import multiprocessing
+import queue
+import time
+
+import config
+from logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+def _position_exposure(positions):
+    return sum(pos["buy_price"] * pos["qty"] for pos in positions)
+
+
+def run_underlying(symbol, capital, shared_limits, updates, stop_event, interval):
+    """
+    Worker process: one StrategyEngine for one underlying.
+    Every worker draws from the same shared API quota and reports a summary after each tick.
+    """
+    # The request layer must be shared before any client exists
+    from request_layer import install_shared_limits
+    install_shared_limits(shared_limits)
+
+    from database import Database
+    from groww_client import GrowwClient
+    from strategy import StrategyEngine
+
+    from profiler import install_signal_handler
+    install_signal_handler() # kill -USR1 <worker pid> profiles this underlying's next ticks
+
+    db = Database()
+    client = GrowwClient()
+    client.capital = capital
+    client.connect(db) # Picks up the token the parent persisted
+    strategy = StrategyEngine(client, db, symbol=symbol)
+
+    while not stop_event.is_set():
+        started = time.monotonic()
+        try:
+            client.connect()
+            analysis = strategy.execute_strategy()
+            positions = [dict(pos) for pos in client.get_positions()]
+            updates.put({
+                "symbol": symbol,
+                "ts": time.time(),
+                "signal": analysis.get("signal"),
+                "ltp": analysis.get("ltp", 0),
+                "market_regime": analysis.get("market_regime"),
+                "pnl": client.get_pnl(),
+                "realized_pnl": round(client.realized_pnl, 2),
+                "charges": round(client.charges_incurred, 2),
+                "capital": client.get_available_balance(),
+                "positions": positions,
+                "exposure": round(_position_exposure(positions), 2),
+                "variants": analysis.get("variants"),
+                "surface": analysis.get("surface"),
+                "error": None,
+            })
+        except Exception as e:
+            logger.error(f"[{symbol}] Tick failed: {e}")
+            updates.put({"symbol": symbol, "ts": time.time(), "error": str(e)})
+        if config.SCHEDULER_ENABLED:
+            delay = strategy.scheduler.next_delay()
+        else:
+            delay = interval - (time.monotonic() - started)
+        # Wakes early on streamed quotes when the quote stream is enabled
+        strategy.wait_for_data(max(delay, 0.0), stop_event)
+
+    strategy.stop()
+    db.close()
+
+
+class MultiUnderlyingRunner:
+    """
+    Runs one strategy process per underlying (NIFTY, BANKNIFTY, ...) on a process pool.
+
+    Each worker has its own paper book, lot size and expiry calendar, while API rate limits are
+    shared across all of them. The parent collects the workers' summaries into a single
+    portfolio and risk view.
+    """
+    def __init__(self, symbols=None, interval=None):
+        self.symbols = list(symbols or config.RUNNER_UNDERLYINGS)
+        unknown = [s for s in self.symbols if s not in config.UNDERLYINGS]
+        if unknown:
+            raise ValueError(f"Unknown underlyings: {unknown}")
+        self.interval = interval or config.RUNNER_TICK_INTERVAL
+        # spawn: no inherited threads/locks/sqlite handles from the parent
+        self.ctx = multiprocessing.get_context("spawn")
+        self.updates = self.ctx.Queue()
+        self.stop_event = self.ctx.Event()
+        self.processes = {}
+        self.latest = {}
+
+    def start(self, db=None):
+        from request_layer import create_shared_limits
+
+        # Log in once here so the token is persisted before the workers start
+        if db is not None:
+            from groww_client import GrowwClient
+            if not GrowwClient().login(db):
+                logger.error("Login failed; workers will retry in the background")
+
+        shared_limits = create_shared_limits(self.ctx)
+        capital = config.CAPITAL / len(self.symbols)
+        for symbol in self.symbols:
+            process = self.ctx.Process(
+                target=run_underlying,
+                args=(symbol, capital, shared_limits, self.updates, self.stop_event, self.interval),
+                name=f"runner-{symbol}",
+                daemon=True,
+            )
+            process.start()
+            self.processes[symbol] = process
+
+    def poll(self, timeout=0.0):
+        """Drains pending worker summaries. Returns the number received."""
+        received = 0
+        while True:
+            try:
+                # Wait only for the first update, then take whatever else is already queued
+                update = self.updates.get(timeout=timeout) if received == 0 and timeout else self.updates.get_nowait()
+            except queue.Empty:
+                return received
+            self.latest[update["symbol"]] = {**self.latest.get(update["symbol"], {}), **update}
+            received += 1
+
+    def portfolio(self):
+        """Consolidated view across underlyings: per-symbol rows plus portfolio totals and risk."""
+        rows = []
+        for symbol in self.symbols:
+            update = self.latest.get(symbol, {})
+            process = self.processes.get(symbol)
+            rows.append({
+                "symbol": symbol,
+                "alive": process is not None and process.is_alive(),
+                "signal": update.get("signal"),
+                "ltp": update.get("ltp"),
+                "market_regime": update.get("market_regime"),
+                "pnl": update.get("pnl", 0.0),
+                "realized_pnl": update.get("realized_pnl", 0.0),
+                "charges": update.get("charges", 0.0),
+                "open_positions": len(update.get("positions", [])),
+                "exposure": update.get("exposure", 0.0),
+                "error": update.get("error"),
+            })
+
+        total_pnl = round(sum(row["pnl"] for row in rows), 2)
+        total_exposure = round(sum(row["exposure"] for row in rows), 2)
+        return {
+            "underlyings": rows,
+            "total_pnl": total_pnl,
+            "total_charges": round(sum(row["charges"] for row in rows), 2),
+            "total_exposure": total_exposure,
+            "open_positions": sum(row["open_positions"] for row in rows),
+            "exposure_pct": round(100 * total_exposure / config.CAPITAL, 2) if config.CAPITAL else 0.0,
+            "target_reached": total_pnl >= config.DAILY_PROFIT_TARGET,
+            "stop_loss_hit": total_pnl <= -config.STOP_LOSS,
+        }
+
+    def stop(self, timeout=5.0):
+        self.stop_event.set()
+        for process in self.processes.values():
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+        self.processes.clear()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the strategy on several underlyings in parallel")
+    parser.add_argument("symbols", nargs="*", help=f"Underlyings (default: {' '.join(config.RUNNER_UNDERLYINGS)})")
+    parser.add_argument("--interval", type=float, default=config.RUNNER_TICK_INTERVAL, help="Seconds between ticks")
+    args = parser.parse_args()
+
+    from database import Database
+    db = Database()
+
+    runner = MultiUnderlyingRunner(args.symbols or None, interval=args.interval)
+    runner.start(db)
+    try:
+        while True:
+            runner.poll(timeout=args.interval)
+            view = runner.portfolio()
+            for row in view["underlyings"]:
+                print(f"{row['symbol']:<12}{str(row['signal']):<16}{row['ltp'] or 0:>12.2f}{row['pnl']:>12.2f}{row['open_positions']:>4}")
+            print(
+                f"{'TOTAL':<12}{'':<16}{'':>12}{view['total_pnl']:>12.2f}{view['open_positions']:>4}"
+                f"  exposure {view['exposure_pct']:.1f}%"
+            )
+            if view["target_reached"] or view["stop_loss_hit"]:
+                logger.info("Portfolio risk limit reached; stopping all underlyings")
+                break
+    except KeyboardInterrupt:
+        pass
+    finally:
+        runner.stop()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
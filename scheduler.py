@@ -0,0 +1,144 @@
+from datetime import date, datetime, time as dt_time, timedelta
+
+import config
+from candles import INTERVAL_MINUTES
+from logger import setup_logger
+
+logger = setup_logger(__name__)
+
+_warned_years = set() # Years already reported as missing from NSE_HOLIDAYS (once per process)
+
+
+def _parse_time(value):
+    hours, minutes, seconds = map(int, value.split(":"))
+    return dt_time(hours, minutes, seconds)
+
+
+class MarketCalendar:
+    """NSE trading calendar: weekday sessions from SESSION_OPEN to SESSION_CLOSE, minus exchange holidays."""
+    def __init__(self, holidays=None):
+        self.holidays = {date.fromisoformat(d) for d in (holidays if holidays is not None else config.NSE_HOLIDAYS)}
+        self.holiday_years = {d.year for d in self.holidays}
+        self.open_time = _parse_time(config.SESSION_OPEN)
+        self.close_time = _parse_time(config.SESSION_CLOSE)
+
+    def has_holidays(self, year):
+        """False when NSE_HOLIDAYS has no entry for `year`, so its holidays would count as sessions."""
+        if year in self.holiday_years:
+            return True
+        if year not in _warned_years:
+            _warned_years.add(year)
+            logger.error(f"NSE_HOLIDAYS has no entries for {year}: exchange holidays will be treated as sessions. "
+                           f"Add the {year} list from the NSE circular to config.py")
+        return False
+
+    def is_trading_day(self, day):
+        if day.weekday() >= 5:
+            return False
+        self.has_holidays(day.year) # Warns once if the year's holidays were never entered
+        return day not in self.holidays
+
+    def session(self, day):
+        """(open, close) datetimes of the session on `day`."""
+        return datetime.combine(day, self.open_time), datetime.combine(day, self.close_time)
+
+    def is_open(self, now=None):
+        now = now or datetime.now()
+        if not self.is_trading_day(now.date()):
+            return False
+        market_open, market_close = self.session(now.date())
+        return market_open <= now <= market_close
+
+    def next_open(self, now=None):
+        """Start of the next session at or after `now` (now itself if the market is open)."""
+        now = now or datetime.now()
+        if self.is_open(now):
+            return now
+        day = now.date()
+        if self.is_trading_day(day) and now < self.session(day)[0]:
+            return self.session(day)[0]
+        day += timedelta(days=1)
+        while not self.is_trading_day(day):
+            day += timedelta(days=1)
+        return self.session(day)[0]
+
+    def status(self, now=None):
+        """(is_open, banner message) for the dashboard."""
+        now = now or datetime.now()
+        if self.is_open(now):
+            time_left = self.session(now.date())[1] - now
+            message = f"Market is OPEN. Closes in {str(time_left).split('.')[0]}"
+            if not self.has_holidays(now.year):
+                message += f" (no NSE holiday list for {now.year}: check the exchange calendar)"
+            return True, message
+        opens_at = self.next_open(now)
+        if now.date() in self.holidays:
+            reason = "Market is CLOSED (NSE holiday)."
+        else:
+            reason = "Market is CLOSED."
+        if opens_at.date() == now.date():
+            return False, f"Market is CLOSED. Opens in {str(opens_at - now).split('.')[0]}"
+        return False, f"{reason} Opens {opens_at.strftime('%a %d %b %H:%M')}"
+
+
+class PollScheduler:
+    """
+    Decides when a tick should run and what it should fetch.
+
+    Outside market hours nothing is polled. Inside them the option chain is polled at a cadence
+    that depends on the last observed market regime (fast when TRENDING or on high momentum,
+    slow when DEAD/FLAT), and candles are fetched only once a bar of `candle_interval` has closed
+    instead of on every tick.
+    """
+    def __init__(self, calendar=None, candle_interval=None):
+        self.calendar = calendar or MarketCalendar()
+        self.candle_interval = candle_interval or config.FEATURE_INTERVAL
+        self.regime = "UNKNOWN"
+        self.high_momentum = False
+        self.last_candle_fetch = None
+
+    def observe(self, regime, high_momentum=False):
+        """Records the regime of the latest tick; it sets the cadence of the next polls."""
+        self.regime = regime or "UNKNOWN"
+        self.high_momentum = bool(high_momentum)
+
+    def chain_interval(self):
+        if self.high_momentum:
+            return config.POLL_INTERVALS["TRENDING"]
+        return config.POLL_INTERVALS.get(self.regime, config.POLL_INTERVALS["UNKNOWN"])
+
+    def last_bar_close(self, now):
+        """Close time of the most recent completed bar, or None before the first bar of the session closes."""
+        market_open, market_close = self.calendar.session(now.date())
+        step = timedelta(minutes=INTERVAL_MINUTES[self.candle_interval] or 375)
+        if now < market_open + step:
+            return None
+        return market_open + ((min(now, market_close) - market_open) // step) * step
+
+    def candles_due(self, now=None):
+        """True if a bar has closed (plus a settle delay for the broker to publish it) since the last fetch."""
+        now = now or datetime.now()
+        if self.last_candle_fetch is None:
+            return True
+        bar_close = self.last_bar_close(now - timedelta(seconds=config.CANDLE_SETTLE_SECONDS))
+        return bar_close is not None and self.last_candle_fetch < bar_close + timedelta(seconds=config.CANDLE_SETTLE_SECONDS)
+
+    def mark_candles_fetched(self, now=None):
+        self.last_candle_fetch = now or datetime.now()
+
+    def next_delay(self, now=None):
+        """Seconds until the next tick should run."""
+        now = now or datetime.now()
+        if not self.calendar.is_open(now):
+            # Re-check periodically so status banners stay current; wake exactly at the open
+            until_open = (self.calendar.next_open(now) - now).total_seconds()
+            return max(min(until_open, config.MARKET_CLOSED_RECHECK), 1.0)
+        delay = self.chain_interval()
+        # Never sleep past the next candle close
+        step = timedelta(minutes=INTERVAL_MINUTES[self.candle_interval] or 375)
+        bar_close = self.last_bar_close(now)
+        next_close = (bar_close or self.calendar.session(now.date())[0]) + step
+        until_close = (next_close - now).total_seconds() + config.CANDLE_SETTLE_SECONDS
+        if 0 < until_close < delay:
+            delay = until_close
+        return delay
@@ -0,0 +1,221 @@
+import json
+import sys
+import threading
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+import config
+from logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Option chain columns published each tick, in this order
+CHAIN_COLUMNS = [
+    "strike_price",
+    "ce_ltp", "pe_ltp", "ce_oi", "pe_oi", "ce_volume", "pe_volume",
+    "ce_iv", "pe_iv", "ce_delta", "pe_delta", "ce_theta", "pe_theta",
+    "ce_gamma", "pe_gamma", "ce_vega", "pe_vega",
+    "ce_id", "pe_id", # contracts.ContractRegistry ids of the legs
+]
+
+# Header: seq, publish time (ns), chain rows, feature count, summary bytes
+HEADER_DTYPE = np.dtype([
+    ("seq", "i8"),
+    ("ts", "i8"),
+    ("n_strikes", "i8"),
+    ("n_features", "i8"),
+    ("summary_len", "i8"),
+])
+
+
+def _layout():
+    """Byte offsets of each section inside the shared block."""
+    header = HEADER_DTYPE.itemsize
+    chain = config.SNAPSHOT_MAX_STRIKES * len(CHAIN_COLUMNS) * 8
+    features = config.SNAPSHOT_MAX_FEATURES * 8
+    return {
+        "chain": header,
+        "features": header + chain,
+        "summary": header + chain + features,
+        "size": header + chain + features + config.SNAPSHOT_SUMMARY_BYTES,
+    }
+
+
+def block_name(symbol):
+    return f"{config.SNAPSHOT_SHM_PREFIX}_{symbol}"
+
+
+_owned_blocks = set() # Blocks published by this process
+
+
+class _SnapshotBlock:
+    def __init__(self, shm):
+        self.shm = shm
+        layout = _layout()
+        buf = shm.buf
+        self.header = np.ndarray((1,), dtype=HEADER_DTYPE, buffer=buf)
+        self.chain = np.ndarray(
+            (config.SNAPSHOT_MAX_STRIKES, len(CHAIN_COLUMNS)), dtype=np.float64, buffer=buf, offset=layout["chain"]
+        )
+        self.features = np.ndarray(
+            (config.SNAPSHOT_MAX_FEATURES,), dtype=np.float64, buffer=buf, offset=layout["features"]
+        )
+        self.summary = np.ndarray(
+            (config.SNAPSHOT_SUMMARY_BYTES,), dtype=np.uint8, buffer=buf, offset=layout["summary"]
+        )
+
+    def close(self):
+        # Drop our views before closing, otherwise the mmap cannot be released
+        self.header = self.chain = self.features = self.summary = None
+        self.shm.close()
+
+
+class SnapshotPublisher:
+    """
+    Publishes each tick's chain columns, feature row and signal summary into shared memory.
+
+    Writes are guarded by a seqlock: the sequence number is odd while a write is in progress
+    and even once it is complete, so readers in other processes never need a lock or a pickle.
+    """
+    def __init__(self, symbol):
+        self.name = block_name(symbol)
+        size = _layout()["size"]
+        try:
+            shm = shared_memory.SharedMemory(name=self.name, create=True, size=size)
+        except FileExistsError:
+            # Left behind by a previous run; reuse it unless it was laid out for other limits
+            shm = shared_memory.SharedMemory(name=self.name)
+            if shm.size < size:
+                logger.warning(f"Snapshot block {self.name} is {shm.size} bytes, expected {size}; recreating it")
+                shm.close()
+                shm.unlink()
+                shm = shared_memory.SharedMemory(name=self.name, create=True, size=size)
+        _owned_blocks.add(self.name)
+        self.block = _SnapshotBlock(shm)
+        self.block.header["seq"] = 0
+        self.lock = threading.Lock() # Sessions in this process share the publisher; one writer at a time
+
+    def publish(self, chain, feature_row=None, summary=None):
+        with self.lock:
+            self._write(chain, feature_row, summary)
+
+    def _write(self, chain, feature_row, summary):
+        block = self.block
+        header = block.header[0]
+
+        n_strikes = 0
+        if chain is not None and not chain.empty:
+            cols = chain.reindex(columns=CHAIN_COLUMNS)
+            n_strikes = min(len(cols), config.SNAPSHOT_MAX_STRIKES)
+        n_features = 0
+        if feature_row is not None:
+            n_features = min(len(feature_row), config.SNAPSHOT_MAX_FEATURES)
+        summary_bytes = json.dumps(summary or {}, default=str).encode()
+        if len(summary_bytes) > config.SNAPSHOT_SUMMARY_BYTES:
+            logger.warning("Snapshot summary truncated; increase SNAPSHOT_SUMMARY_BYTES")
+            summary_bytes = b"{}"
+
+        header["seq"] += 1 # Odd: write in progress
+        if n_strikes:
+            block.chain[:n_strikes] = cols.to_numpy(dtype=np.float64, na_value=np.nan)[:n_strikes]
+        if n_features:
+            block.features[:n_features] = np.asarray(feature_row, dtype=np.float64)[:n_features]
+        block.summary[:len(summary_bytes)] = np.frombuffer(summary_bytes, dtype=np.uint8)
+        header["ts"] = time.time_ns()
+        header["n_strikes"] = n_strikes
+        header["n_features"] = n_features
+        header["summary_len"] = len(summary_bytes)
+        header["seq"] += 1 # Even: snapshot complete
+
+    def close(self, unlink=True):
+        self.block.close()
+        if unlink:
+            try:
+                self.block.shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+class SnapshotReader:
+    """Attaches to a publisher's block from any process and reads the latest consistent snapshot."""
+    def __init__(self, symbol):
+        shm = shared_memory.SharedMemory(name=block_name(symbol))
+        if sys.version_info < (3, 13) and shm.name not in _owned_blocks:
+            # Before 3.13 attaching registers the block with this process's resource tracker,
+            # which would unlink it (under the publisher) when we exit
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(shm._name, "shared_memory")
+        self.block = _SnapshotBlock(shm)
+
+    @property
+    def seq(self):
+        return int(self.block.header["seq"][0])
+
+    def read_views(self, timeout=None):
+        """
+        Zero-copy views of the current snapshot plus its sequence number.
+        The views are only consistent if is_current(seq) still holds after the caller has used them.
+        Returns (None, None) if a write stays in progress for `timeout` seconds (e.g. the writer died mid-update).
+        """
+        timeout = config.SNAPSHOT_READ_TIMEOUT if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        while True:
+            seq = self.seq
+            if seq % 2 == 0:
+                break
+            if time.monotonic() > deadline:
+                return None, None
+            time.sleep(0) # Writer mid-update
+        header = self.block.header[0]
+        n_strikes = int(header["n_strikes"])
+        n_features = int(header["n_features"])
+        return seq, {
+            "ts": int(header["ts"]),
+            "chain": self.block.chain[:n_strikes],
+            "features": self.block.features[:n_features],
+            "summary_raw": self.block.summary[:int(header["summary_len"])],
+        }
+
+    def is_current(self, seq):
+        return self.seq == seq
+
+    def read(self, retries=100):
+        """Consistent copy of the latest snapshot, or None if the writer kept racing us."""
+        for _ in range(retries):
+            seq, views = self.read_views()
+            if not seq:
+                return None # Nothing published yet, or the writer is stuck mid-update
+            snapshot = {
+                "seq": seq,
+                "ts": views["ts"],
+                "chain": views["chain"].copy(),
+                "features": views["features"].copy(),
+                "summary": bytes(views["summary_raw"]),
+            }
+            if self.is_current(seq):
+                snapshot["summary"] = json.loads(snapshot["summary"] or b"{}")
+                return snapshot
+        return None
+
+    def close(self):
+        self.block.close()
+
+
+_publishers = {}
+_publishers_lock = threading.Lock() # One publisher (and so one seqlock writer) per block
+
+
+def get_publisher(symbol):
+    """Process-wide publisher per underlying, or None if publishing is disabled/unavailable."""
+    if not config.SNAPSHOT_PUBLISH:
+        return None
+    with _publishers_lock:
+        if symbol not in _publishers:
+            try:
+                _publishers[symbol] = SnapshotPublisher(symbol)
+            except Exception as e:
+                logger.error(f"Could not create snapshot block for {symbol}: {e}")
+                _publishers[symbol] = None
+        return _publishers[symbol]
@@ -1,186 +1,260 @@
+import calendar
+import os
+import threading
+import time
+from datetime import date
 import pandas as pd
-import pandas_ta as ta
 import numpy as np
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.model_selection import train_test_split
 import config
+from candles import get_candle_store
+from order_manager import OrderManager, OrderState, PaperOrderGateway, create_gateway
+from fill_simulator import FillSimulator
+from snapshot_bus import get_publisher
+from feature_store import feature_version, get_feature_store
+from features import SUPERTREND, SUPERTREND_DIRECTION, feature_frame
+from models import create_model
+from scheduler import PollScheduler
+from profiler import get_profiler
+from stream import get_quote_stream
+from checkpoint import get_checkpoint, load_model
+from contracts import get_contract_registry
+from vol_surface import VolSurface
 from logger import setup_logger
 
 logger = setup_logger(__name__)
 
-class StrategyEngine:
-    def __init__(self, client, db):
-        self.client = client
+# Analysis fields published with each shared-memory snapshot
+SNAPSHOT_SUMMARY_KEYS = [
+    'signal', 'pcr', 'ltp', 'ml_signal', 'pcr_signal', 'live_trend',
+    'current_candle', 'market_regime', 'supertrend', 'mtf_trend', 'surface',
+]
+
+# Features used for the model (a subset of features.FEATURE_COLUMNS)
+MODEL_FEATURES = [
+    'RSI', 'SMA_20', 'SMA_50', 
+    'MACD_12_26_9', 'MACDh_12_26_9', 'MACDs_12_26_9', 
+    'BBL_20_2.0', 'BBU_20_2.0',
+    'ADX_14', 'DMP_14', 'DMN_14', # ADX components
+    'ATR', 'Returns', 'RSI_Slope',
+    'Body_Size', 'Upper_Wick', 'Lower_Wick', 'Candle_Color'
+]
+
+# Decision thresholds of the primary strategy; each entry of config.STRATEGY_VARIANTS overrides some of them
+STRATEGY_PARAMS = {
+    'pcr_bullish': 1.2, # PCR above this is BULLISH
+    'pcr_bearish': 0.8, # PCR below this is BEARISH
+    'adx_flat': 20, # ADX below this (without momentum) is DEAD/FLAT
+    'adx_trending': 25, # ADX from here up is TRENDING, in between CHOPPY/VOLATILE
+    'momentum_atr': 1.0, # Candle body above this many ATRs is high momentum
+    'model_engine': None, # Direction model engine (None = config.MODEL_ENGINE)
+}
+
+
+def model_feature_columns(columns):
+    """MODEL_FEATURES present in `columns` (all of them for any frame of the current feature schema)."""
+    return [f for f in MODEL_FEATURES if f in columns]
+
+
+def direction_labels(close, threshold=0.0002):
+    """
+    Target: 3-Class Classification
+    1: Bullish (Next Close > Current Close + Threshold)
+    -1: Bearish (Next Close < Current Close - Threshold)
+    0: Neutral (Sideways)
+    The threshold (0.02% by default) is the move required to be significant.
+    The last candle has no next close and is labelled 0.
+    """
+    labels = np.zeros(len(close), dtype=np.int8)
+    next_close = close[1:]
+    current = close[:-1]
+    labels[:-1] = np.select(
+        [next_close > current * (1 + threshold), next_close < current * (1 - threshold)], [1, -1], default=0
+    )
+    return labels
+
+
+def build_training_set(features):
+    """
+    Labels a prepare_features() frame for training.
+    Returns (X, y) in candle order, or (None, None) if there is nothing to train on.
+    """
+    if features is None or features.empty:
+        return None, None
+
+    feature_names = model_feature_columns(features.columns)
+    missing_features = [f for f in MODEL_FEATURES if f not in feature_names]
+    if missing_features:
+        logger.warning(f"Missing indicators: {missing_features}. Training with available features.")
+
+    # The last candle has no next close yet, so no label; warm-up rows (NaN features) are dropped
+    target = pd.Series(direction_labels(features['close'].to_numpy()), index=features.index, name='Target')
+    X = features[feature_names].iloc[:-1]
+    keep = X.notna().all(axis=1).to_numpy()
+    return X[keep], target.iloc[:-1][keep]
+
+
+def compute_features(df):
+    """
+    Calculates the technical indicators used for training, prediction and the feature store.
+    `df` is a candle DataFrame or CANDLE_DTYPE array; the result has features.FRAME_COLUMNS.
+    Its source is hashed into the feature version (see feature_store.feature_version).
+    """
+    return feature_frame(df)
+
+
+class StrategyVariant:
+    """
+    Decision logic, direction model and paper book of one strategy configuration.
+
+    Market data, indicators and snapshot publishing belong to StrategyEngine, which fans every
+    tick out to its variants; a variant only adds its own decisions and order handling.
+    """
+    def __init__(self, client, db, symbol, name=None, params=None, fill_sim=None, gateway=None,
+                 checkpoint=None, feature_version=None):
+        self.client = client # Account (positions, capital, PnL) this variant trades in
         self.db = db
+        self.symbol = symbol
+        self.spec = config.UNDERLYINGS[self.symbol] # Lot size, expiry weekday, etc.
+        self.name = name # Tag of this variant's trade rows (None for the primary strategy)
+        self.tag = f" [{name}]" if name else "" # Log prefix
+        self.params = {**STRATEGY_PARAMS, **(params or {})}
+        self.model_engine = self.params['model_engine'] or config.MODEL_ENGINE
         self.model = None
         self.is_trained = False
         self.last_signal = "NEUTRAL"
+        self.fill_sim = fill_sim
+        self.orders = OrderManager(gateway or PaperOrderGateway(client, fill_sim))
+        self.contracts = get_contract_registry() # Contract id -> strike, type, trading symbol
+        self.checkpoint = checkpoint # Crash-safe account/model state, None when disabled
+        self.feature_version = feature_version
+        self._model_loading = None # Background load of a checkpointed model
 
-    def prepare_features(self, df):
-        """
-        Helper to calculate technical indicators for both training and prediction.
-        """
-        df = df.copy()
-        
-        # RSI
-        df['RSI'] = ta.rsi(df['close'], length=14)
-        
-        # MACD
-        macd = ta.macd(df['close'])
-        if macd is not None:
-            df = pd.concat([df, macd], axis=1)
-        
-        # Bollinger Bands
-        bb = ta.bbands(df['close'], length=20)
-        if bb is not None:
-            df = pd.concat([df, bb], axis=1)
-        else:
-            logger.warning("Bollinger Bands could not be calculated.")
-
-        
-        # ADX (Trend Strength)
-        adx = ta.adx(df['high'], df['low'], df['close'], length=14)
-        if adx is not None:
-            df = pd.concat([df, adx], axis=1)
-
-        # ATR (Volatility)
-        df['ATR'] = ta.atr(df['high'], df['low'], df['close'], length=14)
-
-        # Moving Averages
-        df['SMA_20'] = ta.sma(df['close'], length=20)
-        df['SMA_50'] = ta.sma(df['close'], length=50)
-        
-        # Supertrend (Faster Trend Indicator)
-        # Returns 3 columns: SUPERT_7_3.0, SUPERTd_7_3.0, SUPERTl_7_3.0
-        st_data = ta.supertrend(df['high'], df['low'], df['close'], length=7, multiplier=3)
-        if st_data is not None:
-            df = pd.concat([df, st_data], axis=1)
-            # Rename for easier access (pandas_ta names can be verbose)
-            # We look for the column that starts with SUPERT_ (the value) and SUPERTd_ (the direction)
-            # Direction: 1 is Bullish, -1 is Bearish
-            
-        # Momentum / Returns
-        df['Returns'] = df['close'].pct_change()
-        df['RSI_Slope'] = df['RSI'].diff()
-        
-        # Candle Patterns (Price Action)
-        df['Body_Size'] = abs(df['close'] - df['open'])
-        df['Upper_Wick'] = df['high'] - np.maximum(df['close'], df['open'])
-        df['Lower_Wick'] = np.minimum(df['close'], df['open']) - df['low']
-        df['Candle_Color'] = np.where(df['close'] > df['open'], 1, -1) # 1 Green, -1 Red
-
-        return df
-
-    def train_prediction_model(self, historical_data):
-        # Enhanced Random Forest model to predict direction
-        # historical_data should have OHLCV
-        if historical_data is None or len(historical_data) < 200:
+    def restore(self):
+        """Restores the paper account, last signal and model from the checkpoint. Returns True if anything was restored."""
+        if self.checkpoint is None:
+            return False
+        account = self.checkpoint.get("account")
+        if account:
+            self.client.restore_account(account)
+            self.last_signal = account.get("last_signal", self.last_signal)
+        reference = self.checkpoint.get("model")
+        usable = (reference and reference.get("engine") == self.model_engine
+                  and reference.get("feature_version") == self.feature_version and os.path.exists(reference["path"]))
+        if usable:
+            # Unpickling imports the model library (about a second for sklearn), so it happens in the
+            # background; the first prediction waits for it instead of startup
+            self.feature_columns = reference["feature_columns"]
+            self.model_run_id = reference.get("run_id")
+            self.is_trained = True
+            self._model_loading = threading.Thread(
+                target=self._load_checkpointed_model, args=(reference,), name="model-restore", daemon=True
+            )
+            self._model_loading.start()
+        return bool(account) or bool(usable)
+
+    def _load_checkpointed_model(self, reference):
+        try:
+            self.model = load_model(reference, self.feature_version)
+        except Exception as e:
+            logger.error(f"Could not load checkpointed model{self.tag}: {e}")
+            self.model = None
+        if self.model is None:
+            self.is_trained = False # Retrain on the next tick
+
+    def checkpoint_account(self):
+        """Records the paper account and last signal (after every fill)."""
+        if self.checkpoint is None:
+            return
+        account = self.client.export_account()
+        account["last_signal"] = self.last_signal
+        try:
+            self.checkpoint.record("account", account)
+        except Exception as e:
+            logger.error(f"Checkpoint write failed{self.tag}: {e}")
+
+    def checkpoint_model(self):
+        """Pickles the current model and records a reference to it, so a restart does not retrain."""
+        if self.checkpoint is None or not self.is_trained:
+            return
+        try:
+            name = f"{self.symbol}{'.' + self.name if self.name else ''}_{self.model_engine}"
+            self.checkpoint.record("model", {
+                "path": self.checkpoint.save_model(self.model, name),
+                "engine": self.model_engine,
+                "feature_columns": list(self.feature_columns),
+                "feature_version": self.feature_version,
+                "run_id": getattr(self, 'model_run_id', None),
+            })
+        except Exception as e:
+            logger.error(f"Could not checkpoint model{self.tag}: {e}")
+
+    def train_prediction_model(self, historical_data, features=None):
+        # Direction model (engine chosen by the model_engine parameter, see models.py)
+        # historical_data should have OHLCV; `features` is an already computed
+        # prepare_features() frame (e.g. read from the feature store)
+        source = features if features is not None else historical_data
+        if source is None or len(source) < 200:
             logger.warning("Not enough data to train model (Need > 200 candles)")
             return
 
         # Feature Engineering
-        df = self.prepare_features(historical_data)
-        
-        # Target: 3-Class Classification
-        # 1: Bullish (Next Close > Current Close + Threshold)
-        # -1: Bearish (Next Close < Current Close - Threshold)
-        # 0: Neutral (Sideways)
-        
-        threshold = 0.0002 # 0.02% move required to be significant
-        
-        conditions = [
-            (df['close'].shift(-1) > df['close'] * (1 + threshold)),
-            (df['close'].shift(-1) < df['close'] * (1 - threshold))
-        ]
-        choices = [1, -1]
-        df['Target'] = np.select(conditions, choices, default=0)
-        
-        df.dropna(inplace=True)
-        
-        # Features used for the model
-        # Note: Pandas TA column names can vary by version. We check for variations.
-        features = [
-            'RSI', 'SMA_20', 'SMA_50', 
-            'MACD_12_26_9', 'MACDh_12_26_9', 'MACDs_12_26_9', 
-            'BBL_20_2.0', 'BBU_20_2.0',
-            'ADX_14', 'DMP_14', 'DMN_14', # ADX components
-            'ATR', 'Returns', 'RSI_Slope',
-            'Body_Size', 'Upper_Wick', 'Lower_Wick', 'Candle_Color'
-        ]
-        
-        # Dynamic Column Mapping for Bollinger Bands
-        # Sometimes they appear as BBL_20_2.0_2.0 or similar
-        if 'BBL_20_2.0' not in df.columns:
-            for col in df.columns:
-                if col.startswith('BBL_20'):
-                    features = [f if f != 'BBL_20_2.0' else col for f in features]
-                if col.startswith('BBU_20'):
-                    features = [f if f != 'BBU_20_2.0' else col for f in features]
-
-        # Ensure all features exist
-        available_features = [f for f in features if f in df.columns]
-        
-        missing_features = list(set(features) - set(available_features))
-        if missing_features:
-            logger.warning(f"Missing indicators: {missing_features}")
-            # Debug: Print available columns to help identify naming mismatches
-            logger.debug(f"Available columns in DF: {df.columns.tolist()}")
-        
-        if len(available_features) < len(features):
-            logger.warning("Some indicators could not be calculated. Training with available features.")
-        
-        X = df[available_features]
-        y = df['Target']
-        
-        if len(X) < 100:
+        df = features if features is not None else compute_features(historical_data)
+
+        X, y = build_training_set(df)
+        if X is None or len(X) < 100:
             logger.warning("Not enough data after dropping NaNs")
             return
 
-        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-        
-        # More robust model parameters
-        self.model = RandomForestClassifier(
-            n_estimators=200,      # More trees
-            max_depth=10,          # Prevent overfitting
-            min_samples_split=10,  # Require more samples to split
-            min_samples_leaf=5,    # Require more samples in leaves
-            random_state=42
-        )
+        # Chronological holdout: train on the past, test on the most recent 20%
+        # (a random split would leak future bars into training)
+        split = int(len(X) * 0.8)
+        X_train, X_test = X.iloc[:split], X.iloc[split:]
+        y_train, y_test = y.iloc[:split], y.iloc[split:]
+
+        self.model = create_model(self.model_engine)
         self.model.fit(X_train, y_train)
-        
+
         # Evaluate accuracy
         train_score = self.model.score(X_train, y_train)
         test_score = self.model.score(X_test, y_test)
-        logger.info(f"Model Trained. Train Acc: {train_score:.2f}, Test Acc: {test_score:.2f}")
-        
+        logger.info(f"Model ({self.model_engine}) Trained. Train Acc: {train_score:.2f}, Test Acc: {test_score:.2f}")
+
+        available_features = list(X.columns)
         self.is_trained = True
         self.feature_columns = available_features # Save features used for training
 
-    def predict_direction(self, current_data):
+    def predict_direction(self, current_data, features=None):
         """
         Predicts the direction for the next candle.
+        `features` is the prepare_features() frame of current_data, if already computed.
         Returns: 1 (Bullish), -1 (Bearish), 0 (Neutral)
         """
+        if self._model_loading is not None:
+            self._model_loading.join()
+            self._model_loading = None
         if not self.is_trained or current_data is None or len(current_data) < 60:
             return 0 # Default to Neutral if not ready
-        
+
         # Prepare features
-        df = self.prepare_features(current_data)
-        
+        df = features if features is not None else compute_features(current_data)
+
         # Get the last row (most recent candle)
         last_row = df.iloc[[-1]]
-        
+
         # Ensure we have the same features as training
         if not hasattr(self, 'feature_columns'):
             return 0
-            
+
         X_pred = last_row[self.feature_columns]
-        
+
         # Check for NaNs in the input
         if X_pred.isnull().values.any():
             # If indicators are NaN (e.g. not enough data for SMA_50), we can't predict
             return 0
-            
+
+        if getattr(self.model, 'feature_names_in_', None) is None:
+            X_pred = X_pred.to_numpy(dtype=np.float32) # Walk-forward models are fitted on float32 arrays
+
         prediction = self.model.predict(X_pred)
         return prediction[0]
 
@@ -188,72 +262,57 @@ class StrategyEngine:
         # PCR (Put Call Ratio) Analysis
         total_pe_oi = chain_df['pe_oi'].sum()
         total_ce_oi = chain_df['ce_oi'].sum()
-        
+
         pcr = total_pe_oi / total_ce_oi if total_ce_oi > 0 else 0
-        
+
         signal = "NEUTRAL"
-        if pcr > 1.2:
+        if pcr > self.params['pcr_bullish']:
             signal = "BULLISH" # More puts sold, support is strong
-        elif pcr < 0.8:
+        elif pcr < self.params['pcr_bearish']:
             signal = "BEARISH" # More calls sold, resistance is strong
-            
+
         return {
             "pcr": pcr,
             "signal": signal
         }
 
-    def execute_strategy(self):
-        # Check Daily Profit Target
-        todays_pnl = self.db.get_todays_pnl()
-        if todays_pnl >= config.DAILY_PROFIT_TARGET:
-            logger.info(f"Daily Profit Target Reached: {todays_pnl:.2f} >= {config.DAILY_PROFIT_TARGET}. Stopping trades.")
-            return {"signal": "TARGET_REACHED", "pcr": 0, "ltp": 0, "chain": None}
+    def todays_pnl(self):
+        return self.db.get_todays_pnl(self.name, self.symbol)
 
-        # Main loop to check conditions and trade
-        
-        # 1. Fetch Option Chain
-        chain, ltp = self.client.get_option_chain()
-        
-        if chain.empty:
-            return {"signal": "NO_DATA", "pcr": 0, "ltp": 0, "chain": None}
+    def evaluate(self, tick):
+        """Signals of this variant for one tick of shared market data (see StrategyEngine._market_tick)."""
+        chain = tick['chain']
+        ltp = tick['ltp']
+        hist_data = tick['hist_data']
+        features = tick['features']
 
-        # 2. Fetch Historical Data for ML
-        # We need enough data for indicators (at least 50 candles)
-        hist_data = self.client.get_historical_data(symbol="NIFTY", interval="5m")
-        
-        # 3. Train Model if not trained (and we have data)
-        if not self.is_trained and not hist_data.empty and len(hist_data) > 200:
-            self.train_prediction_model(hist_data)
-            
         # 4. Get ML Prediction
         ml_signal = "NEUTRAL"
         if self.is_trained:
-            prediction = self.predict_direction(hist_data)
+            prediction = self.predict_direction(hist_data, features)
             if prediction == 1:
                 ml_signal = "BULLISH"
             elif prediction == -1:
                 ml_signal = "BEARISH"
             else:
                 ml_signal = "NEUTRAL"
-        
+
         # 5. Get PCR Signal
         analysis = self.analyze_option_chain(chain)
         pcr_signal = analysis['signal']
-        
+
         # 6. Live Trend Check (Trend Filter)
         # Use SMA 50 and SMA 20 to determine the broader trend
         # This prevents buying on small pullbacks during a downtrend
         live_trend = "NEUTRAL"
         current_candle_status = "NEUTRAL"
         market_regime = "UNKNOWN"
+        is_high_momentum = False
         st_direction = 0
-        
-        if not hist_data.empty:
-            # CRITICAL: Calculate indicators for the latest data if not already present
-            # The hist_data from client is raw OHLCV. We need to add indicators.
-            hist_data_with_indicators = self.prepare_features(hist_data)
-            last_row = hist_data_with_indicators.iloc[-1]
-            
+
+        if features is not None:
+            last_row = features.iloc[-1]
+
             # Current Candle Status (Immediate Price Action)
             if last_row['close'] > last_row['open']:
                 current_candle_status = "BULLISH (Green)"
@@ -263,35 +322,31 @@ class StrategyEngine:
                 current_candle_status = "DOJI (Neutral)"
 
             # --- Market Regime Detection ---
-            # ADX_14 is the standard column name from pandas_ta
             adx = last_row.get('ADX_14', 0)
-            
+
             # Check for Momentum (Large Candle Body relative to ATR) to catch sudden moves
             body_size = last_row.get('Body_Size', 0)
             atr = last_row.get('ATR', 0)
-            is_high_momentum = body_size > (atr * 1.0) if atr > 0 else False # If body is larger than ATR, it's a strong move
-            
-            if adx < 20 and not is_high_momentum:
+            is_high_momentum = body_size > (atr * self.params['momentum_atr']) if atr > 0 else False # If body is larger than ATR, it's a strong move
+
+            if adx < self.params['adx_flat'] and not is_high_momentum:
                 market_regime = "DEAD/FLAT"
-            elif adx < 25 and not is_high_momentum:
+            elif adx < self.params['adx_trending'] and not is_high_momentum:
                 market_regime = "CHOPPY/VOLATILE"
             else:
                 market_regime = "TRENDING"
-                
-            logger.info(f"Market Regime: {market_regime} (ADX: {adx:.2f}, Momentum: {is_high_momentum})")
+
+            logger.info(f"Market Regime{self.tag}: {market_regime} (ADX: {adx:.2f}, Momentum: {is_high_momentum})")
 
             # Ensure we have the indicators calculated
             if 'SMA_50' in last_row and 'SMA_20' in last_row:
                 sma_50 = last_row['SMA_50']
                 sma_20 = last_row['SMA_20']
-                
+
                 # Check for Supertrend Direction if available
-                st_dir_col = [c for c in hist_data_with_indicators.columns if c.startswith('SUPERTd_')][0] if any(c.startswith('SUPERTd_') for c in hist_data_with_indicators.columns) else None
-                st_val_col = [c for c in hist_data_with_indicators.columns if c.startswith('SUPERT_') and not c.startswith('SUPERTd')][0] if any(c.startswith('SUPERT_') and not c.startswith('SUPERTd') for c in hist_data_with_indicators.columns) else None
-                
-                st_direction = last_row[st_dir_col] if st_dir_col else 0
-                st_value = last_row[st_val_col] if st_val_col else 0
-                
+                st_direction = last_row.get(SUPERTREND_DIRECTION, 0)
+                st_value = last_row.get(SUPERTREND, 0)
+
                 # LIVE ADJUSTMENT: Check if current LTP breaks the Supertrend level
                 # This fixes the "Lag" where the candle hasn't closed yet but price has crossed.
                 if st_direction == 1 and ltp < st_value:
@@ -300,9 +355,9 @@ class StrategyEngine:
                 elif st_direction == -1 and ltp > st_value:
                     # logger.info(f"Live Supertrend Break detected! Price {ltp} > ST {st_value}. Flipping to BULLISH.")
                     st_direction = 1
-                
+
                 # --- Dynamic Trend Logic based on Regime ---
-                
+
                 if market_regime == "DEAD/FLAT":
                     # Market is dead. Force Neutral to avoid whipsaws.
                     # EXCEPTION: If we have high momentum, trust the Supertrend/Price Action
@@ -313,7 +368,7 @@ class StrategyEngine:
                             live_trend = "BEARISH"
                     else:
                         live_trend = "NEUTRAL"
-                    
+
                 elif market_regime == "TRENDING":
                     # Strong Trend: Trust the Moving Averages (SMA 50/20)
                     # They are slower but filter out noise in a strong trend.
@@ -324,7 +379,7 @@ class StrategyEngine:
                         live_trend = "BEARISH"
                     else:
                         live_trend = "NEUTRAL"
-                        
+
                 else: # CHOPPY/VOLATILE (15 <= ADX < 25)
                     # Volatile Market: Trust Supertrend (Faster)
                     # SMA is too slow here.
@@ -334,11 +389,11 @@ class StrategyEngine:
                         live_trend = "BEARISH"
                     else:
                         live_trend = "NEUTRAL"
-        
+
         # 7. Combine Signals (Confluence Strategy)
         # We only trade if signals agree
         final_signal = "NEUTRAL"
-        
+
         # Strong Buy: ML + PCR + Live Trend all agree
         if pcr_signal == "BULLISH" and ml_signal == "BULLISH" and live_trend == "BULLISH":
             final_signal = "BULLISH"
@@ -348,7 +403,7 @@ class StrategyEngine:
         # Scalping Buy: ML is Bullish + Current Candle is Green (Ignore Trend/PCR if strong momentum)
         elif ml_signal == "BULLISH" and current_candle_status == "BULLISH (Green)" and pcr_signal != "BEARISH":
              final_signal = "BULLISH"
-            
+
         # Strong Sell
         elif pcr_signal == "BEARISH" and ml_signal == "BEARISH" and live_trend == "BEARISH":
             final_signal = "BEARISH"
@@ -358,10 +413,10 @@ class StrategyEngine:
         # Scalping Sell: ML is Bearish + Current Candle is Red
         elif ml_signal == "BEARISH" and current_candle_status == "BEARISH (Red)" and pcr_signal != "BULLISH":
             final_signal = "BEARISH"
-        
+
         # Log Analysis Status
-        logger.debug(f"Analysis: ML={ml_signal} | PCR={analysis['pcr']:.2f}({pcr_signal}) | Trend={live_trend} | Final={final_signal}")
-        
+        logger.debug(f"Analysis{self.tag}: ML={ml_signal} | PCR={analysis['pcr']:.2f}({pcr_signal}) | Trend={live_trend} | Final={final_signal}")
+
         analysis['ltp'] = ltp
         analysis['chain'] = chain
         analysis['signal'] = final_signal # Override with combined signal
@@ -370,36 +425,45 @@ class StrategyEngine:
         analysis['live_trend'] = live_trend
         analysis['current_candle'] = current_candle_status
         analysis['market_regime'] = market_regime
+        analysis['high_momentum'] = is_high_momentum
         analysis['supertrend'] = "BULLISH" if st_direction == 1 else "BEARISH" if st_direction == -1 else "NEUTRAL"
-        
-        current_signal = final_signal
-        
+        analysis['chains'] = tick.get('chains', {})
+        analysis['entry_chain'] = tick.get('entry_chain', chain)
+        surface = tick.get('surface')
+        if surface is not None and len(surface):
+            # ATM IV term structure and skew across the fetched expiries
+            analysis['surface'] = surface.summary()
+            analysis['term_structure'] = surface.term_structure()
+        return analysis
+
+    def trade(self, analysis, signal_ts):
+        """Manages this variant's positions on the tick's signal. Orders are booked in self.client."""
+        chain = analysis['chain']
+        ltp = analysis['ltp']
+        current_signal = analysis['signal']
+
         # --- Position Management & Execution ---
-        
+
         # 1. Update Prices of Open Positions
         # We need to find the LTP of our held positions from the current chain
         open_positions = self.client.get_positions()
+        chains = analysis.get('chains') or {}
         for pos in open_positions:
-            # Extract strike and type from symbol "NIFTY 25000 CE"
-            try:
-                parts = pos['symbol'].split()
-                strike = float(parts[1])
-                opt_type = parts[2]
-                
-                # Find this contract in the chain
-                row = chain[chain['strike_price'] == strike]
-                if not row.empty:
-                    current_price = row.iloc[0]['ce_ltp'] if opt_type == "CE" else row.iloc[0]['pe_ltp']
-                    self.client.update_ltp(pos['symbol'], current_price)
-            except Exception as ex:
-                logger.error(f"Error updating position prices: {ex}")
+            # Find this contract's row by strike in the chain of its expiry
+            contract = self.contracts.get(pos['contract_id'])
+            expiry_chain = chains.get(contract.expiry, chain)
+            strikes = expiry_chain['strike_price'].to_numpy()
+            prefix = "ce_" if contract.option_type == "CE" else "pe_"
+            idx = int(np.searchsorted(strikes, contract.strike))
+            if idx < len(strikes) and expiry_chain[prefix + 'id'].iat[idx] == contract.id:
+                self.client.update_ltp(contract.id, float(expiry_chain[prefix + 'ltp'].iat[idx]))
 
         # 2. Execute Trades
         # Only trade if signal changes (to avoid spamming orders)
         # AND check if we need to close existing positions first
-        
-        quantity = 50 # 1 Lot Nifty
-        
+
+        quantity = self.spec['lot_size'] # 1 Lot
+
         # Check for Exit Signals
         for pos in open_positions:
             should_close = False
@@ -407,57 +471,475 @@ class StrategyEngine:
                 should_close = True
             elif pos['type'] == "PE" and current_signal == "BULLISH":
                 should_close = True
-            
-            if should_close:
-                logger.info(f"EXIT SIGNAL: Closing {pos['symbol']}")
-                
-                # Calculate PnL (Gross)
-                gross_pnl = (pos['current_price'] - pos['buy_price']) * pos['qty']
-                
-                # Calculate Charges for this trade cycle (Buy + Sell)
-                # Note: We are estimating charges here for logging. 
-                # Actual capital deduction happens in client.place_order
-                charges = (config.BROKERAGE_PER_ORDER * 2) * (1 + config.GST_RATE) # Buy + Sell charges
-                net_pnl = gross_pnl - charges
-                
-                self.client.place_order(pos['symbol'], pos['qty'], "SELL", pos['current_price'])
-                self.db.log_trade({
-                    "symbol": pos['symbol'], "order_type": pos['type'], "transaction_type": "SELL",
-                    "quantity": pos['qty'], "price": pos['current_price'], "status": "EXECUTED", "order_id": "exit",
-                    "pnl": net_pnl
-                })
-
-        # Check for Entry Signals (only if no position is open)
-        if len(self.client.get_positions()) == 0 and current_signal != "NEUTRAL":
-             # Find ATM Strike
-            chain['diff'] = abs(chain['strike_price'] - ltp)
-            atm_row = chain.loc[chain['diff'].idxmin()]
-            strike = atm_row['strike_price']
-            
-            symbol = ""
+
+            # Skip if an exit for this contract is already in flight
+            if should_close and not self.orders.has_open_orders(pos['contract_id']):
+                logger.info(f"EXIT SIGNAL{self.tag}: Closing {pos['symbol']}")
+                self.orders.submit(
+                    pos['contract_id'], pos['qty'], "SELL", pos['current_price'],
+                    signal_ts=signal_ts, callback=self._make_exit_callback(pos)
+                )
+
+        # Check for Entry Signals (only if no position is open and nothing is in flight)
+        if len(self.client.get_positions()) == 0 and not self.orders.has_open_orders() and current_signal != "NEUTRAL":
+            # Find ATM Strike (in the next expiry's chain on expiry day)
+            entry_chain = analysis.get('entry_chain', chain)
+            atm_row = entry_chain.iloc[int(np.abs(entry_chain['strike_price'].to_numpy() - ltp).argmin())]
+
+            contract_id = None
             price = 0
             order_type = ""
-            
+
             if current_signal == "BULLISH":
-                symbol = f"NIFTY {strike} CE"
+                contract_id = int(atm_row['ce_id'])
                 price = atm_row['ce_ltp']
                 order_type = "CE"
             elif current_signal == "BEARISH":
-                symbol = f"NIFTY {strike} PE"
+                contract_id = int(atm_row['pe_id'])
                 price = atm_row['pe_ltp']
                 order_type = "PE"
-            
-            if symbol:
-                logger.info(f"ENTRY SIGNAL: {current_signal} -> Buying {symbol}")
-                resp = self.client.place_order(symbol, quantity, "BUY", price)
-                
-                if resp['status'] == 'success':
-                    self.db.log_trade({
-                        "symbol": symbol, "order_type": order_type, "transaction_type": "BUY",
-                        "quantity": quantity, "price": price, "status": "EXECUTED", "order_id": resp['order_id']
-                    })
-                    self.last_signal = current_signal
+
+            if contract_id is not None:
+                logger.info(f"ENTRY SIGNAL{self.tag}: {current_signal} -> Buying {self.contracts.trading_symbol(contract_id)}")
+                self.orders.submit(
+                    contract_id, quantity, "BUY", price,
+                    signal_ts=signal_ts, callback=self._make_entry_callback(order_type, current_signal)
+                )
+
+    def summary(self, analysis):
+        """Compact per-variant status for the dashboard."""
+        return {
+            "signal": analysis.get('signal'),
+            "ml_signal": analysis.get('ml_signal'),
+            "pcr_signal": analysis.get('pcr_signal'),
+            "live_trend": analysis.get('live_trend'),
+            "market_regime": analysis.get('market_regime'),
+            "model": self.model_engine if self.is_trained else None,
+            "positions": len(self.client.get_positions()),
+            "pnl": self.client.get_pnl(),
+            "todays_pnl": self.todays_pnl(),
+        }
+
+    def _make_entry_callback(self, order_type, signal):
+        def on_entry(order):
+            if order.state != OrderState.FILLED:
+                logger.error(f"Order Failed: {order.message}")
+                return
+            self.db.log_trade({
+                "symbol": order.symbol, "order_type": order_type, "transaction_type": "BUY",
+                "quantity": order.qty, "price": order.fill_price, "status": "EXECUTED",
+                "order_id": order.broker_order_id or order.order_id, "variant": self.name,
+                "contract_id": order.contract_id, "underlying": self.symbol
+            })
+            self.last_signal = signal
+            self.checkpoint_account()
+        return on_entry
+
+    def _make_exit_callback(self, pos):
+        def on_exit(order):
+            if order.state != OrderState.FILLED:
+                return
+
+            # Calculate PnL (Gross) at the actual fill price
+            gross_pnl = (order.fill_price - pos['buy_price']) * order.qty
+
+            # Calculate Charges for this trade cycle (Buy + Sell)
+            # Note: We are estimating charges here for logging.
+            # Actual capital deduction happens in client.place_order
+            charges = (config.BROKERAGE_PER_ORDER * 2) * (1 + config.GST_RATE) # Buy + Sell charges
+            net_pnl = gross_pnl - charges
+
+            self.db.log_trade({
+                "symbol": order.symbol, "order_type": pos['type'], "transaction_type": "SELL",
+                "quantity": order.qty, "price": order.fill_price, "status": "EXECUTED",
+                "order_id": order.broker_order_id or order.order_id, "pnl": net_pnl, "variant": self.name,
+                "contract_id": order.contract_id, "underlying": self.symbol
+            })
+            self.checkpoint_account()
+        return on_exit
+
+
+class StrategyEngine(StrategyVariant):
+    """
+    The primary strategy (trading through `client`) plus the market data pass every variant shares.
+
+    Each tick fetches the chain and candles and computes indicators once, then hands the same
+    data to the primary strategy and to each variant in config.STRATEGY_VARIANTS. Variants keep
+    their own thresholds, model and paper account, and always trade on paper.
+    """
+    def __init__(self, client, db, symbol=None):
+        symbol = symbol or config.SYMBOL
+        fill_sim = FillSimulator(lot_size=config.UNDERLYINGS[symbol]['lot_size']) if config.FILL_SIM_ENABLED else None
+        super().__init__(client, db, symbol, fill_sim=fill_sim, gateway=create_gateway(client, fill_sim),
+                         checkpoint=get_checkpoint(symbol), feature_version=feature_version(compute_features))
+        self.publisher = get_publisher(self.symbol)
+        self.feature_store = get_feature_store() if config.FEATURE_STORE_ENABLED else None
+        self.scheduler = PollScheduler() # Market hours, candle-close alignment and regime-based cadence
+        self.profiler = get_profiler()
+        self.stream = get_quote_stream(self.symbol) # Push-based chain/candle updates, None when disabled
+        self._stream_version = 0 # Last stream update this engine evaluated
+        self.chains = {} # Expiry -> latest chain (front every tick, later expiries every SURFACE_REFRESH_SECONDS)
+        self._surface_fetched = 0.0
+        self._last_eval = 0.0
+        self._tick_lock = threading.Lock() # Serializes ticks requested by concurrent dashboard sessions
+        self._analysis = None # Result of the last tick run through latest_analysis()
+        self.next_tick_at = 0.0 # time.monotonic() at which the scheduler wants the next tick
+        self.variants = [self._make_variant(name, params) for name, params in config.STRATEGY_VARIANTS.items()]
+        self._checkpointed_regime = None
+        self.restore_state()
+
+    def _make_variant(self, name, params):
+        from groww_client import GrowwClient
+
+        # A fresh GrowwClient is only used as the variant's paper account; it never fetches data
+        # The fill simulator is shared: it already holds this engine's chain history
+        return StrategyVariant(GrowwClient(), self.db, self.symbol, name, params, fill_sim=self.fill_sim,
+                               checkpoint=get_checkpoint(f"{self.symbol}.{name}"), feature_version=self.feature_version)
+
+    def restore_state(self):
+        """
+        Resumes from the last checkpoint: paper accounts, signals and models of the primary strategy and
+        variants, the polling regime, and the candle history (so the next fetch is incremental).
+        """
+        if self.checkpoint is None:
+            return
+        started = time.perf_counter()
+        restored = [s.restore() for s in [self] + self.variants]
+        series = get_candle_store().get_series(self.symbol)
+        if series.last_timestamp is None:
+            bars = self.checkpoint.load_candles()
+            if bars is not None and len(bars):
+                series.update(bars)
+        regime = self.checkpoint.get("scheduler")
+        if regime:
+            self.scheduler.observe(regime["regime"], regime["high_momentum"])
+        if any(restored):
+            logger.info(f"Restored {self.symbol} from checkpoint in {(time.perf_counter() - started) * 1000:.0f}ms "
+                        f"(capital ₹{self.client.capital:,.2f}, {len(self.client.get_positions())} open positions)")
+
+    def prepare_features(self, df):
+        """
+        Helper to calculate technical indicators for both training and prediction.
+        """
+        return compute_features(df)
+
+    def store_features(self, features):
+        """Persists feature rows of closed candles not yet in the feature store."""
+        if self.feature_store is None:
+            return
+        # Skip the indicator warm-up rows and the forming (last) candle
+        closed = features.iloc[config.FEATURE_WARMUP_BARS:-1]
+        try:
+            self.feature_store.append(self.symbol, config.FEATURE_INTERVAL, self.feature_version, closed)
+        except Exception as e:
+            logger.error(f"Could not store features: {e}")
+
+    def load_walk_forward_model(self, strategy=None):
+        """Adopts the model of the latest walk-forward run for this feature set, if there is one."""
+        strategy = strategy or self
+        if self.feature_store is None:
+            return False
+        from walk_forward import latest_model
+        try:
+            # Only runs of the strategy's own engine, so the model matches what it reports and checkpoints
+            found = latest_model(self.symbol, config.FEATURE_INTERVAL, self.feature_version,
+                                 engine=strategy.model_engine)
+        except Exception as e:
+            logger.error(f"Could not load walk-forward model: {e}")
+            return False
+        if found is None:
+            return False
+        strategy.model, strategy.feature_columns, strategy.model_run_id = found
+        strategy.is_trained = True
+        logger.info(f"Loaded walk-forward model from run {strategy.model_run_id}")
+        return True
+
+    def load_stored_features(self, start=None, end=None):
+        """Stored feature frame for this symbol and feature version, or None."""
+        if self.feature_store is None:
+            return None
+        return self.feature_store.load_frame(
+            self.symbol, config.FEATURE_INTERVAL, self.feature_version, start, end
+        )
+
+    def timeframe_trend(self, close):
+        """Lightweight SMA 20/50 trend read for one timeframe, on a zero-copy array of closes."""
+        if len(close) < 50:
+            return "WAITING"
+        last = close[-1]
+        sma_20 = close[-20:].mean()
+        sma_50 = close[-50:].mean()
+        if last > sma_20 > sma_50:
+            return "BULLISH"
+        elif last < sma_20 < sma_50:
+            return "BEARISH"
+        return "NEUTRAL"
+
+    def latest_analysis(self, force=False):
+        """
+        Analysis shared by every dashboard session: runs a tick when the scheduler's next one is due,
+        new quotes arrived or `force` is set, otherwise returns the last one. Concurrent callers
+        wait for the running tick instead of starting their own.
+        """
+        with self._tick_lock:
+            if force or self._analysis is None or time.monotonic() >= self.next_tick_at or self.has_new_quotes():
+                self._analysis = self.execute_strategy()
+                self.next_tick_at = time.monotonic() + self.scheduler.next_delay()
+            return self._analysis
+
+    def has_new_quotes(self):
+        """True when the quote stream has applied updates since the last tick."""
+        return self.stream is not None and self.stream.connected and self.stream.version > self._stream_version
+
+    def wait_for_data(self, timeout, stop_event=None):
+        """
+        Blocks until the next tick should run: on new streamed quotes (at most every
+        STREAM_MIN_EVAL_INTERVAL), or after `timeout` seconds when there is no live stream.
+        """
+        deadline = time.monotonic() + timeout
+        if self.stream is None or not self.stream.connected:
+            if stop_event is not None:
+                stop_event.wait(timeout)
+            else:
+                time.sleep(timeout)
+            return
+        # Coalesce bursts of quotes into one evaluation
+        pause = self._last_eval + config.STREAM_MIN_EVAL_INTERVAL - time.monotonic()
+        if pause > 0:
+            time.sleep(min(pause, timeout))
+        while time.monotonic() < deadline and not (stop_event is not None and stop_event.is_set()):
+            # Short waits so a stop request is noticed promptly
+            version = self.stream.wait_for_update(self._stream_version, min(deadline - time.monotonic(), 0.5))
+            if version > self._stream_version:
+                return
+
+    def execute_strategy(self):
+        # On-demand profiling of the next N ticks; a single attribute read when disarmed
+        if self.profiler.remaining:
+            return self.profiler.run(self._execute_strategy, self._profile_tags)
+        return self._execute_strategy()
+
+    def _profile_tags(self, analysis):
+        """Context recorded with a tick profile: regime and the data sizes the tick worked on."""
+        chain = analysis.get('chain')
+        return {
+            "symbol": self.symbol,
+            "signal": analysis.get('signal'),
+            "market_regime": analysis.get('market_regime'),
+            "chain_rows": 0 if chain is None else len(chain),
+            "candles": {
+                interval: len(self.client.get_candle_view(self.symbol, interval))
+                for interval in [config.FEATURE_INTERVAL] + config.MTF_INTERVALS
+            },
+            "model": self.model_engine if self.is_trained else None,
+            "variants": len(self.variants),
+        }
+
+    def _train(self, strategies, hist_data):
+        # Train models that are not trained yet (and we have data)
+        # Prefer a walk-forward model, then features persisted by earlier runs
+        # (usually more history, and nothing to recompute); stored features are loaded once for all
+        stored = None
+        for strategy in strategies:
+            if strategy.is_trained:
+                continue
+            if not self.load_walk_forward_model(strategy):
+                if stored is None:
+                    stored = self.load_stored_features()
+                    if stored is None:
+                        stored = pd.DataFrame()
+                if len(stored) > 200:
+                    strategy.train_prediction_model(None, features=stored)
+                elif not hist_data.empty and len(hist_data) > 200:
+                    strategy.train_prediction_model(hist_data)
+            strategy.checkpoint_model()
+
+    def _market_tick(self):
+        """Fetches and prepares the market data of one tick, shared by the primary strategy and every variant."""
+        # 1. Fetch Option Chains
+        # With a live quote stream the front chain is already current in memory; REST only (re)seeds it.
+        # On expiry day new positions go into the next expiry, whose chain is then needed every tick;
+        # the later expiries of the IV surface are refreshed every SURFACE_REFRESH_SECONDS.
+        # Whatever is due is fetched in one concurrent round trip.
+        expiries = self.client.get_expiries(self.symbol, max(config.CHAIN_EXPIRIES, 2))
+        front = expiries[0]
+        rollover = config.EXPIRY_ROLLOVER and front == date.today().isoformat()
+        entry_expiry = expiries[1] if rollover else front
+        streamed = self.stream is not None and not self.stream.needs_seed()
+
+        wanted = [] if streamed else [front]
+        if entry_expiry != front:
+            wanted.append(entry_expiry)
+        if config.CHAIN_EXPIRIES > 1 and time.monotonic() - self._surface_fetched >= config.SURFACE_REFRESH_SECONDS:
+            wanted += [e for e in expiries[1:config.CHAIN_EXPIRIES] if e not in wanted]
+            self._surface_fetched = time.monotonic()
+        fetched = self.client.get_option_chains(self.symbol, wanted) if wanted else {}
+
+        if streamed:
+            chain, ltp = self.stream.snapshot()
+        else:
+            chain, ltp = fetched[front]
+            if self.stream is not None:
+                self.stream.seed(chain, ltp)
+
+        if chain.empty:
+            return None
+
+        # Latest chain per live expiry (expired series drop out)
+        chains = {e: self.chains[e] for e in expiries if e in self.chains}
+        chains.update({e: c for e, (c, _) in fetched.items() if not c.empty})
+        chains[front] = chain
+        self.chains = chains
+        entry_chain = chains.get(entry_expiry, chain)
+        surface = VolSurface({e: chains[e] for e in expiries[:config.CHAIN_EXPIRIES] if e in chains}, ltp)
+
+        if self.fill_sim is not None:
+            self.fill_sim.record_chain(chain if entry_chain is chain else pd.concat([chain, entry_chain], ignore_index=True))
+
+        # 2. Fetch Historical Data for ML
+        # We need enough data for indicators (at least 50 candles)
+        # Candles only change when a bar closes, so fetch them then and reuse the stored series in between
+        # (the forming bar is kept current from the tick's LTP, or by the quote stream, meanwhile)
+        if not config.SCHEDULER_ENABLED or self.scheduler.candles_due():
+            hist_data = self.client.get_historical_data(symbol=self.symbol, interval=config.FEATURE_INTERVAL)
+            if not hist_data.empty:
+                self.scheduler.mark_candles_fetched()
+                if self.checkpoint is not None:
+                    self.checkpoint.save_candles(self.client.get_candle_view(self.symbol, "1m"))
+        else:
+            if not streamed:
+                # Between fetches the forming bar follows the chain's underlying LTP
+                # (naive local epoch seconds, the candle store's clock)
+                get_candle_store().get_series(self.symbol).apply_tick(calendar.timegm(time.localtime()), ltp)
+            hist_data = self.client.get_candles(self.symbol, config.FEATURE_INTERVAL)
+
+        # Multi-timeframe view: 1m/15m are derived from the same 1m feed (no extra API calls)
+        mtf_trend = {
+            interval: self.timeframe_trend(self.client.get_candle_view(self.symbol, interval)['close'])
+            for interval in config.MTF_INTERVALS
+        }
+
+        # 3. Indicators, computed once per tick for every strategy
+        # The hist_data from client is raw OHLCV. We need to add indicators.
+        features = None
+        if not hist_data.empty:
+            features = self.prepare_features(hist_data)
+            self.store_features(features)
+
+        return {"chain": chain, "ltp": ltp, "hist_data": hist_data, "features": features, "mtf_trend": mtf_trend,
+                "chains": chains, "entry_chain": entry_chain, "surface": surface}
+
+    def _execute_strategy(self):
+        if self.stream is not None:
+            self._stream_version = self.stream.version
+            self._last_eval = time.monotonic()
+
+        # No API calls outside NSE market hours
+        if config.SCHEDULER_ENABLED and not self.scheduler.calendar.is_open():
+            return {"signal": "MARKET_CLOSED", "pcr": 0, "ltp": 0, "chain": None}
+
+        # Check Daily Profit Target (per account; nothing is fetched once every account has reached it)
+        strategies = [self] + self.variants
+        active = [s for s in strategies if s.todays_pnl() < config.DAILY_PROFIT_TARGET]
+        if self not in active:
+            logger.info(f"Daily Profit Target Reached: {self.todays_pnl():.2f} >= {config.DAILY_PROFIT_TARGET}. Stopping trades.")
+            if not active:
+                return {"signal": "TARGET_REACHED", "pcr": 0, "ltp": 0, "chain": None}
+
+        # Main loop to check conditions and trade
+        tick = self._market_tick()
+        if tick is None:
+            return {"signal": "NO_DATA", "pcr": 0, "ltp": 0, "chain": None}
+
+        self._train(active, tick['hist_data'])
+        signal_ts = time.perf_counter_ns() # Decision time, used for order latency tracking
+
+        # Primary strategy: its regime drives the polling cadence, and it is what gets published
+        analysis = self.evaluate(tick)
+        if tick['features'] is not None:
+            self.scheduler.observe(analysis['market_regime'], analysis['high_momentum'])
+            self._checkpoint_regime(analysis['market_regime'], analysis['high_momentum'])
+        analysis['mtf_trend'] = tick['mtf_trend']
+        analysis['features'] = tick['features'] # Candles + indicators for the price chart
+
+        if self.publisher is not None:
+            feature_row = tick['features'].iloc[-1] if tick['features'] is not None else None
+            self._publish_snapshot(analysis, feature_row)
+
+        if self in active:
+            self.trade(analysis, signal_ts)
+        else:
+            analysis['signal'] = "TARGET_REACHED"
+
+        # Variants: decision logic and paper orders only
+        variant_status = {}
+        for variant in self.variants:
+            try:
+                result = variant.evaluate(tick)
+                if variant in active:
+                    variant.trade(result, signal_ts)
                 else:
-                    print(f"Order Failed: {resp.get('message')}")
+                    result['signal'] = "TARGET_REACHED"
+                variant_status[variant.name] = variant.summary(result)
+            except Exception as e:
+                logger.error(f"Variant {variant.name} failed: {e}")
+        if variant_status:
+            analysis['variants'] = variant_status
+
+        analysis['order_latency'] = self.orders.latency_summary()
+        if self.fill_sim is not None:
+            analysis['latency_cost'] = self.fill_sim.latency_cost_report()
 
         return analysis
+
+    def _checkpoint_regime(self, regime, high_momentum):
+        # Only on change: the regime sets the polling cadence right after a restart
+        if self.checkpoint is None or (regime, high_momentum) == self._checkpointed_regime:
+            return
+        self._checkpointed_regime = (regime, high_momentum)
+        try:
+            self.checkpoint.record("scheduler", {"regime": regime, "high_momentum": bool(high_momentum)})
+        except Exception as e:
+            logger.error(f"Checkpoint write failed: {e}")
+
+    def stop(self):
+        """Stops the order workers of the primary strategy and every variant."""
+        for strategy in [self] + self.variants:
+            strategy.orders.stop()
+
+    def _publish_snapshot(self, analysis, feature_row):
+        """Publishes this tick's chain, feature row and signal summary to shared memory."""
+        names, values = [], None
+        if feature_row is not None:
+            numeric = pd.to_numeric(feature_row, errors='coerce')
+            names = [str(n) for n in numeric.index]
+            values = numeric.to_numpy(dtype=np.float64)
+
+        summary = {key: analysis.get(key) for key in SNAPSHOT_SUMMARY_KEYS}
+        summary['feature_names'] = names
+        try:
+            self.publisher.publish(analysis['chain'], values, summary)
+        except Exception as e:
+            logger.error(f"Snapshot publish failed: {e}")
+
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+def get_strategy_engine(db, symbol=None):
+    """
+    Process-wide engine per underlying, trading through its own GrowwClient (logged in on first use).
+    Every dashboard session shares it, so the checkpointed account is restored into, and
+    written by, a single book.
+    """
+    from groww_client import GrowwClient
+
+    symbol = symbol or config.SYMBOL
+    with _engines_lock:
+        engine = _engines.get(symbol)
+        if engine is None:
+            client = GrowwClient()
+            client.login(db) # Auto-login if credentials exist (reuses the shared token when valid)
+            engine = _engines[symbol] = StrategyEngine(client, db, symbol=symbol)
+        return engine
@@ -0,0 +1,342 @@
+import argparse
+import calendar
+import json
+import socket
+import socketserver
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+import config
+from candles import get_candle_store
+from snapshot_bus import CHAIN_COLUMNS
+from logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Wire protocol: newline-delimited JSON over TCP.
+#   client -> server  {"op": "subscribe", "underlying": "NIFTY", "strikes": [24950.0, 25000.0, ...]}
+#                     (replaces the strike set for that underlying; the index itself is always sent)
+#   server -> client  {"type": "index", "underlying": "NIFTY", "ts": <unix s>, "ltp": 25010.5}
+#                     {"type": "option", "underlying": "NIFTY", "ts": <unix s>, "strike": 25000.0,
+#                      "option_type": "CE", "ltp": 112.4, "oi": 1843000, "volume": 220450}
+OPTION_FIELDS = {"ltp": "ltp", "oi": "open_interest", "volume": "volume"} # Message field -> chain response field
+COLUMN_INDEX = {name: i for i, name in enumerate(CHAIN_COLUMNS)}
+
+
+def _local_seconds(unix_ts):
+    # Unix seconds -> naive local epoch seconds, the time base of the candle store
+    return calendar.timegm(time.localtime(unix_ts))
+
+
+def _encode(message):
+    return (json.dumps(message, separators=(",", ":")) + "\n").encode()
+
+
+class _ReplayHandler(socketserver.StreamRequestHandler):
+    """One subscriber: replays the recorded chain snapshots as quote updates for its subscriptions."""
+    def handle(self):
+        server = self.server
+        subscriptions = {} # underlying -> set of strikes
+        lock = threading.Lock()
+        closed = threading.Event()
+
+        def read_requests():
+            try:
+                for line in self.rfile:
+                    request = json.loads(line)
+                    if request.get("op") == "subscribe":
+                        with lock:
+                            subscriptions[request["underlying"]] = {float(s) for s in request.get("strikes", [])}
+            except (OSError, ValueError):
+                pass
+            closed.set()
+
+        threading.Thread(target=read_requests, name="quote-publisher-reader", daemon=True).start()
+
+        previous = {} # (underlying, strike, type) -> last sent fields
+        step = 0
+        while not closed.is_set() and not server.stopping.is_set():
+            with lock:
+                wanted = {u: set(s) for u, s in subscriptions.items()}
+            out = []
+            now = time.time()
+            for underlying, strikes in wanted.items():
+                chains = server.replay.option_chains.get(underlying)
+                if not chains:
+                    continue
+                response = chains[step % len(chains)]
+                out.append({"type": "index", "underlying": underlying, "ts": now, "ltp": response["underlying_ltp"]})
+                for strike_key, legs in response["strikes"].items():
+                    strike = float(strike_key)
+                    if strike not in strikes:
+                        continue
+                    for option_type in ("CE", "PE"):
+                        leg = legs.get(option_type, {})
+                        fields = {name: leg.get(source, 0) for name, source in OPTION_FIELDS.items()}
+                        key = (underlying, strike, option_type)
+                        # Only changes are pushed, like an exchange feed
+                        if previous.get(key) != fields:
+                            previous[key] = fields
+                            out.append({"type": "option", "underlying": underlying, "ts": now, "strike": strike,
+                                        "option_type": option_type, **fields})
+            if out:
+                try:
+                    self.wfile.write(b"".join(_encode(m) for m in out))
+                    self.wfile.flush()
+                except OSError:
+                    break
+            step += 1
+            closed.wait(server.interval)
+
+
+class QuotePublisher(socketserver.ThreadingTCPServer):
+    """
+    Local stand-in for a broker's streaming quote feed.
+
+    Serves the replay backend's recorded (or synthetic) option chain snapshots to socket
+    subscribers as index and option quote updates, one snapshot every `interval` seconds, so
+    the streaming path can be run and tested offline.
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host=None, port=None, recording=None, interval=None):
+        from replay import ReplayAPI
+
+        self.replay = ReplayAPI(recording)
+        self.interval = interval if interval is not None else config.STREAM_REPLAY_INTERVAL
+        self.stopping = threading.Event()
+        super().__init__((host or config.STREAM_HOST, config.STREAM_PORT if port is None else port), _ReplayHandler)
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def start(self):
+        """Serves from a background thread."""
+        threading.Thread(target=self.serve_forever, name="quote-publisher", daemon=True).start()
+        return self
+
+    def stop(self):
+        self.stopping.set()
+        self.shutdown()
+        self.server_close()
+
+
+class LiveChain:
+    """
+    Option chain of one underlying, kept in one float64 array and updated in place by quote messages.
+
+    The full strike ladder (and greeks, which the feed does not carry) comes from a REST snapshot;
+    streamed LTP/OI/volume then overwrite the near-ATM rows as they arrive.
+    """
+    def __init__(self):
+        self.values = np.zeros((0, len(CHAIN_COLUMNS)), dtype=np.float64)
+        self.rows = {} # strike -> row index
+        self.ltp = 0.0
+        self.seeded_at = None
+
+    def seed(self, chain, ltp):
+        self.values = chain[CHAIN_COLUMNS].to_numpy(dtype=np.float64, copy=True)
+        self.rows = {float(strike): i for i, strike in enumerate(self.values[:, 0])}
+        self.ltp = float(ltp)
+        self.seeded_at = time.monotonic()
+
+    def apply(self, message):
+        """Applies one option quote in place. Returns False for strikes outside the seeded ladder."""
+        row = self.rows.get(float(message["strike"]))
+        if row is None:
+            return False
+        prefix = "ce_" if message["option_type"] == "CE" else "pe_"
+        for field in OPTION_FIELDS:
+            if field in message:
+                self.values[row, COLUMN_INDEX[prefix + field]] = message[field]
+        return True
+
+    def frame(self):
+        """DataFrame copy in the shape GrowwClient.get_option_chain returns (callers may add columns)."""
+        frame = pd.DataFrame(self.values.copy(), columns=CHAIN_COLUMNS)
+        return frame.astype({"ce_id": np.int64, "pe_id": np.int64}) # Contract ids from the seed chain
+
+    def strikes_around(self, ltp, width):
+        if not len(self.values):
+            return []
+        strikes = self.values[:, 0]
+        atm = int(np.abs(strikes - ltp).argmin())
+        return [float(s) for s in strikes[max(atm - width, 0):atm + width + 1]]
+
+
+class QuoteStream:
+    """
+    Push-based quote ingestion for one underlying.
+
+    A background thread reads the socket feed, applies index ticks to the forming candle in the
+    shared candle store and option quotes to a LiveChain, and re-subscribes when the ATM strike
+    moves. Consumers read the chain with snapshot() and block on wait_for_update() to evaluate on
+    new data instead of on a timer. If the feed drops, is_live() turns False and callers fall back
+    to polling until it reconnects.
+    """
+    def __init__(self, symbol, host=None, port=None):
+        self.symbol = symbol
+        self.address = (host or config.STREAM_HOST, config.STREAM_PORT if port is None else port)
+        self.chain = LiveChain()
+        self.series = get_candle_store().get_series(symbol)
+        self.cond = threading.Condition()
+        self.version = 0 # Incremented on every applied update
+        self.last_message = None
+        self.messages = 0
+        self.subscribed = []
+        self._sock = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name=f"quote-stream-{self.symbol}", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        sock = self._sock
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        with self.cond:
+            self.cond.notify_all()
+
+    # --- Consumer side ---
+
+    @property
+    def connected(self):
+        return self._sock is not None
+
+    def is_live(self):
+        """True if seeded and quotes arrived within STREAM_STALE_SECONDS."""
+        return (self.chain.seeded_at is not None and self.last_message is not None
+                and time.monotonic() - self.last_message < config.STREAM_STALE_SECONDS)
+
+    def needs_seed(self):
+        """True if the chain should be (re)loaded from a REST snapshot: never seeded, stale feed, or reseed due."""
+        seeded_at = self.chain.seeded_at
+        return (not self.is_live() or seeded_at is None
+                or time.monotonic() - seeded_at > config.STREAM_RESEED_SECONDS)
+
+    def seed(self, chain, ltp):
+        """Loads the full ladder from a REST chain and subscribes to the strikes around the ATM."""
+        if chain is None or chain.empty:
+            return
+        with self.cond:
+            self.chain.seed(chain, ltp)
+        self._resubscribe(force=True)
+
+    def snapshot(self):
+        """(chain DataFrame, underlying LTP), as GrowwClient.get_option_chain returns them."""
+        with self.cond:
+            return self.chain.frame(), self.chain.ltp
+
+    def wait_for_update(self, after_version, timeout):
+        """Blocks until an update newer than `after_version` is applied (or timeout). Returns the current version."""
+        deadline = time.monotonic() + timeout
+        with self.cond:
+            while self.version <= after_version and not self._stop.is_set():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self.cond.wait(remaining)
+            return self.version
+
+    # --- Feed side ---
+
+    def _run(self):
+        backoff = config.STREAM_RECONNECT_SECONDS
+        while not self._stop.is_set():
+            try:
+                with socket.create_connection(self.address, timeout=config.STREAM_STALE_SECONDS) as sock:
+                    self._sock = sock
+                    sock.settimeout(None)
+                    logger.info(f"Quote stream connected to {self.address[0]}:{self.address[1]} ({self.symbol})")
+                    self.subscribed = []
+                    self._resubscribe(force=True)
+                    for line in sock.makefile("rb"):
+                        self._on_message(json.loads(line))
+                backoff = config.STREAM_RECONNECT_SECONDS
+            except (OSError, ValueError) as e:
+                if not self._stop.is_set():
+                    logger.warning(f"Quote stream {self.symbol} disconnected: {e}")
+            finally:
+                self._sock = None
+            self._stop.wait(backoff)
+            backoff = min(backoff * 2, config.STREAM_RECONNECT_MAX_SECONDS)
+
+    def _on_message(self, message):
+        if message.get("underlying") != self.symbol:
+            return
+        with self.cond:
+            if message["type"] == "index":
+                self.chain.ltp = float(message["ltp"])
+                # The forming bar (and every derived forming bar) is updated in place
+                self.series.apply_tick(_local_seconds(message["ts"]), self.chain.ltp)
+            elif message["type"] == "option":
+                self.chain.apply(message)
+            self.version += 1
+            self.messages += 1
+            self.last_message = time.monotonic()
+            self.cond.notify_all()
+        if message["type"] == "index":
+            self._resubscribe()
+
+    def _resubscribe(self, force=False):
+        # Follow the ATM: subscribe to the strikes around it once it moves
+        with self.cond:
+            strikes = self.chain.strikes_around(self.chain.ltp, config.STREAM_ATM_STRIKES)
+        sock = self._sock
+        if sock is None or not strikes or (strikes == self.subscribed and not force):
+            return
+        try:
+            sock.sendall(_encode({"op": "subscribe", "underlying": self.symbol, "strikes": strikes}))
+            self.subscribed = strikes
+        except OSError as e:
+            logger.warning(f"Quote stream subscribe failed: {e}")
+
+
+_streams = {}
+_streams_lock = threading.Lock()
+
+
+def get_quote_stream(symbol):
+    """Process-wide quote stream per underlying (started on first use), or None if streaming is disabled."""
+    if not config.STREAM_ENABLED:
+        return None
+    with _streams_lock:
+        if symbol not in _streams:
+            _streams[symbol] = QuoteStream(symbol).start()
+        return _streams[symbol]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local streaming quote publisher replaying recorded market data")
+    parser.add_argument("--host", default=config.STREAM_HOST)
+    parser.add_argument("--port", type=int, default=config.STREAM_PORT)
+    parser.add_argument("--recording", default=config.REPLAY_PATH, help="Replay recording (default: synthetic session)")
+    parser.add_argument("--interval", type=float, default=config.STREAM_REPLAY_INTERVAL,
+                        help="Seconds between replayed chain snapshots")
+    args = parser.parse_args()
+
+    publisher = QuotePublisher(args.host, args.port, args.recording, args.interval)
+    print(f"Publishing quotes on {args.host}:{publisher.port} (Ctrl+C to stop)", flush=True)
+    try:
+        publisher.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        publisher.server_close()
+
+
+if __name__ == "__main__":
+    main()
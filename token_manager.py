@@ -0,0 +1,211 @@
+import threading
+import time
+from datetime import datetime, timedelta
+
+import config
+from request_layer import get_request_layer
+from logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+def next_token_expiry(now=None):
+    """Groww access tokens expire every day at TOKEN_DAILY_EXPIRY (local time)."""
+    now = now or datetime.now()
+    hour, minute = map(int, config.TOKEN_DAILY_EXPIRY.split(":"))
+    expiry = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if expiry <= now:
+        expiry += timedelta(days=1)
+    return expiry
+
+
+class TokenManager:
+    """
+    Owns the Groww access token for the whole process.
+
+    The token and its expiry are persisted in the settings table so restarts reuse it.
+    A background thread logs in again once the token has expired and backs off exponentially on
+    failure, so callers on the tick path only ever read the current API handle and never wait on a login.
+    Every Groww token dies at TOKEN_DAILY_EXPIRY, so logging in any earlier would gain nothing.
+    """
+    def __init__(self, db):
+        self.db = db
+        self.requests = get_request_layer()
+
+        self.lock = threading.Lock()
+        self.token = None
+        self.expiry = None
+        self.api = None
+        self.last_error = None
+        self.failures = 0
+        self.next_attempt = 0.0 # time.monotonic() before which the refresher stays idle
+
+        self._wake = threading.Event()
+        self._thread = None
+
+        self._load_persisted()
+
+    # --- Public API ---
+
+    def get_api(self):
+        """Current GrowwAPI handle, or None. Never blocks; schedules a refresh if the token is missing or stale."""
+        with self.lock:
+            api = self.api if self._is_valid() else None
+        if api is None or self._needs_refresh():
+            self.request_refresh()
+        return api
+
+    def request_refresh(self):
+        """Asks the background thread to refresh the token (no-op while backing off)."""
+        self._ensure_thread()
+        self._wake.set()
+
+    def login(self):
+        """
+        Synchronous login for startup and explicit user actions (e.g. the Login button).
+        Reuses the persisted token when it is still valid. Returns True on success.
+        """
+        with self.lock:
+            token = self.token if self._is_valid() else None
+            if token is not None and self.api is not None:
+                return True
+            self.next_attempt = 0.0 # A user-initiated login overrides any backoff
+        if token is not None and self._build_api(token):
+            return True
+        return self._refresh()
+
+    def status(self):
+        with self.lock:
+            return {
+                "valid": self._is_valid(),
+                "expiry": self.expiry,
+                "failures": self.failures,
+                "retry_in": max(self.next_attempt - time.monotonic(), 0.0),
+                "last_error": self.last_error,
+            }
+
+    # --- Internals ---
+
+    def _is_valid(self):
+        return self.token is not None and self.expiry is not None and datetime.now() < self.expiry
+
+    def _needs_refresh(self):
+        with self.lock:
+            return not self._is_valid()
+
+    def _load_persisted(self):
+        token = self.db.get_credential("ACCESS_TOKEN")
+        expiry = self.db.get_credential("ACCESS_TOKEN_EXPIRY")
+        if not token or not expiry:
+            return
+        try:
+            expiry = datetime.fromisoformat(expiry)
+        except ValueError:
+            return
+        if datetime.now() < expiry:
+            self.token = token
+            self.expiry = expiry
+            # The GrowwAPI handle is built off the tick path by the refresher
+            self.request_refresh()
+
+    def _ensure_thread(self):
+        with self.lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="token-refresher", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            with self.lock:
+                wait_backoff = self.next_attempt - time.monotonic()
+            if wait_backoff > 0:
+                self._wake.wait(timeout=wait_backoff)
+                self._wake.clear()
+                continue
+
+            if self._needs_refresh():
+                self._refresh()
+            elif self.api is None:
+                self._build_api(self.token)
+
+            # Sleep until the token expires (or someone wakes us)
+            with self.lock:
+                if self.expiry is not None and self._is_valid():
+                    sleep_for = max((self.expiry - datetime.now()).total_seconds(), 1.0)
+                else:
+                    sleep_for = max(self.next_attempt - time.monotonic(), 1.0)
+            self._wake.wait(timeout=sleep_for)
+            self._wake.clear()
+
+    def _backoff(self, error):
+        with self.lock:
+            self.failures += 1
+            delay = min(config.TOKEN_BACKOFF_BASE * 2 ** (self.failures - 1), config.TOKEN_BACKOFF_MAX)
+            self.next_attempt = time.monotonic() + delay
+            self.last_error = str(error)
+        logger.error(f"Login failed: {error}. Retrying in {delay:.0f}s")
+
+    def _build_api(self, token):
+        from growwapi import GrowwAPI
+        try:
+            api = GrowwAPI(token)
+        except Exception as e:
+            self._backoff(e)
+            return False
+        with self.lock:
+            if self.token == token:
+                self.api = api
+        return True
+
+    def _refresh(self):
+        from growwapi import GrowwAPI
+        import pyotp
+
+        with self.lock:
+            if time.monotonic() < self.next_attempt:
+                return False
+            if self._is_valid() and self.expiry >= next_token_expiry():
+                return True # A new login would expire at the same instant as the current token
+
+        try:
+            api_key = self.db.get_credential("API_KEY")
+            totp_secret = self.db.get_credential("TOTP_SECRET")
+            if not api_key or not totp_secret:
+                raise ValueError("Credentials not found in Database.")
+
+            totp = pyotp.TOTP(totp_secret).now()
+            # Concurrent logins with the same key share a single exchange
+            token = self.requests.call(
+                "login", api_key, lambda: GrowwAPI.get_access_token(api_key=api_key, totp=totp)
+            )
+            api = GrowwAPI(token)
+        except Exception as e:
+            self._backoff(e)
+            return False
+
+        expiry = next_token_expiry()
+        with self.lock:
+            self.token = token
+            self.expiry = expiry
+            self.api = api
+            self.failures = 0
+            self.next_attempt = 0.0
+            self.last_error = None
+
+        self.db.save_credential("ACCESS_TOKEN", token)
+        self.db.save_credential("ACCESS_TOKEN_EXPIRY", expiry.isoformat())
+        logger.info(f"Access token refreshed, valid until {expiry}")
+        return True
+
+
+_managers = {}
+_managers_lock = threading.Lock()
+
+
+def get_token_manager(db):
+    """One token manager per database (i.e. per credential set), shared by all sessions."""
+    with _managers_lock:
+        manager = _managers.get(config.DB_PATH)
+        if manager is None:
+            manager = _managers[config.DB_PATH] = TokenManager(db)
+        return manager
@@ -1,5 +1,7 @@
 import streamlit as st
+import pandas as pd
 from datetime import datetime
+import config
 
 def render(analysis):
     st.subheader("Market Analysis")
@@ -34,6 +36,12 @@ def render(analysis):
         s_col3.info(f"Major Trend (SMA): {analysis.get('live_trend', 'WAITING')}")
         s_col4.info(f"Supertrend: {analysis.get('supertrend', 'WAITING')}")
         s_col5.info(f"Current Candle: {analysis.get('current_candle', 'WAITING')}")
+
+        mtf_trend = analysis.get('mtf_trend')
+        if mtf_trend:
+            mtf_cols = st.columns(len(mtf_trend))
+            for col, (interval, trend) in zip(mtf_cols, mtf_trend.items()):
+                col.info(f"{interval} Trend: {trend}")
     
     if chain is not None and not chain.empty:
         # Find ATM Strike
@@ -57,5 +65,39 @@ def render(analysis):
             st.write(f"**IV:** {atm_row['pe_iv']:.2f}%")
             st.write(f"**OI:** {atm_row['pe_oi']}")
         
+    term_structure = analysis.get('term_structure')
+    if term_structure is not None and not term_structure.empty:
+        surface = analysis.get('surface', {})
+        with st.expander("IV Term Structure", expanded=True):
+            col1, col2, col3, col4 = st.columns(4)
+            for col, label, key in ((col1, "Front ATM IV", 'front_atm_iv'), (col2, "Next ATM IV", 'next_atm_iv'),
+                                    (col3, "Term Slope", 'term_slope'), (col4, "Front Skew", 'front_skew')):
+                value = surface.get(key)
+                col.metric(label, f"{value:.2f}" if value is not None else "-")
+            st.caption(f"ATM IV and put-minus-call skew (±{config.SURFACE_SKEW_MONEYNESS:.0%} from spot) per expiry")
+            st.line_chart(term_structure.set_index('expiry')[['atm_iv', 'skew']])
+            st.dataframe(term_structure.round(2), hide_index=True)
+
+    variants = analysis.get('variants')
+    if variants:
+        with st.expander("Strategy Variants (paper)", expanded=True):
+            st.caption("Same data feed, own thresholds, model and paper account. Trades are tagged by variant in the Trade Log.")
+            st.dataframe(pd.DataFrame(variants).T)
+
+    latency = analysis.get('order_latency')
+    if latency:
+        with st.expander("Order Latency (ms)"):
+            st.dataframe(pd.DataFrame(latency).T.round(2))
+
+    latency_cost = analysis.get('latency_cost')
+    if latency_cost:
+        with st.expander("Latency Cost (Paper Fill Simulation)"):
+            st.metric("PnL Cost per ms of Latency", f"₹{latency_cost['cost_per_ms']:.4f}")
+            st.caption(f"Replayed over {latency_cost['decisions']} decisions")
+            st.dataframe(pd.DataFrame({
+                "Latency (ms)": latency_cost['latency_ms'],
+                "PnL Cost (₹)": latency_cost['pnl_cost'],
+            }))
+
     st.subheader("Live Signals")
     st.info(f"Scanning market... Last update: {datetime.now().strftime('%H:%M:%S')}")
@@ -1,21 +1,49 @@
 import streamlit as st
+import numpy as np
+import pandas as pd
+
+import config
+
+ATM_STYLE = 'background-color: #ffffb3'
+
+
+def atm_window(chain, ltp, width):
+    """Rows of the chain within `width` strikes either side of the ATM strike, plus the ATM strike."""
+    strikes = chain['strike_price'].to_numpy()
+    atm_idx = int(np.abs(strikes - ltp).argmin())
+    start = max(atm_idx - width, 0)
+    return chain.iloc[start:atm_idx + width + 1], strikes[atm_idx]
+
+
+def style_chain(view, atm_strike):
+    # Vectorized: one boolean mask for the ATM row instead of a Python call per row
+    def highlight(df):
+        mask = (df['strike_price'] == atm_strike).to_numpy()
+        styles = np.where(mask[:, None], ATM_STYLE, '')
+        return pd.DataFrame(np.broadcast_to(styles, df.shape), index=df.index, columns=df.columns)
+    return view.style.apply(highlight, axis=None)
+
 
 def render(analysis):
     st.subheader("Option Chain Data")
     chain = analysis.get('chain')
     ltp = analysis.get('ltp', 0)
-    
+
     if chain is not None and not chain.empty:
-        # Find ATM Strike for highlighting
-        chain['diff'] = abs(chain['strike_price'] - ltp)
-        atm_strike = chain.loc[chain['diff'].idxmin()]['strike_price']
-        
-        # Highlight ATM
-        def highlight_atm(row):
-            if row['strike_price'] == atm_strike:
-                return ['background-color: #ffffb3'] * len(row)
-            return [''] * len(row)
-            
-        st.dataframe(chain.drop(columns=['diff']).style.apply(highlight_atm, axis=1))
+        show_full = st.checkbox("Show full chain", value=False, key="option_chain_full")
+        width = len(chain) if show_full else config.OPTION_CHAIN_WINDOW
+
+        view, atm_strike = atm_window(chain, ltp, width)
+        view = view.drop(columns=['diff', 'ce_id', 'pe_id'], errors='ignore').reset_index(drop=True)
+
+        # Rebuild the styled frame only when the visible rows change. Identical content also
+        # lets Streamlit's message cache skip re-sending the table to the browser.
+        key = (int(pd.util.hash_pandas_object(view, index=False).sum()), float(atm_strike))
+        cached = st.session_state.get('_option_chain_view')
+        if cached is None or cached[0] != key:
+            cached = (key, style_chain(view, atm_strike))
+            st.session_state['_option_chain_view'] = cached
+
+        st.dataframe(cached[1])
     else:
         st.write("No Data Available")
@@ -0,0 +1,82 @@
+import streamlit as st
+import numpy as np
+
+import config
+from downsample import DownsampledHistory
+from features import BOLLINGER, SUPERTREND, SUPERTREND_DIRECTION
+
+LINE_STYLES = {
+    "SMA_20": dict(color="#1f77b4", width=1.2),
+    "SMA_50": dict(color="#ff7f0e", width=1.2),
+    "BBU": dict(color="rgba(128,128,128,0.6)", width=1, dash="dot"),
+    "BBM": dict(color="rgba(128,128,128,0.6)", width=1),
+    "BBL": dict(color="rgba(128,128,128,0.6)", width=1, dash="dot"),
+}
+
+
+def indicator_columns(columns):
+    """(line columns, supertrend value column, supertrend direction column) present in a feature frame."""
+    lines = [c for c in ("SMA_20", "SMA_50") + BOLLINGER[::-1] if c in columns]
+    st_value = SUPERTREND if SUPERTREND in columns else None
+    st_dir = SUPERTREND_DIRECTION if SUPERTREND_DIRECTION in columns else None
+    return lines, st_value, st_dir
+
+
+def get_history(lines, st_value, st_dir):
+    # One cached downsample per session; rebuilt only if the indicator set or settings change
+    key = (tuple(lines), st_value, st_dir, config.CHART_DOWNSAMPLE, config.CHART_POINTS, config.CHART_CANDLES)
+    cached = st.session_state.get('price_chart_history')
+    if cached is None or cached[0] != key:
+        columns = lines + ([st_value] if st_value else [])
+        companions = {st_value: [st_dir]} if st_value and st_dir else {}
+        history = DownsampledHistory(columns, config.CHART_POINTS, config.CHART_CANDLES,
+                                     config.CHART_DOWNSAMPLE, companions)
+        cached = (key, history)
+        st.session_state.price_chart_history = cached
+    return cached[1]
+
+
+def build_figure(data, lines, st_value, st_dir):
+    import plotly.graph_objects as go # Deferred: only needed once the chart is drawn
+
+    candles = data["candles"]
+    fig = go.Figure()
+    fig.add_trace(go.Candlestick(
+        x=candles["ts"], open=candles["open"], high=candles["high"], low=candles["low"], close=candles["close"],
+        name="Price",
+    ))
+    for column in lines:
+        series = data["lines"].get(column)
+        if series is None:
+            continue
+        style = LINE_STYLES.get(column) or LINE_STYLES.get(column.split("_")[0], {})
+        fig.add_trace(go.Scattergl(x=series["ts"], y=series[column], mode="lines", name=column, line=style))
+
+    supertrend = data["lines"].get(st_value)
+    if supertrend is not None and st_dir in supertrend:
+        # Split into bullish / bearish segments by the direction sampled at the same rows
+        direction = supertrend[st_dir]
+        for sign, name, color in ((1, "Supertrend (Bull)", "green"), (-1, "Supertrend (Bear)", "red")):
+            values = np.where(direction == sign, supertrend[st_value], np.nan)
+            fig.add_trace(go.Scattergl(x=supertrend["ts"], y=values, mode="lines", name=name,
+                                       line=dict(color=color, width=1.5), connectgaps=False))
+
+    fig.update_layout(
+        height=500, margin=dict(l=10, r=10, t=30, b=10), xaxis_rangeslider_visible=False,
+        legend=dict(orientation="h", y=1.02, x=0), uirevision="price_chart", # Keep zoom across refreshes
+    )
+    return fig
+
+
+def render(analysis):
+    features = analysis.get('features')
+    if features is None or features.empty:
+        return
+
+    st.subheader("Price Chart")
+    lines, st_value, st_dir = indicator_columns(features.columns)
+    # Closed bars come from the cache; only the forming bar is new on each refresh
+    data = get_history(lines, st_value, st_dir).update(features)
+    st.plotly_chart(build_figure(data, lines, st_value, st_dir), use_container_width=True)
+    st.caption(f"{len(features)} bars of {config.FEATURE_INTERVAL} candles, drawn as "
+               f"{len(data['candles']['ts'])} candles ({config.CHART_DOWNSAMPLE} downsampled indicators)")
@@ -1,22 +1,68 @@
 import streamlit as st
+import numpy as np
 import pandas as pd
 
+import config
+
+
+def style_pnl(trades):
+    # Vectorized colouring of the pnl column
+    def color_pnl(col):
+        values = pd.to_numeric(col, errors='coerce').to_numpy()
+        colors = np.select([values > 0, values < 0, values == 0], ['color: green', 'color: red', 'color: black'], '')
+        return colors
+    return trades.style.apply(color_pnl, subset=['pnl'])
+
+
+def render_performance(db):
+    # Reads the materialized rollups: one page of days for the table, one row for the totals and
+    # the last EQUITY_CURVE_POINTS equity points (the expander body runs even while collapsed)
+    stats = db.get_performance_summary()
+    if not stats["trades"]:
+        return
+    st.subheader("Performance")
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Net PnL", f"₹{stats['pnl']:.2f}")
+    col2.metric("Win Rate", f"{stats['win_rate']:.0%}", f"{stats['trades']} trades", delta_color="off")
+    col3.metric("Charges", f"₹{stats['charges']:.2f}")
+    col4.metric("Max Drawdown", f"₹{stats['max_drawdown']:.2f}", f"now ₹{stats['drawdown']:.2f}", delta_color="off")
+
+    with st.expander("Daily Summary & Equity Curve"):
+        curve = db.get_equity_curve(limit=config.EQUITY_CURVE_POINTS)
+        st.line_chart(curve.set_index('trade_id')[['equity', 'peak']])
+        st.dataframe(db.get_daily_summary(limit=config.TRADES_PAGE_SIZE), hide_index=True)
+
+
 def render(db):
+    render_performance(db)
+
     st.subheader("Trade Log")
-    trades = db.get_trades()
-    
-    if not trades.empty:
-        # Style the dataframe
-        def color_pnl(val):
-            if pd.isna(val):
-                return ''
-            color = 'green' if val > 0 else 'red' if val < 0 else 'black'
-            return f'color: {color}'
 
+    # Keyset pagination: each page is fetched below the last id of the previous one,
+    # so the cost of a page does not grow with the size of the trade history
+    cursors = st.session_state.setdefault('trade_page_cursors', [None])
+    trades = db.get_trades_page(before_id=cursors[-1], limit=config.TRADES_PAGE_SIZE)
+
+    if not trades.empty:
         # Ensure pnl column exists (for old data)
         if 'pnl' not in trades.columns:
             trades['pnl'] = None
 
-        st.dataframe(trades.style.map(color_pnl, subset=['pnl']))
+        st.dataframe(style_pnl(trades))
+    elif len(cursors) > 1:
+        st.info("No older trades.")
     else:
         st.info("No trades executed yet.")
+        return
+
+    col_prev, col_page, col_next = st.columns([1, 2, 1])
+    with col_prev:
+        if st.button("◀ Newer", key="trades_newer", disabled=len(cursors) == 1):
+            cursors.pop()
+            st.rerun()
+    with col_page:
+        st.caption(f"Page {len(cursors)}")
+    with col_next:
+        if st.button("Older ▶", key="trades_older", disabled=len(trades) < config.TRADES_PAGE_SIZE):
+            cursors.append(int(trades['id'].iloc[-1]))
+            st.rerun()
@@ -0,0 +1,92 @@
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+import config
+
+FIELDS = ("ce_iv", "pe_iv", "ce_oi", "pe_oi")
+
+
+class VolSurface:
+    """
+    Strike x expiry grid of implied volatility and open interest, built from one chain per expiry.
+
+    Every field is a (expiries, strikes) float64 array over the union of the chains' strikes;
+    strikes an expiry does not list (and IVs the broker reports as 0) are NaN. IV is read off the
+    out-of-the-money side (puts below spot, calls above), which is where the quotes are liquid.
+    """
+    def __init__(self, chains, spot, today=None):
+        chains = {expiry: chain for expiry, chain in chains.items() if chain is not None and not chain.empty}
+        self.expiries = sorted(chains)
+        self.spot = float(spot)
+        today = today or date.today()
+        self.days = np.array([(date.fromisoformat(e) - today).days for e in self.expiries], dtype=np.int64)
+        self.strikes = np.unique(np.concatenate(
+            [chains[e]['strike_price'].to_numpy(dtype=np.float64) for e in self.expiries]
+        )) if self.expiries else np.empty(0)
+
+        grid = np.full((len(FIELDS), len(self.expiries), len(self.strikes)), np.nan)
+        for row, expiry in enumerate(self.expiries):
+            chain = chains[expiry]
+            cols = np.searchsorted(self.strikes, chain['strike_price'].to_numpy(dtype=np.float64))
+            grid[:, row, cols] = chain[list(FIELDS)].to_numpy(dtype=np.float64).T
+        grid[:2][grid[:2] <= 0] = np.nan # IV of 0 means no quote
+        self.ce_iv, self.pe_iv, self.ce_oi, self.pe_oi = grid
+        self.iv = np.where(self.strikes < self.spot, self.pe_iv, self.ce_iv) # OTM smile
+        self.iv = np.where(np.isnan(self.iv), np.fmax(self.ce_iv, self.pe_iv), self.iv)
+
+    def __len__(self):
+        return len(self.expiries)
+
+    def iv_at(self, strikes):
+        """(expiries, len(strikes)) IV interpolated along each expiry's smile (NaN outside the quoted range)."""
+        strikes = np.atleast_1d(np.asarray(strikes, dtype=np.float64))
+        out = np.full((len(self.expiries), len(strikes)), np.nan)
+        for row, smile in enumerate(self.iv):
+            valid = ~np.isnan(smile)
+            if valid.sum() >= 2:
+                out[row] = np.interp(strikes, self.strikes[valid], smile[valid], left=np.nan, right=np.nan)
+        return out
+
+    def atm_iv(self):
+        """ATM IV per expiry: the term structure."""
+        return self.iv_at(self.spot)[:, 0]
+
+    def skew(self, moneyness=None):
+        """Put-wing minus call-wing IV per expiry, `moneyness` away from spot (vol points)."""
+        moneyness = config.SURFACE_SKEW_MONEYNESS if moneyness is None else moneyness
+        wings = self.iv_at([self.spot * (1 - moneyness), self.spot * (1 + moneyness)])
+        return wings[:, 0] - wings[:, 1]
+
+    def term_structure(self):
+        """One row per expiry: days to expiry, ATM IV, skew, total OI and PCR."""
+        ce_oi = np.nansum(self.ce_oi, axis=1)
+        pe_oi = np.nansum(self.pe_oi, axis=1)
+        return pd.DataFrame({
+            "expiry": self.expiries,
+            "days": self.days,
+            "atm_iv": self.atm_iv(),
+            "skew": self.skew(),
+            "ce_oi": ce_oi,
+            "pe_oi": pe_oi,
+            "pcr": np.divide(pe_oi, ce_oi, out=np.zeros_like(pe_oi), where=ce_oi > 0),
+        })
+
+    def summary(self):
+        """Front/next ATM IV, term slope and front skew (None where not available), for the strategy and dashboard."""
+        atm = self.atm_iv()
+        skew = self.skew()
+
+        def value(values, i):
+            return float(values[i]) if len(values) > i and not np.isnan(values[i]) else None
+
+        front, following = value(atm, 0), value(atm, 1)
+        return {
+            "expiries": list(self.expiries),
+            "front_atm_iv": front,
+            "next_atm_iv": following,
+            # Positive: next expiry richer than the front (normal contango); negative: front-end stress
+            "term_slope": following - front if front is not None and following is not None else None,
+            "front_skew": value(skew, 0),
+        }
@@ -0,0 +1,345 @@
+import argparse
+import json
+import multiprocessing
+import os
+import pickle
+import sqlite3
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+import numpy as np
+
+import config
+from logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+# --- Backfill ---
+
+def backfill_features(client, symbol, days, store=None, version=None):
+    """
+    Fills the feature store with `days` of history, oldest first, one request window at a time.
+
+    Each window of 1-minute candles is aggregated to FEATURE_INTERVAL and its features are computed
+    together with the tail of the previous window (FEATURE_WARMUP_BARS), so indicators are warm
+    without ever holding more than one window in memory.
+    """
+    from candles import aggregate
+    from feature_store import feature_version, get_feature_store
+    from strategy import compute_features
+
+    store = store or get_feature_store()
+    version = version or feature_version(compute_features)
+    client.connect()
+
+    # Windows run from midnight to midnight, so no bar is split between two requests
+    end_dt = datetime.now()
+    start_dt = (end_dt - timedelta(days=days)).replace(hour=0, minute=0, second=0, microsecond=0)
+    window = timedelta(days=config.CANDLE_1M_MAX_DAYS_PER_REQUEST)
+    carry = None # Last warm-up bars of the previous window
+    written = 0
+    while start_dt < end_dt:
+        chunk_end = min(start_dt + window, end_dt)
+        bars = aggregate(client.fetch_candles(symbol, start_dt, chunk_end), config.FEATURE_INTERVAL)
+        start_dt = chunk_end
+        if len(bars) == 0:
+            continue
+        if carry is not None:
+            bars = np.concatenate([carry, bars[bars["ts"] > carry["ts"][-1]]])
+        features = compute_features(bars)
+        skip = config.FEATURE_WARMUP_BARS if carry is None else len(carry)
+        # The newest bar may still be forming; the live path stores it once it has closed
+        last = -1 if start_dt >= end_dt else None
+        written += store.append(symbol, config.FEATURE_INTERVAL, version, features.iloc[skip:last], only_new=False)
+        carry = bars[-config.FEATURE_WARMUP_BARS:]
+    return written
+
+
+# --- Walk-forward training ---
+
+LABEL_MISSING = -128 # y value of rows without a label
+
+
+def rolling_folds(n, train_bars, test_bars, step=None):
+    """(train_lo, train_hi, test_hi) row bounds of rolling windows: fit on [lo, hi), test on [hi, test_hi)."""
+    step = step or test_bars
+    folds = []
+    hi = train_bars
+    while hi < n:
+        folds.append((hi - train_bars, hi, min(hi + test_bars, n)))
+        hi += step
+    return folds
+
+
+def _fit_fold(args):
+    """Worker: fits one fold from the memory-mapped matrices and returns its out-of-sample metrics."""
+    from models import create_model
+
+    x_path, y_path, engine, (lo, hi, test_hi) = args
+    X = np.load(x_path, mmap_mode="r")
+    y = np.load(y_path, mmap_mode="r")
+
+    def rows(a, b):
+        # Copy only this window; drop warm-up NaNs and the unlabeled last candle
+        Xw = np.asarray(X[a:b])
+        yw = np.asarray(y[a:b])
+        keep = ~np.isnan(Xw).any(axis=1) & (yw != LABEL_MISSING)
+        return Xw[keep], yw[keep]
+
+    X_train, y_train = rows(lo, hi)
+    X_test, y_test = rows(hi, test_hi)
+    if len(X_train) < 100 or len(X_test) == 0 or len(np.unique(y_train)) < 2:
+        return None
+
+    model = create_model(engine)
+    start = time.perf_counter()
+    model.fit(X_train, y_train)
+    fit_s = time.perf_counter() - start
+    predicted = model.predict(X_test)
+
+    directional = predicted != 0
+    return {
+        "train_lo": lo, "train_hi": hi, "test_hi": test_hi,
+        "n_train": len(X_train),
+        "n_test": len(X_test),
+        "accuracy": float(np.mean(predicted == y_test)),
+        # Hit rate of the calls that would actually trade
+        "directional_precision": float(np.mean(predicted[directional] == y_test[directional])) if directional.any() else None,
+        "directional_calls": int(directional.sum()),
+        "fit_s": fit_s,
+    }
+
+
+class WalkForwardTrainer:
+    """
+    Walk-forward retraining over months of stored features with bounded memory.
+
+    Features are streamed from the feature store in chunks into a float32 memory-mapped matrix
+    (so the full history is never held in RAM), labels are computed from the close column, and
+    rolling windows are fitted in parallel worker processes that each map only their own window.
+    Every fold's out-of-sample metrics are recorded, and the model fitted on the latest window is
+    saved for the live engine to pick up.
+    """
+    def __init__(self, symbol=None, interval=None, engine=None, store=None):
+        from feature_store import feature_version, get_feature_store
+        from strategy import compute_features
+
+        self.symbol = symbol or config.SYMBOL
+        self.interval = interval or config.FEATURE_INTERVAL
+        self.engine = engine or config.MODEL_ENGINE
+        self.store = store or get_feature_store()
+        self.version = feature_version(compute_features)
+        self.conn = sqlite3.connect(self.store.path, check_same_thread=False)
+        self.create_tables()
+
+    def create_tables(self):
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS walk_forward_runs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                symbol TEXT,
+                interval TEXT,
+                version TEXT,
+                engine TEXT,
+                train_bars INTEGER,
+                test_bars INTEGER,
+                feature_columns TEXT,
+                model_path TEXT,
+                mean_accuracy REAL
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS walk_forward_folds (
+                run_id INTEGER,
+                fold INTEGER,
+                train_start DATETIME,
+                train_end DATETIME,
+                test_end DATETIME,
+                n_train INTEGER,
+                n_test INTEGER,
+                accuracy REAL,
+                directional_precision REAL,
+                directional_calls INTEGER,
+                fit_s REAL,
+                PRIMARY KEY (run_id, fold)
+            )
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_walk_forward_runs_key
+            ON walk_forward_runs (symbol, interval, version, id)
+        ''')
+        self.conn.commit()
+
+    def _materialize(self, workdir):
+        """Streams stored features into float32 .npy files. Returns (ts, X path, y path, columns)."""
+        from strategy import direction_labels, model_feature_columns
+
+        columns = self.store.columns(self.symbol, self.interval, self.version)
+        if columns is None:
+            return None
+        feature_names = [c for c in model_feature_columns(columns) if c in columns]
+        feature_idx = [columns.index(c) for c in feature_names]
+        close_idx = columns.index("close")
+        n = self.store.count(self.symbol, self.interval, self.version)
+
+        x_path = os.path.join(workdir, "X.npy")
+        y_path = os.path.join(workdir, "y.npy")
+        X = np.lib.format.open_memmap(x_path, mode="w+", dtype=np.float32, shape=(n, len(feature_idx)))
+        close = np.empty(n, dtype=np.float64)
+        ts = np.empty(n, dtype=np.int64)
+        pos = 0
+        for chunk_ts, chunk in self.store.iter_chunks(self.symbol, self.interval, self.version, dtype=np.float32):
+            m = len(chunk_ts)
+            X[pos:pos + m] = chunk[:, feature_idx]
+            close[pos:pos + m] = chunk[:, close_idx]
+            ts[pos:pos + m] = chunk_ts
+            pos += m
+        X.flush()
+        del X
+
+        y = direction_labels(close[:pos])
+        y[-1:] = LABEL_MISSING
+        # Bars across a gap (e.g. overnight) are labelled like any other, as in build_training_set
+        np.save(y_path, y)
+        return ts[:pos], x_path, y_path, feature_names
+
+    def run(self, train_bars=None, test_bars=None, workers=None):
+        """Fits every rolling window, records the per-fold metrics and saves the latest model. Returns the run id."""
+        train_bars = train_bars or config.WALK_FORWARD_TRAIN_BARS
+        test_bars = test_bars or config.WALK_FORWARD_TEST_BARS
+        workers = workers or config.WALK_FORWARD_WORKERS or os.cpu_count()
+
+        with tempfile.TemporaryDirectory(prefix="walk_forward_") as workdir:
+            materialized = self._materialize(workdir)
+            if materialized is None:
+                logger.warning(f"No stored features for {self.symbol} {self.interval} (version {self.version})")
+                return None
+            ts, x_path, y_path, feature_names = materialized
+            folds = rolling_folds(len(ts), train_bars, test_bars)
+            if not folds:
+                logger.warning(f"Only {len(ts)} stored rows; need more than {train_bars} for one fold")
+                return None
+
+            tasks = [(x_path, y_path, self.engine, fold) for fold in folds]
+            ctx = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=min(workers, len(tasks)), mp_context=ctx) as pool:
+                results = list(pool.map(_fit_fold, tasks))
+
+            # Final model on the latest window, for live use
+            model = _fit_latest(x_path, y_path, self.engine, len(ts), train_bars)
+
+        return self._record(ts, train_bars, test_bars, feature_names, results, model)
+
+    def _record(self, ts, train_bars, test_bars, feature_names, results, model):
+        completed = [r for r in results if r is not None]
+        mean_accuracy = float(np.mean([r["accuracy"] for r in completed])) if completed else None
+
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            INSERT INTO walk_forward_runs (symbol, interval, version, engine, train_bars, test_bars, feature_columns, mean_accuracy)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (self.symbol, self.interval, self.version, self.engine, train_bars, test_bars,
+              json.dumps(feature_names), mean_accuracy))
+        run_id = cursor.lastrowid
+
+        def stamp(i):
+            return str(np.datetime64(int(ts[min(i, len(ts) - 1)]), "s"))
+
+        cursor.executemany('''
+            INSERT INTO walk_forward_folds (run_id, fold, train_start, train_end, test_end, n_train, n_test,
+                                            accuracy, directional_precision, directional_calls, fit_s)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', [
+            (run_id, fold, stamp(r["train_lo"]), stamp(r["train_hi"]), stamp(r["test_hi"] - 1), r["n_train"],
+             r["n_test"], r["accuracy"], r["directional_precision"], r["directional_calls"], r["fit_s"])
+            for fold, r in enumerate(results) if r is not None
+        ])
+
+        if model is not None:
+            os.makedirs(config.MODEL_DIR, exist_ok=True)
+            model_path = os.path.join(config.MODEL_DIR, f"{self.symbol}_{self.interval}_{self.version}_{run_id}.pkl")
+            with open(model_path, "wb") as f:
+                pickle.dump(model, f)
+            cursor.execute("UPDATE walk_forward_runs SET model_path = ? WHERE id = ?", (model_path, run_id))
+        self.conn.commit()
+        return run_id
+
+    def fold_metrics(self, run_id):
+        import pandas as pd
+        return pd.read_sql_query(
+            "SELECT * FROM walk_forward_folds WHERE run_id = ? ORDER BY fold", self.conn, params=(run_id,)
+        )
+
+
+def _fit_latest(x_path, y_path, engine, n, train_bars):
+    from models import create_model
+
+    X = np.load(x_path, mmap_mode="r")
+    y = np.load(y_path, mmap_mode="r")
+    Xw = np.asarray(X[max(n - train_bars, 0):n])
+    yw = np.asarray(y[max(n - train_bars, 0):n])
+    keep = ~np.isnan(Xw).any(axis=1) & (yw != LABEL_MISSING)
+    if keep.sum() < 100 or len(np.unique(yw[keep])) < 2:
+        return None
+    model = create_model(engine)
+    model.fit(Xw[keep], yw[keep])
+    return model
+
+
+def latest_model(symbol, interval, version, path=None, engine=None):
+    """(model, feature_columns, run_id) of the newest walk-forward run for this feature set (and engine, if given), or None."""
+    path = path or config.FEATURE_STORE_PATH
+    if not os.path.exists(path):
+        return None
+    conn = sqlite3.connect(path)
+    try:
+        row = conn.execute('''
+            SELECT id, feature_columns, model_path FROM walk_forward_runs
+            WHERE symbol = ? AND interval = ? AND version = ? AND model_path IS NOT NULL
+              AND (? IS NULL OR engine = ?)
+            ORDER BY id DESC LIMIT 1
+        ''', (symbol, interval, version, engine, engine)).fetchone()
+    except sqlite3.OperationalError:
+        return None # No walk-forward run yet
+    finally:
+        conn.close()
+    if row is None or not os.path.exists(row[2]):
+        return None
+    with open(row[2], "rb") as f:
+        return pickle.load(f), json.loads(row[1]), row[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Walk-forward retraining over stored features")
+    parser.add_argument("--symbol", default=config.SYMBOL)
+    parser.add_argument("--engine", default=config.MODEL_ENGINE)
+    parser.add_argument("--train-bars", type=int, default=config.WALK_FORWARD_TRAIN_BARS)
+    parser.add_argument("--test-bars", type=int, default=config.WALK_FORWARD_TEST_BARS)
+    parser.add_argument("--workers", type=int, default=config.WALK_FORWARD_WORKERS)
+    parser.add_argument("--backfill-days", type=int, default=0, help="Fetch and store this much history first")
+    args = parser.parse_args()
+
+    if args.backfill_days:
+        from database import Database
+        from groww_client import GrowwClient
+        client = GrowwClient()
+        if not client.login(Database()):
+            print("Login failed; cannot backfill")
+            return
+        print(f"Backfilled {backfill_features(client, args.symbol, args.backfill_days)} feature rows")
+
+    trainer = WalkForwardTrainer(args.symbol, engine=args.engine)
+    run_id = trainer.run(args.train_bars, args.test_bars, args.workers)
+    if run_id is None:
+        return
+    folds = trainer.fold_metrics(run_id)
+    print(folds.to_string(index=False))
+    print(f"\nRun {run_id}: mean out-of-sample accuracy {folds['accuracy'].mean():.3f} over {len(folds)} folds")
+
+
+if __name__ == "__main__":
+    main()